@@ -0,0 +1,205 @@
+"""
+Agregación de transacciones en una sola pasada
+
+Lo usan el resumen del dashboard, el reporte de /api/transactions/report y los
+microbenchmarks. Cada fila se suma una sola vez a una celda (tipo, categoría y,
+si se agrupa por fecha, día); al terminar, los totales y las agrupaciones pedidas (categoría, tipo,
+día, semana ISO o mes) se arman a partir de esas celdas, que son pocas aunque
+haya millones de filas. Las últimas k transacciones por fecha se mantienen en
+un heap de tamaño k, sin ordenar toda la lista.
+
+Convenciones (las mismas que el resumen mensual): los ingresos se suman tal
+cual y los gastos en valor absoluto. Entre transacciones con la misma fecha,
+las últimas k conservan el orden de llegada.
+
+update_arrays() hace las sumas con numpy (bincount sobre el código de celda de
+cada fila) y da el mismo resultado. Como las filas llegan como dicts, sacar los
+valores cuesta casi lo mismo que sumarlos en Python y en las mediciones
+(benchmarks/microbench.py) no resultó más rápido, así que summarize() solo lo
+usa si se pide o si se configura AGGREGATION_ARRAY_MIN_ROWS (listas de ese
+tamaño o más; 0 lo desactiva).
+"""
+
+import heapq
+import os
+from datetime import date
+from operator import itemgetter
+
+import numpy as np
+
+DIMENSIONS = ('categoria', 'tipo', 'dia', 'semana', 'mes')
+ARRAY_MIN_ROWS = int(os.getenv('AGGREGATION_ARRAY_MIN_ROWS', '0'))
+TOP_K_DEFAULT = 10
+
+
+def iso_week(dia):
+    """'2024-03-05' -> '2024-W10'"""
+    año, semana, _ = date.fromisoformat(dia).isocalendar()
+    return f'{año}-W{semana:02d}'
+
+
+def top_by_date(rows, k=TOP_K_DEFAULT):
+    """Las k transacciones más recientes, igual que sorted(..., reverse=True)[:k]"""
+    return heapq.nlargest(k, rows, key=itemgetter('fecha'))
+
+
+def _as_number(value):
+    # bincount suma en float: devolver enteros cuando el total lo es
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class Aggregator:
+    """Acumulador de una pasada; se le pueden pasar las filas por bloques
+
+        agg = Aggregator(group_by=('categoria', 'semana'), top_k=10)
+        for rows in chunks:
+            agg.update(rows)
+        agg.result()
+    """
+
+    def __init__(self, group_by=(), top_k=TOP_K_DEFAULT):
+        invalidas = [d for d in group_by if d not in DIMENSIONS]
+        if invalidas:
+            raise ValueError(f"Agrupación no soportada: {', '.join(invalidas)}")
+        self.group_by = tuple(group_by)
+        self.top_k = top_k
+        # Sin agrupaciones por fecha las celdas son solo (tipo, categoría)
+        self._con_dia = any(d in ('dia', 'semana', 'mes') for d in self.group_by)
+        self._celdas = {}
+        self._top = []
+        self._orden = 0
+
+    def update(self, rows):
+        """Sumar un bloque de filas (cualquier iterable)"""
+        celdas = self._celdas
+        top = self._top
+        k = self.top_k
+        orden = self._orden
+        con_dia = self._con_dia
+        heappush, heapreplace = heapq.heappush, heapq.heapreplace
+        minima = top[0][0] if k and len(top) == k else None
+        for t in rows:
+            tipo = t['tipo']
+            monto = t['monto']
+            if tipo == 'gasto':
+                monto = abs(monto)
+            fecha = t['fecha']
+            clave = (tipo, t['categoria'], fecha[:10]) if con_dia else (tipo, t['categoria'])
+            celda = celdas.get(clave)
+            if celda is None:
+                celdas[clave] = [monto, 1]
+            else:
+                celda[0] += monto
+                celda[1] += 1
+            if k:
+                # orden decreciente: con fechas iguales se descarta la que llegó después
+                orden -= 1
+                if minima is None:
+                    heappush(top, (fecha, orden, t))
+                    if len(top) == k:
+                        minima = top[0][0]
+                elif fecha > minima:
+                    heapreplace(top, (fecha, orden, t))
+                    minima = top[0][0]
+        self._orden = orden
+        return self
+
+    def update_arrays(self, rows):
+        """Como update() pero sumando con numpy; rows debe ser una lista"""
+        n = len(rows)
+        if not n:
+            return self
+        codigos = {}
+        celda = np.fromiter(
+            (codigos.setdefault((t['tipo'], t['categoria'], t['fecha'][:10]) if self._con_dia
+                                else (t['tipo'], t['categoria']), len(codigos)) for t in rows),
+            dtype=np.int64, count=n
+        )
+        montos = np.fromiter((t['monto'] for t in rows), dtype=float, count=n)
+        es_gasto = np.array([clave[0] == 'gasto' for clave in codigos], dtype=bool)
+        montos = np.where(es_gasto[celda], np.abs(montos), montos)
+        totales = np.bincount(celda, weights=montos, minlength=len(codigos))
+        cantidades = np.bincount(celda, minlength=len(codigos))
+
+        for clave, i in codigos.items():
+            previa = self._celdas.get(clave)
+            total, cantidad = _as_number(totales[i]), int(cantidades[i])
+            if previa is None:
+                self._celdas[clave] = [total, cantidad]
+            else:
+                previa[0] += total
+                previa[1] += cantidad
+
+        if self.top_k:
+            fechas = [t['fecha'] for t in rows]
+            for i in heapq.nlargest(self.top_k, range(n), key=fechas.__getitem__):
+                self._orden -= 1
+                item = (fechas[i], self._orden, rows[i])
+                if len(self._top) < self.top_k:
+                    heapq.heappush(self._top, item)
+                elif item[0] > self._top[0][0]:
+                    heapq.heapreplace(self._top, item)
+        return self
+
+    def add(self, row):
+        return self.update((row,))
+
+    def result(self):
+        """{'total_ingresos', 'total_gastos', 'balance', 'cantidad', 'grupos', 'ultimas'}
+
+        grupos[dimensión][clave] = {'ingresos', 'gastos', 'cantidad'}
+        """
+        total_ingresos = total_gastos = cantidad = 0
+        grupos = {d: {} for d in self.group_by}
+        semanas = {}
+        for clave_celda, (total, n) in self._celdas.items():
+            tipo, categoria = clave_celda[:2]
+            dia = clave_celda[2] if self._con_dia else None
+            cantidad += n
+            if tipo == 'ingreso':
+                total_ingresos += total
+            elif tipo == 'gasto':
+                total_gastos += total
+            for dimension in self.group_by:
+                if dimension == 'categoria':
+                    clave = categoria
+                elif dimension == 'tipo':
+                    clave = tipo
+                elif dimension == 'dia':
+                    clave = dia
+                elif dimension == 'mes':
+                    clave = dia[:7]
+                else:
+                    clave = semanas.get(dia)
+                    if clave is None:
+                        clave = semanas[dia] = iso_week(dia)
+                grupo = grupos[dimension].get(clave)
+                if grupo is None:
+                    grupo = grupos[dimension][clave] = {'ingresos': 0, 'gastos': 0, 'cantidad': 0}
+                if tipo == 'ingreso':
+                    grupo['ingresos'] += total
+                elif tipo == 'gasto':
+                    grupo['gastos'] += total
+                grupo['cantidad'] += n
+
+        return {
+            'total_ingresos': total_ingresos,
+            'total_gastos': total_gastos,
+            'balance': total_ingresos - total_gastos,
+            'cantidad': cantidad,
+            'grupos': grupos,
+            'ultimas': [t for _, _, t in sorted(self._top, reverse=True)],
+        }
+
+
+def summarize(rows, group_by=(), top_k=TOP_K_DEFAULT, engine='auto'):
+    """Agregar una lista o iterable de transacciones
+
+    engine: 'python', 'numpy' o 'auto' (numpy para listas de ARRAY_MIN_ROWS filas o más)
+    """
+    agg = Aggregator(group_by, top_k)
+    usar_arrays = engine == 'auto' and ARRAY_MIN_ROWS and isinstance(rows, list) and len(rows) >= ARRAY_MIN_ROWS
+    if engine == 'numpy' or usar_arrays:
+        return agg.update_arrays(list(rows)).result()
+    return agg.update(rows).result()
@@ -1,18 +1,43 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context, send_from_directory
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from postgrest.exceptions import APIError
 from datetime import datetime, timedelta
 import json
+import logging
 import uuid
+import base64
+import hashlib
+import csv
+import io
+import re
+import mimetypes
+import hmac
+import threading
 from functools import wraps
-import bcrypt
-from werkzeug.security import check_password_hash
+from concurrent.futures import ThreadPoolExecutor
+from cache import TTLCache
+from supabase_client import LazySupabase
+import passwords
+from passwords import hash_password, verify_password, needs_rehash, PasswordPoolBusy
+import importers
+import forecast
+import aggregation
+import search
+import rates
+import versions
+import idempotency
+import metrics
+import logs
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Logs JSON escritos por un hilo aparte (logs.py)
+logs.configure()
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY')
 CORS(app)
@@ -20,38 +45,87 @@ CORS(app)
 # Configuración de Supabase
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# Funciones híbridas de autenticación (bcrypt + Werkzeug)
-def is_bcrypt_hash(password_hash):
-    """Detecta si el hash es de tipo bcrypt"""
-    return password_hash and password_hash.startswith('$2b$')
-
-def hash_password(password):
-    """Crear hash bcrypt de la contraseña (para nuevos usuarios)"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
-
-def verify_password(password, stored_hash):
-    """Verificar contraseña usando el método correcto según el tipo de hash"""
-    if not stored_hash:
-        return False
-    
-    if is_bcrypt_hash(stored_hash):
-        # Es un hash bcrypt - usar bcrypt
-        try:
-            return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
-        except Exception as e:
-            print(f"Error verificando bcrypt: {e}")
-            return False
-    else:
-        # Es un hash Werkzeug - usar método Werkzeug
-        try:
-            return check_password_hash(stored_hash, password)
-        except Exception as e:
-            print(f"Error verificando Werkzeug: {e}")
-            return False
+# El cliente se crea en cada worker al primer uso (después del fork de gunicorn)
+supabase = LazySupabase(SUPABASE_URL, SUPABASE_KEY)
+
+# Versión de los datos de cada usuario, compartida entre workers (versions.py).
+# Cada escritura la cambia; las cachés de abajo guardan (versión, valor) y una
+# versión distinta cuenta como fallo, así un worker ve enseguida lo que escribió
+# otro. Los ETags de las lecturas también se arman con ella.
+data_versions = versions.from_env()
+
+# Caché de resúmenes mensuales por (usuario_id, mes), con la versión de
+# 'transactions' con la que se calculó cada uno.
+summary_cache = TTLCache(
+    maxsize=int(os.getenv('SUMMARY_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('SUMMARY_CACHE_TTL', '60'))
+)
+
+# Caché de la fila de Usuarios por usuario_id (perfil y teléfono para Gastos fijos),
+# con la versión de 'profile'. Se llena en el login y se reemplaza al actualizar
+# el perfil o la contraseña.
+profile_cache = TTLCache(
+    maxsize=int(os.getenv('PROFILE_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('PROFILE_CACHE_TTL', '60'))
+)
+
+# Resultados de las mutaciones aplicadas por /api/batch, por usuario y clave de
+# idempotencia, en archivos compartidos por los workers (idempotency.py)
+idempotency_store = idempotency.from_env()
+
+# Índice de búsqueda de transacciones por usuario (search.py), con la versión de
+# 'transactions' con la que se construyó. Las escrituras de este worker lo
+# actualizan; si la versión cambió en otro worker, al buscar se vuelven a leer
+# solo las filas anotadas en el registro de versions.py (o se reconstruye si el
+# registro no alcanza).
+search_indexes = TTLCache(
+    maxsize=int(os.getenv('SEARCH_INDEX_CACHE_SIZE', '32')),
+    ttl=float(os.getenv('SEARCH_INDEX_TTL', '900'))
+)
+
+# Agregación del resumen en la base de datos (sql/01_resumen_mensual.sql). Si la
+# función RPC no existe se desactiva en este worker y se agrega en Python.
+summary_rpc_available = os.getenv('SUMMARY_RPC', '1') != '0'
+
+def password_pool_busy():
+    """Respuesta cuando el pool de bcrypt está saturado"""
+    response = jsonify({
+        'success': False,
+        'message': 'Servidor ocupado, intenta de nuevo en unos segundos'
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def upgrade_password_hash(user, password):
+    """Reemplazar un hash Werkzeug o de costo bajo por uno bcrypt con el costo actual"""
+    try:
+        new_hash = hash_password(password)
+        supabase.table('Usuarios').update({'password_hash': new_hash}).eq('id', user['id']).eq('password_hash', user['password_hash']).execute()
+        user['password_hash'] = new_hash
+        data_versions.bump(user['id'], 'profile')
+    except PasswordPoolBusy:
+        # Se intentará de nuevo en el próximo inicio de sesión
+        pass
+    except Exception as e:
+        logger.warning("No se pudo actualizar el hash de %s: %s", user['id'], e)
+
+def get_user_profile(user_id):
+    """Fila de Usuarios del usuario, desde la caché si sigue vigente"""
+    version = data_versions.get(user_id, 'profile')
+    entry = profile_cache.get(user_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    response = supabase.table('Usuarios').select('*').eq('id', user_id).execute()
+    if not response.data:
+        return None
+    profile = response.data[0]
+    profile_cache.set(user_id, (version, profile))
+    return profile
+
+def get_user_phone(user_id):
+    """Teléfono del usuario (llave de Gastos fijos) o None si no existe"""
+    profile = get_user_profile(user_id)
+    return profile.get('telefono') if profile else None
 
 def login_required(f):
     @wraps(f)
@@ -61,6 +135,109 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def data_etag(user_id, scopes):
+    """ETag de una lectura: usuario, despliegue y versión de los datos que devuelve"""
+    # El intervalo de tiempo no es por los datos de la app: acota cuánto se sigue
+    # respondiendo 304 tras una escritura que no cambió la versión (hecha fuera de
+    # la app o en otra instancia sin el mismo DATA_VERSION_DIR)
+    partes = [str(user_id), ASSET_VERSION, data_versions.token(user_id, *scopes), str(data_versions.bucket())]
+    return hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()[:24]
+
+def conditional(*scopes):
+    """ETag débil en las respuestas GET; si el cliente ya lo tiene, 304 sin ejecutar la vista
+
+    Va debajo de @login_required. Los scopes son los de versions.SCOPES de los
+    que depende la respuesta.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = data_etag(session['user_id'], scopes)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # El navegador puede guardarla, pero debe revalidar cada vez
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+# Cotizaciones de divisas (proxy con caché del proveedor externo)
+rates_cache = rates.from_env()
+
+@app.route('/api/rates')
+def get_rates():
+    """Cotizaciones para la calculadora de divisas (`base`, USD por defecto)"""
+    base = request.args.get('base', 'USD').upper()
+    if not rates.CURRENCY_RE.match(base):
+        return jsonify({'error': 'Moneda inválida'}), 400
+    
+    try:
+        data = rates_cache.rates_for(base)
+    except rates.RatesUnavailable:
+        return jsonify({'error': 'Cotizaciones no disponibles'}), 503
+    except KeyError:
+        return jsonify({'error': f'Moneda no soportada: {base}'}), 404
+    
+    response = jsonify(data)
+    response.headers['Cache-Control'] = f"public, max-age={min(data['max_age'], 300)}"
+    return response
+
+@app.route('/health')
+def health():
+    """Estado del worker y uso del pool de conexiones a Supabase"""
+    return jsonify({'status': 'ok', 'supabase': supabase.pool_stats(), 'passwords': passwords.pool.stats(), 'rates': rates_cache.stats(), 'logs': logs.stats()})
+
+# Métricas por petición (metrics.py): latencia por ruta y llamadas a Supabase.
+# Cada petición lleva un X-Request-ID (el del proxy si viene, o uno nuevo) que
+# aparece en todas sus líneas de log.
+# /metrics exige METRICS_TOKEN; sin token solo responde si METRICS_PUBLIC=1 (p. ej.
+# detrás de un proxy que no lo expone) o en modo debug
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_PUBLIC = os.getenv('METRICS_PUBLIC', '0') == '1'
+REQUEST_ID_RE = re.compile(r'^[0-9A-Za-z._\-]{1,64}$')
+
+@app.before_request
+def start_request():
+    request_id = request.headers.get('X-Request-ID', '')
+    logs.set_request_id(request_id if REQUEST_ID_RE.match(request_id) else uuid.uuid4().hex[:16])
+    metrics.start_request()
+
+@app.after_request
+def finish_request(response):
+    timings = metrics.current()
+    if timings is None:
+        return response
+    # La plantilla de la ruta y no la URL, para no crear una serie por id
+    route = request.url_rule.rule if request.url_rule else 'sin_ruta'
+    duracion = metrics.record_request(request.method, route, response.status_code, timings)
+    response.headers['Server-Timing'] = metrics.server_timing(timings, duracion)
+    response.headers['X-Request-ID'] = logs.get_request_id()
+    logger.info("%s %s %s", request.method, route, response.status_code, extra={
+        'method': request.method,
+        'route': route,
+        'status': response.status_code,
+        'duration_ms': round(duracion * 1000, 1),
+        'supabase_calls': timings.calls,
+        'supabase_ms': round(timings.seconds * 1000, 1),
+    })
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Métricas de todos los workers en formato de texto de Prometheus"""
+    if METRICS_TOKEN:
+        token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(token, METRICS_TOKEN):
+            return Response('No autorizado\n', status=401, mimetype='text/plain')
+    elif not (METRICS_PUBLIC or app.debug):
+        return Response('No encontrado\n', status=404, mimetype='text/plain')
+    return Response(metrics.render(metrics.registry.collect()), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
     if 'user_id' in session:
@@ -96,6 +273,97 @@ def profile():
 def currency():
     return render_template('currency.html')
 
+def compute_asset_version():
+    """Versión del despliegue: APP_VERSION o un hash de static/ y templates/
+
+    Todos los workers calculan el mismo valor y cambia con cualquier archivo
+    nuevo o modificado, así el service worker renueva sus cachés en cada deploy.
+    """
+    if os.getenv('APP_VERSION'):
+        return os.getenv('APP_VERSION')
+    digest = hashlib.sha1()
+    for folder in (app.static_folder, app.template_folder and os.path.join(app.root_path, app.template_folder)):
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, app.root_path).encode('utf-8'))
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+ASSET_VERSION = compute_asset_version()
+
+# Archivos generados por build_assets.py: nombre con hash, minificados y precomprimidos
+DIST_FOLDER = os.path.join(app.static_folder, 'dist')
+DIST_MAX_AGE = 365 * 24 * 3600
+ICON_SIZES = (72, 96, 128, 144, 152, 192, 384, 512)
+
+def load_asset_manifest():
+    """Nombre original -> nombre con hash; vacío si no se corrió el build"""
+    try:
+        with open(os.path.join(DIST_FOLDER, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)['files']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+asset_manifest = load_asset_manifest()
+
+@app.template_global()
+def asset_url(path):
+    """URL de un archivo de static/: la versión con hash si existe, si no la original"""
+    hashed = asset_manifest.get(path)
+    return f'/static/dist/{hashed}' if hashed else f'/static/{path}'
+
+def pwa_icons():
+    """Iconos disponibles para el manifest, del más chico al más grande"""
+    icons = []
+    for size in ICON_SIZES:
+        for ext, mimetype in (('png', 'image/png'), ('svg', 'image/svg+xml')):
+            path = f'icons/icon-{size}x{size}.{ext}'
+            if path in asset_manifest or os.path.exists(os.path.join(app.static_folder, path)):
+                icons.append({'src': asset_url(path), 'sizes': f'{size}x{size}', 'type': mimetype})
+                break
+    return icons
+
+@app.route('/static/dist/<path:filename>')
+def static_dist(filename):
+    """Archivos del build: caché inmutable y versión .br o .gz si el navegador la acepta"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = None
+    for encoding, ext in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(DIST_FOLDER, filename + ext)):
+            response = send_from_directory(DIST_FOLDER, filename + ext, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(DIST_FOLDER, filename, mimetype=mimetype)
+    # El nombre cambia con el contenido, así que nunca hace falta revalidar
+    response.headers['Cache-Control'] = f'public, max-age={DIST_MAX_AGE}, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+service_worker_source = None
+
+@app.route('/sw.js')
+def service_worker():
+    """Service worker en la raíz (alcance /) con la versión del despliegue y la lista de precache"""
+    global service_worker_source
+    if service_worker_source is None:
+        precache = [asset_url(path) for path in ('css/style.css', 'js/app.js')]
+        precache += [icon['src'] for icon in pwa_icons() if icon['sizes'] in ('192x192', '512x512')]
+        precache.append('/manifest.json')
+        with open(os.path.join(app.static_folder, 'js', 'sw.js'), encoding='utf-8') as f:
+            service_worker_source = (f.read()
+                                     .replace('__CACHE_VERSION__', ASSET_VERSION)
+                                     .replace("'__PRECACHE_URLS__'", json.dumps(precache)))
+    
+    response = Response(service_worker_source, mimetype='application/javascript')
+    # El navegador debe revisar en cada visita si hay un service worker nuevo
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Service-Worker-Allowed'] = '/'
+    return response
+
 @app.route('/manifest.json')
 def manifest():
     return jsonify({
@@ -106,18 +374,7 @@ def manifest():
         "display": "standalone",
         "background_color": "#ffffff",
         "theme_color": "#4f46e5",
-        "icons": [
-            {
-                "src": "/static/icons/icon-192x192.png",
-                "sizes": "192x192",
-                "type": "image/png"
-            },
-            {
-                "src": "/static/icons/icon-512x512.png", 
-                "sizes": "512x512",
-                "type": "image/png"
-            }
-        ]
+        "icons": pwa_icons()
     })
 
 # API Routes
@@ -153,9 +410,13 @@ def api_login():
                 # Verificar contraseña con bcrypt
                 if verify_password(password, password_hash):
                     # Contraseña correcta
+                    if needs_rehash(password_hash):
+                        upgrade_password_hash(user, password)
+                    
                     session['user_id'] = user['id']
                     session['user_email'] = user['correo']
                     session['user_name'] = user.get('full_name', '')
+                    profile_cache.set(user['id'], (data_versions.get(user['id'], 'profile'), user))
                     
                     return jsonify({
                         'success': True,
@@ -177,8 +438,10 @@ def api_login():
                 'message': 'Usuario no encontrado'
             }), 401
             
+    except PasswordPoolBusy:
+        return password_pool_busy()
     except Exception as e:
-        print(f"Error en login: {str(e)}")  # Para debug
+        logger.exception("Error en login")
         return jsonify({
             'success': False,
             'message': f'Error en el servidor: {str(e)}'
@@ -189,8 +452,155 @@ def api_logout():
     session.clear()
     return jsonify({'success': True, 'message': 'Sesión cerrada'})
 
+# Resumen mensual del dashboard
+def build_month_summary(transactions, month):
+    """Calcular totales, gastos por categoría y últimas transacciones del mes"""
+    # Una sola pasada: totales, categorías y las 10 más recientes (aggregation.py)
+    resumen = aggregation.summarize(transactions, group_by=('categoria',), top_k=10)
+    
+    return {
+        'total_ingresos': resumen['total_ingresos'],
+        'total_gastos': resumen['total_gastos'],
+        'balance': resumen['balance'],
+        'gastos_por_categoria': {
+            categoria: grupo['gastos']
+            for categoria, grupo in resumen['grupos']['categoria'].items() if grupo['gastos']
+        },
+        'ultimas_transacciones': resumen['ultimas'],
+        'mes_seleccionado': month
+    }
+
+def build_month_summary_from_totals(totals, latest, month):
+    """Armar el resumen a partir de los totales por (tipo, categoría) de la RPC"""
+    total_ingresos = sum(row['total'] for row in totals if row['tipo'] == 'ingreso')
+    total_gastos = sum(row['total_abs'] for row in totals if row['tipo'] == 'gasto')
+    
+    gastos_por_categoria = {}
+    for row in totals:
+        if row['tipo'] == 'gasto':
+            gastos_por_categoria[row['categoria']] = gastos_por_categoria.get(row['categoria'], 0) + row['total_abs']
+    
+    return {
+        'total_ingresos': total_ingresos,
+        'total_gastos': total_gastos,
+        'balance': total_ingresos - total_gastos,
+        'gastos_por_categoria': gastos_por_categoria,
+        'ultimas_transacciones': latest,
+        'mes_seleccionado': month
+    }
+
+def fetch_month_summary(user_id, month):
+    """Obtener el resumen del mes, agregado en la base de datos cuando es posible"""
+    global summary_rpc_available
+    
+    if summary_rpc_available:
+        try:
+            totals = supabase.rpc('resumen_mensual', {'p_usuario_id': user_id, 'p_mes': month}).execute()
+            latest = supabase.table('Transacciones').select('*').eq('usuario_id', user_id).gte('fecha', f'{month}-01').lt('fecha', f'{month}-32').order('fecha', desc=True).limit(10).execute()
+            return build_month_summary_from_totals(totals.data, latest.data, month)
+        except APIError as e:
+            # PGRST202 / 42883: la función no está instalada en la base de datos
+            if e.code in ('PGRST202', '42883'):
+                summary_rpc_available = False
+            logger.warning("resumen_mensual no disponible, agregando en Python: %s", e.message)
+    
+    # Obtener transacciones del mes especificado
+    response = supabase.table('Transacciones').select('*').eq('usuario_id', user_id).gte('fecha', f'{month}-01').lt('fecha', f'{month}-32').execute()
+    return build_month_summary(response.data, month)
+
+def add_to_month_summary(summary, transaction):
+    """Devolver una copia del resumen con una transacción nueva ya sumada"""
+    summary = dict(summary)
+    monto = transaction['monto']
+    if transaction['tipo'] == 'ingreso':
+        summary['total_ingresos'] += monto
+    elif transaction['tipo'] == 'gasto':
+        summary['total_gastos'] += abs(monto)
+        categorias = dict(summary['gastos_por_categoria'])
+        categorias[transaction['categoria']] = categorias.get(transaction['categoria'], 0) + abs(monto)
+        summary['gastos_por_categoria'] = categorias
+    summary['balance'] = summary['total_ingresos'] - summary['total_gastos']
+    summary['ultimas_transacciones'] = aggregation.top_by_date(summary['ultimas_transacciones'] + [transaction], 10)
+    return summary
+
+def update_search_index(user_id, anterior, nueva, upsert=(), remove=()):
+    """Aplicar una escritura al índice de búsqueda cacheado si estaba al día con `anterior`
+
+    El índice se modifica fuera del candado de la caché (tiene el suyo) y al
+    final pasa a la versión nueva solo si nadie lo cambió mientras tanto.
+    """
+    entry = search_indexes.get(user_id)
+    if entry is None:
+        return
+    if entry[0] != anterior:
+        # Puede faltarle algo escrito por otro worker: al buscar se pondrá al día
+        return
+    index = entry[1]
+    for row_id in remove:
+        index.remove(row_id)
+    index.update(upsert)
+    search_indexes.update(user_id, lambda actual: (nueva, index) if actual == entry else actual)
+
+def invalidate_user_summaries(user_id, updated=None):
+    """Nueva versión de transacciones y descartar todos los resúmenes cacheados del usuario
+
+    Con `updated` (la fila ya modificada) el índice de búsqueda se actualiza en
+    lugar de descartarse.
+    """
+    anterior, nueva = data_versions.swap(user_id, 'transactions', ids=[updated['id']] if updated else None)
+    summary_cache.pop_matching(lambda key: key[0] == user_id)
+    if updated:
+        update_search_index(user_id, anterior, nueva, upsert=[updated])
+    else:
+        search_indexes.pop(user_id)
+
+def transactions_changed(user_id, *fechas, created=None, deleted=None):
+    """Nueva versión de transacciones tras una escritura que solo afecta los meses de esas fechas
+
+    Los resúmenes de este worker para otros meses siguen valiendo y pasan a la
+    versión nueva; los de los meses afectados se descartan, salvo el de
+    `created`, que se actualiza sumándole la transacción nueva. `deleted` es la
+    fila borrada: su mes cuenta como afectado y sale del índice de búsqueda.
+    Solo se actualiza lo que estaba en la versión que esta escritura reemplazó;
+    lo de cualquier otra versión se descarta.
+    """
+    ids = [row['id'] for row in (created, deleted) if row]
+    anterior, nueva = data_versions.swap(user_id, 'transactions', ids=ids)
+    if deleted:
+        fechas += (deleted['fecha'],)
+    for fecha in fechas:
+        if fecha:
+            summary_cache.pop((user_id, str(fecha)[:7]))
+    mes_creado = str(created['fecha'])[:7] if created else None
+
+    def restamp(key, entry):
+        # Un resumen de otra versión puede no incluir escrituras de otro worker: se descarta
+        if entry[0] != anterior:
+            return None
+        if key[1] == mes_creado:
+            return (nueva, add_to_month_summary(entry[1], created))
+        return (nueva, entry[1])
+
+    summary_cache.update_matching(lambda key: key[0] == user_id, restamp)
+    update_search_index(
+        user_id, anterior, nueva,
+        upsert=[created] if created else (),
+        remove=[deleted['id']] if deleted else ()
+    )
+
+def cached_month_summary(user_id, month):
+    """Resumen del mes desde la caché del worker o, si no está o es de otra versión, desde Supabase"""
+    version = data_versions.get(user_id, 'transactions')
+    entry = summary_cache.get((user_id, month))
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    summary = fetch_month_summary(user_id, month)
+    summary_cache.set((user_id, month), (version, summary))
+    return summary
+
 @app.route('/api/dashboard-summary')
 @login_required
+@conditional('transactions')
 def dashboard_summary():
     try:
         user_id = session['user_id']
@@ -200,45 +610,191 @@ def dashboard_summary():
         if not month:
             month = datetime.now().strftime('%Y-%m')
         
-        # Obtener transacciones del mes especificado
-        response = supabase.table('Transacciones').select('*').eq('usuario_id', user_id).gte('fecha', f'{month}-01').lt('fecha', f'{month}-32').execute()
-        transactions = response.data
+        return jsonify(cached_month_summary(user_id, month))
+        
+    except Exception as e:
+        logger.exception("Error en dashboard")
+        return jsonify({'error': str(e)}), 500
+
+# Tendencias de varios meses
+TRENDS_MONTHS_DEFAULT = 12
+TRENDS_MONTHS_MAX = 36
+TRENDS_FANOUT_WORKERS = int(os.getenv('TRENDS_FANOUT_WORKERS', '8'))
+rollup_table_available = True
+trends_executor = ThreadPoolExecutor(max_workers=TRENDS_FANOUT_WORKERS, thread_name_prefix='trends')
+
+def month_range(last_month, count):
+    """Lista de `count` meses 'YYYY-MM' que termina en last_month, del más antiguo al más reciente"""
+    year, month = map(int, last_month.split('-'))
+    if not 1 <= month <= 12:
+        raise ValueError('Mes inválido')
+    index = year * 12 + month - 1
+    return [f'{i // 12:04d}-{i % 12 + 1:02d}' for i in range(index - count + 1, index + 1)]
+
+def fetch_trend_totals(user_id, months):
+    """Totales por (mes, tipo, categoría) del rango en una sola consulta al rollup
+
+    Devuelve None si la tabla "Resumen transacciones" no está instalada.
+    """
+    global rollup_table_available
+    
+    if not (summary_rpc_available and rollup_table_available):
+        return None
+    try:
+        response = supabase.table('Resumen transacciones').select('mes,tipo,categoria,total,total_abs').eq('usuario_id', user_id).gte('mes', months[0]).lte('mes', months[-1]).execute()
+        return response.data
+    except APIError as e:
+        # 42P01 / PGRST205: la tabla no existe (sql/02_resumen_transacciones.sql sin ejecutar)
+        if e.code in ('42P01', 'PGRST205'):
+            rollup_table_available = False
+        logger.warning("Resumen transacciones no disponible, consultando mes por mes: %s", e.message)
+        return None
+
+def build_trends(months, summaries):
+    """Series alineadas con `months` a partir de un resumen por mes"""
+    categorias = sorted({c for s in summaries for c in s['gastos_por_categoria']})
+    return {
+        'meses': months,
+        'ingresos': [s['total_ingresos'] for s in summaries],
+        'gastos': [s['total_gastos'] for s in summaries],
+        'balance': [s['balance'] for s in summaries],
+        'gastos_por_categoria': {
+            c: [s['gastos_por_categoria'].get(c, 0) for s in summaries] for c in categorias
+        }
+    }
+
+def fetch_trends(user_id, months):
+    """Tendencias del rango: una consulta al rollup o, sin él, los meses en paralelo"""
+    totals = fetch_trend_totals(user_id, months)
+    if totals is not None:
+        por_mes = {month: [] for month in months}
+        for row in totals:
+            if row['mes'] in por_mes:
+                por_mes[row['mes']].append(row)
+        summaries = [build_month_summary_from_totals(por_mes[month], [], month) for month in months]
+    else:
+        # propagate: las llamadas de los hilos del executor cuentan en la petición actual
+        summaries = list(trends_executor.map(metrics.propagate(lambda month: cached_month_summary(user_id, month)), months))
+    return build_trends(months, summaries)
+
+@app.route('/api/trends')
+@login_required
+@conditional('transactions')
+def get_trends():
+    try:
+        user_id = session['user_id']
+        month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+        
+        try:
+            count = min(max(int(request.args.get('months', TRENDS_MONTHS_DEFAULT)), 1), TRENDS_MONTHS_MAX)
+            months = month_range(month, count)
+        except ValueError:
+            return jsonify({'error': 'Parámetros inválidos'}), 400
+        
+        return jsonify(fetch_trends(user_id, months))
         
-        # Calcular totales
-        total_ingresos = sum(t['monto'] for t in transactions if t['tipo'] == 'ingreso')
-        total_gastos = sum(abs(t['monto']) for t in transactions if t['tipo'] == 'gasto')
-        balance = total_ingresos - total_gastos
+    except Exception as e:
+        logger.exception("Error en tendencias")
+        return jsonify({'error': str(e)}), 500
+
+# Proyección de flujo de caja
+FORECAST_MONTHS_DEFAULT = 12
+FORECAST_MONTHS_MAX = 120
+FORECAST_INCOME_MONTHS = int(os.getenv('FORECAST_INCOME_MONTHS', '6'))
+
+def average_monthly_income(user_id, months=FORECAST_INCOME_MONTHS):
+    """Ingreso promedio de los últimos meses completos (sin contar el mes en curso)"""
+    primero = datetime.now().replace(day=1) - timedelta(days=1)
+    trends = fetch_trends(user_id, month_range(primero.strftime('%Y-%m'), months))
+    return sum(trends['ingresos']) / months
+
+@app.route('/api/forecast')
+@login_required
+@conditional('fixed', 'transactions')
+def get_forecast():
+    """Proyectar el balance con los gastos fijos y el ingreso promedio
+
+    Parámetros: months (horizonte, máx. 120), granularity (month|day) y
+    start_balance (saldo con el que empieza la proyección).
+    """
+    try:
+        user_id = session['user_id']
         
-        # Agrupar gastos por categoría
-        gastos_por_categoria = {}
-        for t in transactions:
-            if t['tipo'] == 'gasto':
-                categoria = t['categoria']
-                gastos_por_categoria[categoria] = gastos_por_categoria.get(categoria, 0) + abs(t['monto'])
+        try:
+            months = min(max(int(request.args.get('months', FORECAST_MONTHS_DEFAULT)), 1), FORECAST_MONTHS_MAX)
+            start_balance = float(request.args.get('start_balance', 0))
+        except ValueError:
+            return jsonify({'error': 'Parámetros inválidos'}), 400
+        granularity = request.args.get('granularity', 'month')
+        if granularity not in ('month', 'day'):
+            return jsonify({'error': 'granularity debe ser month o day'}), 400
+        
+        user_phone = get_user_phone(user_id)
+        if user_phone is None:
+            return jsonify({'error': 'Usuario no encontrado'}), 404
         
-        # Últimas 10 transacciones del mes
-        ultimas_transacciones = sorted(transactions, key=lambda x: x['fecha'], reverse=True)[:10]
+        expenses = supabase.table('Gastos fijos').select('*').eq('teléfono', user_phone).execute().data
         
-        return jsonify({
-            'total_ingresos': total_ingresos,
-            'total_gastos': total_gastos,
-            'balance': balance,
-            'gastos_por_categoria': gastos_por_categoria,
-            'ultimas_transacciones': ultimas_transacciones,
-            'mes_seleccionado': month
-        })
+        return jsonify(forecast.project(
+            expenses,
+            datetime.now().date(),
+            months,
+            average_income=average_monthly_income(user_id),
+            start_balance=start_balance,
+            granularity=granularity
+        ))
         
     except Exception as e:
-        print(f"Error en dashboard: {str(e)}")
+        logger.exception("Error en proyección")
         return jsonify({'error': str(e)}), 500
 
+# Paginación por cursor (keyset) sobre (fecha desc, id desc)
+TRANSACTIONS_PAGE_DEFAULT = 50
+TRANSACTIONS_PAGE_MAX = 200
+CURSOR_FECHA_RE = re.compile(r'^[0-9T:.+\- ]+$')
+CURSOR_ID_RE = re.compile(r'^[0-9A-Za-z\-]+$')
+
+def encode_cursor(row):
+    """Cursor opaco que apunta a la última fila entregada"""
+    raw = json.dumps([row['fecha'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Devolver (fecha, id) del cursor; ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        fecha, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError('Cursor inválido')
+    # Los valores terminan dentro de un filtro or=(...), no deben traer comillas ni paréntesis
+    if not CURSOR_FECHA_RE.match(str(fecha)) or not CURSOR_ID_RE.match(str(row_id)):
+        raise ValueError('Cursor inválido')
+    return str(fecha), str(row_id)
+
+def apply_keyset(query, after=None):
+    """Ordenar por (fecha desc, id desc) y continuar después de la fila `after`
+
+    postgrest-py 0.10 no expone or_() ni orden por varias columnas, por eso los
+    parámetros se agregan directamente.
+    """
+    if after:
+        fecha, row_id = after
+        # El lte redundante permite usar el índice (usuario_id, fecha)
+        query = query.lte('fecha', fecha)
+        query.params = query.params.add('or', f'(fecha.lt."{fecha}",and(fecha.eq."{fecha}",id.lt."{row_id}"))')
+    query.params = query.params.add('order', 'fecha.desc,id.desc')
+    return query
+
 @app.route('/api/transactions')
 @login_required
+@conditional('transactions')
 def get_transactions():
     try:
         user_id = session['user_id']
         month = request.args.get('month')
         tipo = request.args.get('tipo')
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit')
         
         query = supabase.table('Transacciones').select('*').eq('usuario_id', user_id)
         
@@ -247,60 +803,470 @@ def get_transactions():
         
         if tipo:
             query = query.eq('tipo', tipo)
-            
-        response = query.order('fecha', desc=True).execute()
         
-        return jsonify(response.data)
+        # Sin limit ni cursor se conserva la respuesta original (lista completa)
+        if limit is None and cursor is None:
+            response = query.order('fecha', desc=True).execute()
+            return jsonify(response.data)
+        
+        try:
+            limit = min(max(int(limit or TRANSACTIONS_PAGE_DEFAULT), 1), TRANSACTIONS_PAGE_MAX)
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({'error': 'Parámetros de paginación inválidos'}), 400
+        
+        # Se pide una fila extra para saber si hay otra página
+        rows = apply_keyset(query, after).limit(limit + 1).execute().data
+        
+        return jsonify({
+            'data': rows[:limit],
+            'next_cursor': encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        })
         
     except Exception as e:
+        logger.exception("Error en get_transactions")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/transactions', methods=['POST'])
+# Exportación por bloques
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '1000'))
+EXPORT_COLUMNS = ['fecha', 'tipo', 'categoria', 'monto', 'descripcion']
+
+def parse_iso_date(value):
+    """Validar una fecha YYYY-MM-DD de los parámetros; ValueError si no es válida"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def parse_date_range(args):
+    """(desde, hasta) de los parámetros month (YYYY-MM) o desde/hasta (YYYY-MM-DD, inclusivos)"""
+    month = args.get('month')
+    if month:
+        desde = parse_iso_date(f'{month}-01')
+        hasta = (desde.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return desde, hasta
+    desde = parse_iso_date(args['desde']) if args.get('desde') else None
+    hasta = parse_iso_date(args['hasta']) if args.get('hasta') else None
+    return desde, hasta
+
+def iter_transactions(user_id, desde=None, hasta=None, tipo=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Recorrer las transacciones por bloques de chunk_size (fecha desc, id desc)
+
+    Cada bloque se pide con el cursor de la última fila del anterior, así que
+    nunca hay más de un bloque en memoria.
+    """
+    after = None
+    while True:
+        query = supabase.table('Transacciones').select(','.join(['id'] + EXPORT_COLUMNS)).eq('usuario_id', user_id)
+        if desde:
+            query = query.gte('fecha', desde.isoformat())
+        if hasta:
+            query = query.lt('fecha', (hasta + timedelta(days=1)).isoformat())
+        if tipo:
+            query = query.eq('tipo', tipo)
+        
+        rows = apply_keyset(query, after).limit(chunk_size).execute().data
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        after = (rows[-1]['fecha'], rows[-1]['id'])
+
+def export_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+def export_ndjson(chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps({k: row.get(k) for k in EXPORT_COLUMNS}, ensure_ascii=False) + '\n' for row in rows)
+
+@app.route('/api/transactions/export')
 @login_required
-def add_transaction():
+def export_transactions():
+    """Exportar transacciones en CSV o NDJSON sin cargarlas completas en memoria
+
+    Parámetros: format (csv|ndjson), desde y hasta (YYYY-MM-DD, inclusivos),
+    month (YYYY-MM, atajo de desde/hasta) y tipo.
+    """
+    user_id = session['user_id']
+    fmt = request.args.get('format', 'csv')
+    tipo = request.args.get('tipo')
+    
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Formato no soportado, usa csv o ndjson'}), 400
+    
     try:
-        user_id = session['user_id']
-        data = request.get_json()
-        
-        transaction_data = {
-            'id': str(uuid.uuid4()),
-            'usuario_id': user_id,
-            'fecha': data['fecha'],
-            'categoria': data['categoria'],
-            'monto': int(float(data['monto'])),
-            'descripcion': data['descripcion'],
-            'tipo': data['tipo'],
-            'created_at': datetime.now().isoformat()
-        }
-        
-        response = supabase.table('Transacciones').insert(transaction_data).execute()
+        desde, hasta = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({'error': 'Rango de fechas inválido'}), 400
+    
+    chunks = iter_transactions(user_id, desde, hasta, tipo)
+    if fmt == 'csv':
+        body, mimetype = export_csv(chunks), 'text/csv'
+    else:
+        body, mimetype = export_ndjson(chunks), 'application/x-ndjson'
+    
+    filename = f"transacciones-{datetime.now().strftime('%Y%m%d')}.{fmt}"
+    # Un error a la mitad corta la respuesta sin el bloque final, el cliente la ve incompleta
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+REPORT_TOP_MAX = 100
+
+@app.route('/api/transactions/report')
+@login_required
+@conditional('transactions')
+def transactions_report():
+    """Totales y agrupaciones de un rango de transacciones
+
+    Parámetros: desde/hasta o month y tipo como en la exportación, group_by
+    (categoria, tipo, dia, semana y/o mes separados por comas) y top (cuántas
+    de las más recientes incluir). Las filas se leen por bloques y se agregan
+    al vuelo, así que la memoria no depende del tamaño del historial.
+    """
+    user_id = session['user_id']
+    tipo = request.args.get('tipo')
+    group_by = [d for d in request.args.get('group_by', 'categoria').split(',') if d]
+    
+    try:
+        desde, hasta = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Rango de fechas inválido'}), 400
+    
+    try:
+        top = min(max(int(request.args.get('top', 10)), 0), REPORT_TOP_MAX)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'top debe ser un número'}), 400
+    
+    try:
+        agg = aggregation.Aggregator(group_by, top_k=top)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        for rows in iter_transactions(user_id, desde, hasta, tipo):
+            agg.update(rows)
         
         return jsonify({
             'success': True,
-            'message': 'Transacción agregada exitosamente',
-            'data': response.data[0]
+            'desde': desde.isoformat() if desde else None,
+            'hasta': hasta.isoformat() if hasta else None,
+            **agg.result()
         })
         
     except Exception as e:
-        print(f"Error en add_transaction: {str(e)}")
-        print(f"Tipo de error: {type(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error en transactions_report")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/transactions/<transaction_id>', methods=['PUT'])
+# Búsqueda de transacciones
+SEARCH_LIMIT_DEFAULT = 50
+SEARCH_LIMIT_MAX = 200
+# Construcciones del índice por usuario de una en una (varias búsquedas seguidas
+# al escribir no leen el historial varias veces)
+SEARCH_BUILD_LOCKS = [threading.Lock() for _ in range(16)]
+
+# Más filas que esto por releer y conviene reconstruir el índice completo
+# (los ids van en la URL de la consulta)
+SEARCH_CATCHUP_MAX = int(os.getenv('SEARCH_CATCHUP_MAX', '100'))
+
+def catch_up_search_index(user_id, entry, version):
+    """Poner al día con `version` un índice de otra versión releyendo las filas que cambiaron
+
+    Las filas tocadas desde la versión del índice salen del registro de
+    versions.py y se piden por id en una sola consulta: las que ya no existen
+    se quitan y las demás se reemplazan. None si el registro no llega hasta
+    `version` (una importación o un cambio sin registrar en medio).
+    """
+    cambios = data_versions.changes_since(user_id, 'transactions', entry[0])
+    if cambios is None or cambios[0] != version or len(cambios[1]) > SEARCH_CATCHUP_MAX:
+        return None
+    ids = cambios[1]
+    
+    index = entry[1]
+    if ids:
+        rows = supabase.table('Transacciones').select(','.join(['id'] + EXPORT_COLUMNS)).eq('usuario_id', user_id).in_('id', sorted(ids)).execute().data
+        for row_id in ids - {str(row['id']) for row in rows}:
+            index.remove(row_id)
+        index.update(rows)
+    search_indexes.set(user_id, (version, index))
+    return index
+
+def get_search_index(user_id):
+    """Índice de búsqueda del usuario al día con su versión de transacciones"""
+    entry = search_indexes.get(user_id)
+    if entry is not None and entry[0] == data_versions.get(user_id, 'transactions'):
+        return entry[1]
+    
+    with SEARCH_BUILD_LOCKS[hash(user_id) % len(SEARCH_BUILD_LOCKS)]:
+        # Otra petición pudo haberlo construido mientras se esperaba
+        version = data_versions.get(user_id, 'transactions')
+        entry = search_indexes.get(user_id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        if entry is not None:
+            index = catch_up_search_index(user_id, entry, version)
+            if index is not None:
+                return index
+        index = search.SearchIndex()
+        for rows in iter_transactions(user_id):
+            index.update(rows)
+        search_indexes.set(user_id, (version, index))
+        return index
+
+def parse_amount(value):
+    return float(value) if value not in (None, '') else None
+
+@app.route('/api/transactions/search')
 @login_required
-def update_transaction(transaction_id):
+@conditional('transactions')
+def search_transactions():
+    """Buscar por descripción y categoría (prefijo y aproximada)
+
+    Parámetros: q, tipo, monto_min y monto_max (en valor absoluto), desde/hasta
+    o month como en la exportación, limit y fuzzy=0 para desactivar la búsqueda
+    aproximada. Responde {success, total, data} con las mejores coincidencias.
+    """
+    user_id = session['user_id']
+    
     try:
-        user_id = session['user_id']
-        data = request.get_json()
+        desde, hasta = parse_date_range(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Rango de fechas inválido'}), 400
+    
+    try:
+        monto_min = parse_amount(request.args.get('monto_min'))
+        monto_max = parse_amount(request.args.get('monto_max'))
+        limit = min(max(int(request.args.get('limit', SEARCH_LIMIT_DEFAULT)), 1), SEARCH_LIMIT_MAX)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Monto o límite inválido'}), 400
+    
+    try:
+        index = get_search_index(user_id)
+        total, rows = index.search(
+            request.args.get('q', ''),
+            tipo=request.args.get('tipo') or None,
+            monto_min=monto_min,
+            monto_max=monto_max,
+            desde=desde.isoformat() if desde else None,
+            hasta=hasta.isoformat() if hasta else None,
+            limit=limit,
+            fuzzy=request.args.get('fuzzy', '1') != '0'
+        )
+        
+        return jsonify({'success': True, 'total': total, 'data': rows})
         
-        # Verificar que la transacción pertenece al usuario
-        check_response = supabase.table('Transacciones').select('*').eq('id', transaction_id).eq('usuario_id', user_id).execute()
+    except Exception as e:
+        logger.exception("Error en search_transactions")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/transactions/<transaction_id>')
+@login_required
+@conditional('transactions')
+def get_transaction(transaction_id):
+    try:
+        user_id = session['user_id']
+        response = supabase.table('Transacciones').select('*').eq('id', transaction_id).eq('usuario_id', user_id).limit(1).execute()
         
-        if not check_response.data:
+        if not response.data:
             return jsonify({'error': 'Transacción no encontrada'}), 404
         
+        return jsonify(response.data[0])
+        
+    except Exception as e:
+        logger.exception("Error en get_transaction")
+        return jsonify({'error': str(e)}), 500
+
+def is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+def insert_client_row(table, row, client_id=None):
+    """Insertar una fila; si el id lo generó el cliente, un reintento no la duplica
+
+    Con id del cliente se usa upsert ignorando duplicados, así que devuelve []
+    cuando la fila ya existía.
+    """
+    if client_id:
+        return supabase.table(table).upsert(row, ignore_duplicates=True).execute().data
+    return supabase.table(table).insert(row).execute().data
+
+def build_transaction_row(data, user_id):
+    """Fila nueva de Transacciones a partir de los datos recibidos"""
+    return {
+        'id': str(data.get('id') or uuid.uuid4()),
+        'usuario_id': user_id,
+        'fecha': data['fecha'],
+        'categoria': data['categoria'],
+        'monto': int(float(data['monto'])),
+        'descripcion': data['descripcion'],
+        'tipo': data['tipo'],
+        'created_at': datetime.now().isoformat()
+    }
+
+# Las escrituras de transacciones y gastos fijos son funciones simples que
+# devuelven (status, cuerpo): las usan las rutas y también /api/batch
+NO_DATA = 400, {'success': False, 'error': 'No se recibieron datos'}
+
+def create_transaction(user_id, data):
+    try:
+        if not isinstance(data, dict):
+            return NO_DATA
+        
+        # El cliente puede mandar el id (UUID) para que reintentar no duplique la transacción
+        if data.get('id') and not is_uuid(data['id']):
+            return 400, {'success': False, 'error': 'id inválido'}
+        
+        transaction_data = build_transaction_row(data, user_id)
+        
+        rows = insert_client_row('Transacciones', transaction_data, data.get('id'))
+        if not rows:
+            return 200, {
+                'success': True,
+                'duplicate': True,
+                'message': 'La transacción ya estaba registrada',
+                'data': None
+            }
+        
+        # Sumar la transacción al resumen cacheado de su mes en lugar de descartarlo
+        created = rows[0]
+        transactions_changed(user_id, created=created)
+        
+        return 200, {
+            'success': True,
+            'message': 'Transacción agregada exitosamente',
+            'data': created
+        }
+        
+    except Exception as e:
+        logger.exception("Error en create_transaction")
+        return 500, {'error': str(e)}
+
+@app.route('/api/transactions', methods=['POST'])
+@login_required
+def add_transaction():
+    status, body = create_transaction(session['user_id'], request.get_json(silent=True))
+    return jsonify(body), status
+
+# Importación masiva de estados de cuenta
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+IMPORT_BATCH_MAX = 5000
+IMPORT_MAX_ERRORS = 20
+
+def existing_fingerprints(user_id, rows):
+    """Huellas de las transacciones ya guardadas en las fechas del lote
+
+    Se pide el rango entre la primera y la última fecha (no la lista de fechas,
+    que en un lote grande no cabe en la URL) y se filtra aquí.
+    """
+    fechas = {row['fecha'][:10] for row in rows}
+    desde, hasta = parse_iso_date(min(fechas)), parse_iso_date(max(fechas))
+    return {
+        importers.transaction_fingerprint(t['fecha'], t['monto'], t['descripcion'])
+        for chunk in iter_transactions(user_id, desde, hasta)
+        for t in chunk
+        if str(t['fecha'])[:10] in fechas
+    }
+
+def insert_import_batch(user_id, batch):
+    """Insertar un lote omitiendo duplicados; devuelve (insertadas, duplicadas)"""
+    seen = existing_fingerprints(user_id, batch)
+    nuevas = []
+    for row in batch:
+        huella = importers.transaction_fingerprint(row['fecha'], row['monto'], row['descripcion'])
+        if huella in seen:
+            continue
+        seen.add(huella)
+        nuevas.append(row)
+    if nuevas:
+        supabase.table('Transacciones').insert(nuevas).execute()
+    return len(nuevas), len(batch) - len(nuevas)
+
+@app.route('/api/transactions/import', methods=['POST'])
+@login_required
+def import_transactions():
+    """Importar un estado de cuenta CSV u OFX reportando el avance en NDJSON
+
+    Acepta el archivo como campo `file` de un formulario multipart o como cuerpo
+    crudo de la petición (`?format=csv|ofx`). Cada lote insertado produce una
+    línea de progreso y la última línea trae el resumen.
+    """
+    user_id = session['user_id']
+    
+    upload = request.files.get('file')
+    if upload is not None:
+        stream = upload.stream
+        fmt = request.args.get('format') or importers.detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or importers.detect_format('', request.mimetype)
+    
+    if fmt not in ('csv', 'ofx'):
+        return jsonify({'success': False, 'error': 'Formato no soportado, usa csv u ofx'}), 400
+    
+    try:
+        batch_size = min(max(int(request.args.get('batch_size', IMPORT_BATCH_SIZE)), 1), IMPORT_BATCH_MAX)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'batch_size inválido'}), 400
+    
+    def generate():
+        progreso = {'procesadas': 0, 'insertadas': 0, 'duplicadas': 0, 'errores': 0}
+        errores = []
+        batch = []
+        
+        def flush():
+            insertadas, duplicadas = insert_import_batch(user_id, batch)
+            progreso['insertadas'] += insertadas
+            progreso['duplicadas'] += duplicadas
+            batch.clear()
+            return json.dumps(progreso) + '\n'
+        
+        try:
+            for numero, raw in importers.iter_statement(importers.text_stream(stream), fmt):
+                progreso['procesadas'] += 1
+                try:
+                    # Mismas reglas de normalización que add_transaction
+                    batch.append(build_transaction_row(importers.normalize_row(raw), user_id))
+                except (KeyError, ValueError) as e:
+                    progreso['errores'] += 1
+                    if len(errores) < IMPORT_MAX_ERRORS:
+                        errores.append({'fila': numero, 'error': str(e)})
+                    continue
+                if len(batch) >= batch_size:
+                    yield flush()
+            if batch:
+                yield flush()
+        except Exception as e:
+            logger.exception("Error en import_transactions")
+            yield json.dumps({**progreso, 'success': False, 'error': str(e), 'detalle_errores': errores}) + '\n'
+            return
+        finally:
+            invalidate_user_summaries(user_id)
+        
+        yield json.dumps({
+            **progreso,
+            'success': True,
+            'message': 'Importación terminada',
+            'detalle_errores': errores
+        }) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def change_transaction(user_id, transaction_id, data):
+    try:
+        if not isinstance(data, dict):
+            return NO_DATA
+        
         update_data = {
             'fecha': data['fecha'],
             'categoria': data['categoria'],
@@ -309,133 +1275,167 @@ def update_transaction(transaction_id):
             'tipo': data['tipo']
         }
         
-        response = supabase.table('Transacciones').update(update_data).eq('id', transaction_id).execute()
+        # Filtrar por id y usuario_id en la misma sentencia verifica la propiedad:
+        # si no se actualizó ninguna fila la transacción no es del usuario
+        response = supabase.table('Transacciones').update(update_data).eq('id', transaction_id).eq('usuario_id', user_id).execute()
         
-        return jsonify({
+        if not response.data:
+            return 404, {'error': 'Transacción no encontrada'}
+        
+        # No se conoce la fecha anterior: descartar todos los meses del usuario
+        invalidate_user_summaries(user_id, updated=response.data[0])
+        
+        return 200, {
             'success': True,
             'message': 'Transacción actualizada exitosamente',
             'data': response.data[0]
-        })
+        }
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        logger.exception("Error en change_transaction")
+        return 500, {'error': str(e)}
 
-@app.route('/api/transactions/<transaction_id>', methods=['DELETE'])
+@app.route('/api/transactions/<transaction_id>', methods=['PUT'])
 @login_required
-def delete_transaction(transaction_id):
+def update_transaction(transaction_id):
+    status, body = change_transaction(session['user_id'], transaction_id, request.get_json(silent=True))
+    return jsonify(body), status
+
+def remove_transaction(user_id, transaction_id):
     try:
-        user_id = session['user_id']
+        # Borrar solo si pertenece al usuario; la respuesta trae las filas borradas
+        response = supabase.table('Transacciones').delete().eq('id', transaction_id).eq('usuario_id', user_id).execute()
         
-        # Verificar que la transacción pertenece al usuario
-        check_response = supabase.table('Transacciones').select('*').eq('id', transaction_id).eq('usuario_id', user_id).execute()
-        
-        if not check_response.data:
-            return jsonify({'error': 'Transacción no encontrada'}), 404
+        if not response.data:
+            return 404, {'error': 'Transacción no encontrada'}
         
-        response = supabase.table('Transacciones').delete().eq('id', transaction_id).execute()
+        transactions_changed(user_id, deleted=response.data[0])
         
-        return jsonify({
+        return 200, {
             'success': True,
             'message': 'Transacción eliminada exitosamente'
-        })
+        }
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        logger.exception("Error en remove_transaction")
+        return 500, {'error': str(e)}
+
+@app.route('/api/transactions/<transaction_id>', methods=['DELETE'])
+@login_required
+def delete_transaction(transaction_id):
+    status, body = remove_transaction(session['user_id'], transaction_id)
+    return jsonify(body), status
 
 @app.route('/api/fixed-expenses')
 @login_required
+@conditional('fixed')
 def get_fixed_expenses():
     try:
         user_id = session['user_id']
         # Buscar por teléfono ya que no hay usuario_id en esta tabla
-        user_response = supabase.table('Usuarios').select('telefono').eq('id', user_id).execute()
-        if not user_response.data:
+        user_phone = get_user_phone(user_id)
+        if user_phone is None:
             return jsonify({'error': 'Usuario no encontrado'}), 404
         
-        user_phone = user_response.data[0]['telefono']
         response = supabase.table('Gastos fijos').select('*').eq('teléfono', user_phone).order('día pago').execute()
         
         return jsonify(response.data)
         
     except Exception as e:
+        logger.exception("Error en get_fixed_expenses")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/fixed-expenses', methods=['POST'])
+@app.route('/api/fixed-expenses/<expense_id>')
 @login_required
-def add_fixed_expense():
+@conditional('fixed')
+def get_fixed_expense(expense_id):
     try:
         user_id = session['user_id']
-        data = request.get_json()
+        # Buscar por teléfono ya que no hay usuario_id en esta tabla
+        user_phone = get_user_phone(user_id)
+        if user_phone is None:
+            return jsonify({'error': 'Usuario no encontrado'}), 404
+        
+        response = supabase.table('Gastos fijos').select('*').eq('id', expense_id).eq('teléfono', user_phone).limit(1).execute()
+        
+        if not response.data:
+            return jsonify({'error': 'Gasto fijo no encontrado'}), 404
+        
+        return jsonify(response.data[0])
+        
+    except Exception as e:
+        logger.exception("Error en get_fixed_expense")
+        return jsonify({'error': str(e)}), 500
+
+def build_fixed_expense_row(data, user_phone):
+    """Fila nueva de Gastos fijos a partir de los datos recibidos"""
+    return {
+        'id': str(data.get('id') or uuid.uuid4()),
+        'teléfono': user_phone,
+        'día pago': int(data['dia_pago']),
+        'categoría': data['categoria'],
+        'monto': abs(int(float(data['monto']))),  # Asegurar que sea positivo
+        'descripción': data['descripcion'],
+        'frecuencia': data['frecuencia'],
+        'tipo': 'gasto_fijo'
+    }
+
+def create_fixed_expense(user_id, data):
+    try:
+        if not isinstance(data, dict):
+            return NO_DATA
+        
+        if data.get('id') and not is_uuid(data['id']):
+            return 400, {'success': False, 'error': 'id inválido'}
         
         # Obtener teléfono del usuario
-        user_response = supabase.table('Usuarios').select('telefono').eq('id', user_id).execute()
-        if not user_response.data:
-            return jsonify({'error': 'Usuario no encontrado'}), 404
-            
-        user_phone = user_response.data[0]['telefono']
+        user_phone = get_user_phone(user_id)
+        if user_phone is None:
+            return 404, {'error': 'Usuario no encontrado'}
         
-        expense_data = {
-            'id': str(uuid.uuid4()),
-            'teléfono': user_phone,
-            'día pago': int(data['dia_pago']),
-            'categoría': data['categoria'],
-            'monto': abs(int(float(data['monto']))),  # Asegurar que sea positivo
-            'descripción': data['descripcion'],
-            'frecuencia': data['frecuencia'],
-            'tipo': 'gasto_fijo'
-        }
+        expense_data = build_fixed_expense_row(data, user_phone)
         
-        response = supabase.table('Gastos fijos').insert(expense_data).execute()
+        rows = insert_client_row('Gastos fijos', expense_data, data.get('id'))
+        if not rows:
+            return 200, {
+                'success': True,
+                'duplicate': True,
+                'message': 'El gasto fijo ya estaba registrado',
+                'data': None
+            }
+        data_versions.bump(user_id, 'fixed')
         
-        return jsonify({
+        return 200, {
             'success': True,
             'message': 'Gasto fijo agregado exitosamente',
-            'data': response.data[0]
-        })
+            'data': rows[0]
+        }
         
     except Exception as e:
-        print(f"Error en add_fixed_expense: {str(e)}")
-        print(f"Tipo de error: {type(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        logger.exception("Error en create_fixed_expense")
+        return 500, {'error': str(e)}
 
-@app.route('/api/fixed-expenses/<expense_id>', methods=['PUT'])
+@app.route('/api/fixed-expenses', methods=['POST'])
 @login_required
-def update_fixed_expense(expense_id):
+def add_fixed_expense():
+    status, body = create_fixed_expense(session['user_id'], request.get_json(silent=True))
+    return jsonify(body), status
+
+def change_fixed_expense(user_id, expense_id, data):
     try:
-        user_id = session['user_id']
-        data = request.get_json()
-        
-        print(f"=== UPDATE GASTO FIJO ===")
-        print(f"expense_id: {expense_id}")
-        print(f"user_id: {user_id}")
-        print(f"data recibida: {data}")
-        
         # Validar datos de entrada
-        if not data:
-            return jsonify({'success': False, 'error': 'No se recibieron datos'}), 400
+        if not data or not isinstance(data, dict):
+            return NO_DATA
             
         required_fields = ['categoria', 'monto', 'descripcion', 'dia_pago', 'frecuencia']
         for field in required_fields:
             if field not in data:
-                return jsonify({'success': False, 'error': f'Campo requerido faltante: {field}'}), 400
+                return 400, {'success': False, 'error': f'Campo requerido faltante: {field}'}
         
         # Obtener teléfono del usuario
-        user_response = supabase.table('Usuarios').select('telefono').eq('id', user_id).execute()
-        if not user_response.data:
-            return jsonify({'success': False, 'error': 'Usuario no encontrado'}), 404
-            
-        user_phone = user_response.data[0]['telefono']
-        print(f"user_phone: {user_phone}")
-        
-        # Verificar que el gasto fijo pertenece al usuario
-        check_response = supabase.table('Gastos fijos').select('*').eq('id', expense_id).eq('teléfono', user_phone).execute()
-        
-        if not check_response.data:
-            return jsonify({'success': False, 'error': 'Gasto fijo no encontrado o no tienes permisos'}), 404
-        
-        print(f"Gasto fijo encontrado: {check_response.data[0]}")
+        user_phone = get_user_phone(user_id)
+        if user_phone is None:
+            return 404, {'success': False, 'error': 'Usuario no encontrado'}
         
         update_data = {
             'día pago': int(data['dia_pago']),
@@ -445,67 +1445,147 @@ def update_fixed_expense(expense_id):
             'frecuencia': data['frecuencia']
         }
         
-        print(f"update_data: {update_data}")
+        logs.log_payload(logger, "Actualizar gasto fijo", expense_id=expense_id, data=data, update_data=update_data)
         
-        response = supabase.table('Gastos fijos').update(update_data).eq('id', expense_id).execute()
+        # Actualizar solo si el gasto fijo pertenece al usuario (mismo filtro por teléfono)
+        response = supabase.table('Gastos fijos').update(update_data).eq('id', expense_id).eq('teléfono', user_phone).execute()
         
-        print(f"Respuesta de Supabase: {response.data}")
+        if not response.data:
+            return 404, {'success': False, 'error': 'Gasto fijo no encontrado o no tienes permisos'}
+        data_versions.bump(user_id, 'fixed')
         
-        return jsonify({
+        return 200, {
             'success': True,
             'message': 'Gasto fijo actualizado exitosamente',
-            'data': response.data[0] if response.data else None
-        })
+            'data': response.data[0]
+        }
         
     except Exception as e:
-        print(f"Error en update_fixed_expense: {str(e)}")
-        print(f"Tipo de error: {type(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'success': False, 'error': str(e)}), 500
+        logger.exception("Error en change_fixed_expense")
+        return 500, {'success': False, 'error': str(e)}
 
-@app.route('/api/fixed-expenses/<expense_id>', methods=['DELETE'])
+@app.route('/api/fixed-expenses/<expense_id>', methods=['PUT'])
 @login_required
-def delete_fixed_expense(expense_id):
+def update_fixed_expense(expense_id):
+    status, body = change_fixed_expense(session['user_id'], expense_id, request.get_json(silent=True))
+    return jsonify(body), status
+
+def remove_fixed_expense(user_id, expense_id):
     try:
-        user_id = session['user_id']
-        
         # Obtener teléfono del usuario
-        user_response = supabase.table('Usuarios').select('telefono').eq('id', user_id).execute()
-        if not user_response.data:
-            return jsonify({'error': 'Usuario no encontrado'}), 404
-            
-        user_phone = user_response.data[0]['telefono']
-        
-        # Verificar que el gasto fijo pertenece al usuario
-        check_response = supabase.table('Gastos fijos').select('*').eq('id', expense_id).eq('teléfono', user_phone).execute()
+        user_phone = get_user_phone(user_id)
+        if user_phone is None:
+            return 404, {'error': 'Usuario no encontrado'}
         
-        if not check_response.data:
-            return jsonify({'error': 'Gasto fijo no encontrado'}), 404
+        # Borrar solo si el gasto fijo pertenece al usuario
+        response = supabase.table('Gastos fijos').delete().eq('id', expense_id).eq('teléfono', user_phone).execute()
         
-        response = supabase.table('Gastos fijos').delete().eq('id', expense_id).execute()
+        if not response.data:
+            return 404, {'error': 'Gasto fijo no encontrado'}
+        data_versions.bump(user_id, 'fixed')
         
-        return jsonify({
+        return 200, {
             'success': True,
             'message': 'Gasto fijo eliminado exitosamente'
-        })
+        }
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        logger.exception("Error en remove_fixed_expense")
+        return 500, {'error': str(e)}
+
+@app.route('/api/fixed-expenses/<expense_id>', methods=['DELETE'])
+@login_required
+def delete_fixed_expense(expense_id):
+    status, body = remove_fixed_expense(session['user_id'], expense_id)
+    return jsonify(body), status
+
+# Escrituras en lote: la cola offline del service worker las reenvía en una sola petición
+BATCH_MAX_MUTATIONS = 100
+BATCH_PATH = re.compile(r'^/api/(transactions|fixed-expenses)(?:/([^/]+))?$')
+# (método, recurso, lleva id en la ruta) -> función de escritura
+BATCH_HANDLERS = {
+    ('POST', 'transactions', False): create_transaction,
+    ('PUT', 'transactions', True): change_transaction,
+    ('DELETE', 'transactions', True): remove_transaction,
+    ('POST', 'fixed-expenses', False): create_fixed_expense,
+    ('PUT', 'fixed-expenses', True): change_fixed_expense,
+    ('DELETE', 'fixed-expenses', True): remove_fixed_expense,
+}
+
+def apply_mutation(user_id, mutation):
+    """Ejecutar una mutación con la misma función que atiende la petición suelta"""
+    method = str(mutation.get('method', '')).upper()
+    path = mutation.get('path')
+    match = BATCH_PATH.match(path) if isinstance(path, str) else None
+    handler = BATCH_HANDLERS.get((method, match.group(1), match.group(2) is not None)) if match else None
+    if handler is None:
+        return 400, {'success': False, 'error': 'Mutación no permitida en un lote'}
+    
+    args = [user_id]
+    if match.group(2) is not None:
+        args.append(match.group(2))
+    if method != 'DELETE':
+        args.append(mutation.get('body'))
+    return handler(*args)
+
+@app.route('/api/batch', methods=['POST'])
+@login_required
+def apply_batch():
+    """Aplicar en orden varias escrituras de transacciones y gastos fijos
+
+    Cuerpo: {"mutations": [{"id", "method", "path", "body"}, ...]}, donde id es la
+    clave de idempotencia de cada mutación. El resultado de cada clave aplicada
+    se guarda en idempotency_store, compartido por los workers: un reintento
+    devuelve el resultado guardado sin repetir la escritura aunque llegue a otro
+    worker o después de un reinicio.
+    """
+    user_id = session['user_id']
+    data = request.get_json(silent=True) or {}
+    mutations = data.get('mutations')
+    
+    if not isinstance(mutations, list):
+        return jsonify({'success': False, 'error': 'Se esperaba una lista "mutations"'}), 400
+    if len(mutations) > BATCH_MAX_MUTATIONS:
+        return jsonify({'success': False, 'error': f'Máximo {BATCH_MAX_MUTATIONS} mutaciones por lote'}), 413
+    
+    results = []
+    for mutation in mutations:
+        if not isinstance(mutation, dict) or not mutation.get('id'):
+            results.append({'id': None, 'status': 400, 'body': {'success': False, 'error': 'Mutación sin id'}})
+            continue
+        
+        key = str(mutation['id'])
+        # Con el candado, un reintento simultáneo en otro worker espera y encuentra el resultado
+        with idempotency_store.lock(user_id):
+            guardado = idempotency_store.get(user_id, key)
+            if guardado is not None:
+                status, body = guardado
+                results.append({'id': mutation['id'], 'status': status, 'body': body, 'replayed': True})
+                continue
+            
+            status, body = apply_mutation(user_id, mutation)
+            # Los errores del servidor no se guardan: el cliente debe poder reintentarlos
+            if status < 500:
+                idempotency_store.set(user_id, key, status, body)
+        results.append({'id': mutation['id'], 'status': status, 'body': body})
+    
+    return jsonify({'success': True, 'results': results})
 
 @app.route('/api/profile')
 @login_required
+@conditional('profile')
 def get_profile():
     try:
         user_id = session['user_id']
-        response = supabase.table('Usuarios').select('*').eq('id', user_id).execute()
+        profile = get_user_profile(user_id)
         
-        if response.data:
-            return jsonify(response.data[0])
+        if profile:
+            return jsonify(profile)
         else:
             return jsonify({'error': 'Perfil no encontrado'}), 404
             
     except Exception as e:
+        logger.exception("Error en get_profile")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/profile', methods=['PUT'])
@@ -525,6 +1605,14 @@ def update_profile():
         
         response = supabase.table('Usuarios').update(update_data).eq('id', user_id).execute()
         
+        # Guardar la fila actualizada (el teléfono puede haber cambiado)
+        # El teléfono es la llave de Gastos fijos: cambia también esa versión
+        nuevas = data_versions.bump(user_id, 'profile', 'fixed')
+        if response.data:
+            profile_cache.set(user_id, (nuevas['profile'], response.data[0]))
+        else:
+            profile_cache.pop(user_id)
+        
         return jsonify({
             'success': True,
             'message': 'Perfil actualizado exitosamente',
@@ -532,6 +1620,7 @@ def update_profile():
         })
         
     except Exception as e:
+        logger.exception("Error en update_profile")
         return jsonify({'error': str(e)}), 500
 
 # Ruta auxiliar para crear/actualizar contraseña (solo para desarrollo/testing)
@@ -577,13 +1666,18 @@ def update_password():
         update_response = supabase.table('Usuarios').update({
             'password_hash': new_password_hash
         }).eq('id', user_id).execute()
+        data_versions.bump(user_id, 'profile')
+        profile_cache.pop(user_id)
         
         return jsonify({
             'success': True,
             'message': 'Contraseña actualizada exitosamente'
         })
         
+    except PasswordPoolBusy:
+        return password_pool_busy()
     except Exception as e:
+        logger.exception("Error en update_password")
         return jsonify({'error': str(e)}), 500
 
 # Función auxiliar para crear contraseña (solo para desarrollo)
@@ -608,6 +1702,10 @@ def create_user_password():
             'password_hash': password_hash
         }).eq('correo', email).execute()
         
+        for user in response.data:
+            data_versions.bump(user['id'], 'profile')
+            profile_cache.pop(user['id'])
+        
         if response.data:
             return jsonify({
                 'success': True,
@@ -619,7 +1717,10 @@ def create_user_password():
                 'message': 'Usuario no encontrado'
             }), 404
         
+    except PasswordPoolBusy:
+        return password_pool_busy()
     except Exception as e:
+        logger.exception("Error en create_user_password")
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
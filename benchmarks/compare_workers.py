@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Comparación de modos de gunicorn (sync contra gthread) con la misma carga.
+
+Ejecuta load_test.py una vez por modo, con los mismos datos, latencia y número
+de usuarios virtuales, y al final imprime una tabla con el throughput y los
+percentiles de cada uno.
+
+Uso:
+    python benchmarks/compare_workers.py --concurrency 200 --latency-ms 30 --duration 30
+    python benchmarks/compare_workers.py --modes sync:1,gthread:16,gthread:64 --json comparacion.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+
+import load_test  # noqa: E402
+
+DEFAULT_MODES = 'sync:1,gthread:32'
+DEFAULT_MIX = 'dashboard_summary=8,get_transactions=2,get_profile=1'
+
+
+def parse_modes(text):
+    """'sync:1,gthread:32' -> [('sync', 1), ('gthread', 32)]"""
+    modos = []
+    for parte in text.split(','):
+        clase, _, hilos = parte.strip().partition(':')
+        modos.append((clase, int(hilos or 1)))
+    return modos
+
+
+def totals(endpoints, duration):
+    """Totales de una corrida; los percentiles son los del peor endpoint"""
+    peticiones = sum(r['requests'] for r in endpoints.values())
+    return {
+        'requests': peticiones,
+        'errors': sum(r['errors'] for r in endpoints.values()),
+        'rps': peticiones / duration if duration else 0.0,
+        'p50_ms': max((r['p50_ms'] for r in endpoints.values()), default=0.0),
+        'p99_ms': max((r['p99_ms'] for r in endpoints.values()), default=0.0),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Comparar workers sync y gthread bajo la misma carga')
+    parser.add_argument('--modes', default=DEFAULT_MODES, help='clase:hilos separados por comas')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--latency-ms', type=float, default=30.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--warmup', type=float, default=5.0)
+    parser.add_argument('--bcrypt-rounds', type=int, default=4)
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--json', help='guardar la comparación en este archivo JSON')
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for clase, hilos in parse_modes(args.modes):
+            nombre = f'{clase}x{hilos}'
+            salida = Path(tmp) / f'{nombre}.json'
+            print(f'\n🚀 Modo {nombre}: {args.workers} workers, {args.concurrency} usuarios virtuales')
+            load_test.main([
+                '--workers', str(args.workers),
+                '--worker-class', clase,
+                '--threads', str(hilos),
+                '--concurrency', str(args.concurrency),
+                '--transactions', str(args.transactions),
+                '--latency-ms', str(args.latency_ms),
+                '--jitter-ms', str(args.jitter_ms),
+                '--duration', str(args.duration),
+                '--warmup', str(args.warmup),
+                '--bcrypt-rounds', str(args.bcrypt_rounds),
+                '--mix', args.mix,
+                '--json', str(salida),
+            ])
+            endpoints = json.loads(salida.read_text(encoding='utf-8'))['endpoints']
+            resultados[nombre] = {'totals': totals(endpoints, args.duration), 'endpoints': endpoints}
+
+    print('\n' + '=' * 70)
+    print(f'COMPARACIÓN ({args.concurrency} usuarios, latencia Supabase {args.latency_ms:.0f}ms)')
+    print('=' * 70)
+    print(f"{'modo':<16}{'req':>9}{'err':>7}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for nombre, r in resultados.items():
+        t = r['totals']
+        print(f"{nombre:<16}{t['requests']:>9}{t['errors']:>7}{t['rps']:>10.1f}{t['p50_ms']:>10.1f}{t['p99_ms']:>10.1f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'config': vars(args), 'modes': resultados}, indent=2), encoding='utf-8')
+        print(f'\nResultados guardados en {args.json}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
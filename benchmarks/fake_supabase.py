@@ -0,0 +1,677 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita la API REST de Supabase (PostgREST) para pruebas de carga.
+
+Implementa solo el subconjunto que usa app.py: select/insert/update/delete sobre
+las tablas Usuarios, Transacciones y Gastos fijos con los filtros eq, neq, gt,
+gte, lt, lte, in, like, ilike, is, or/and, order y limit, más un registro de
+funciones RPC. Los datos viven en memoria y se generan con una semilla fija.
+
+Uso:
+    python benchmarks/fake_supabase.py --port 54321 --transactions 100000 --latency-ms 30
+"""
+
+import argparse
+import bisect
+import json
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import bcrypt
+
+BENCH_PASSWORD = 'bench-password'
+
+CATEGORIAS_GASTO = ['Alimentación', 'Transporte', 'Entretenimiento', 'Salud', 'Educación',
+                    'Hogar', 'Ropa', 'Servicios', 'Otros Gastos']
+CATEGORIAS_INGRESO = ['Salario', 'Freelance', 'Inversiones', 'Bonos', 'Otros Ingresos']
+CATEGORIAS_FIJAS = ['Vivienda', 'Servicios', 'Telecomunicaciones', 'Suscripciones', 'Seguros']
+FRECUENCIAS = ['mensual', 'trimestral', 'semestral', 'anual']
+
+
+class PostgrestError(Exception):
+    """Error con el formato JSON que devuelve PostgREST"""
+
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.body = {'code': code, 'message': message, 'details': None, 'hint': None}
+
+
+# ---------------------------------------------------------------------------
+# Filtros estilo PostgREST
+# ---------------------------------------------------------------------------
+
+def split_top_level(text):
+    """Dividir por comas que no estén dentro de paréntesis o comillas"""
+    partes, actual, nivel, comillas = [], [], 0, False
+    for ch in text:
+        if ch == '"':
+            comillas = not comillas
+        elif not comillas and ch == '(':
+            nivel += 1
+        elif not comillas and ch == ')':
+            nivel -= 1
+        if ch == ',' and nivel == 0 and not comillas:
+            partes.append(''.join(actual))
+            actual = []
+        else:
+            actual.append(ch)
+    if actual:
+        partes.append(''.join(actual))
+    return partes
+
+
+def unquote_value(value):
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def coerce(sample, raw):
+    """Convertir el valor de la query al tipo de la columna almacenada"""
+    if raw == 'null':
+        return None
+    if isinstance(sample, bool):
+        return raw.lower() == 'true'
+    if isinstance(sample, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def like_to_regex(pattern, flags=0):
+    partes = (re.escape(p) for p in pattern.split('*'))
+    return re.compile('^' + '.*'.join(partes) + '$', flags | re.DOTALL)
+
+
+class Condition:
+    """Una condición `columna=operador.valor`, posiblemente negada"""
+
+    def __init__(self, column, expression):
+        self.column = column
+        self.negated = False
+        if expression.startswith('not.'):
+            self.negated = True
+            expression = expression[4:]
+        self.op, _, raw = expression.partition('.')
+        self.raw = unquote_value(raw)
+        if self.op in ('like', 'ilike'):
+            self.regex = like_to_regex(self.raw, re.IGNORECASE if self.op == 'ilike' else 0)
+        elif self.op == 'in':
+            self.values = [unquote_value(v) for v in split_top_level(self.raw.strip('()'))]
+        elif self.op not in ('eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'is'):
+            raise PostgrestError(400, 'PGRST100', f'Operador no soportado: {self.op}')
+
+    def matches(self, row):
+        result = self._matches(row.get(self.column))
+        return not result if self.negated else result
+
+    def _matches(self, value):
+        op = self.op
+        if op == 'is':
+            return value is None if self.raw == 'null' else value is (self.raw == 'true')
+        if op in ('like', 'ilike'):
+            return value is not None and bool(self.regex.match(str(value)))
+        if op == 'in':
+            return value is not None and any(value == coerce(value, v) for v in self.values)
+        if value is None:
+            return False
+        criterio = coerce(value, self.raw)
+        if op == 'eq':
+            return value == criterio
+        if op == 'neq':
+            return value != criterio
+        try:
+            if op == 'gt':
+                return value > criterio
+            if op == 'gte':
+                return value >= criterio
+            if op == 'lt':
+                return value < criterio
+            return value <= criterio
+        except TypeError:
+            return False
+
+
+class Group:
+    """Grupo lógico or(...)/and(...)"""
+
+    def __init__(self, kind, body):
+        self.kind = kind
+        self.items = [parse_group_item(item) for item in split_top_level(body)]
+
+    def matches(self, row):
+        if self.kind == 'or':
+            return any(item.matches(row) for item in self.items)
+        return all(item.matches(row) for item in self.items)
+
+
+def parse_group_item(item):
+    item = item.strip()
+    for kind in ('or', 'and'):
+        if item.startswith(kind + '(') and item.endswith(')'):
+            return Group(kind, item[len(kind) + 1:-1])
+    column, _, expression = item.partition('.')
+    return Condition(unquote_value(column), expression)
+
+
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+
+def parse_query(params):
+    """Separar los parámetros de la query en filtros y modificadores"""
+    filters, modifiers = [], {}
+    for key, value in params:
+        if key in RESERVED_PARAMS:
+            modifiers[key] = value
+        elif key in ('or', 'and'):
+            filters.append(Group(key, value.strip()[1:-1]))
+        else:
+            filters.append(Condition(unquote_value(key), value))
+    return filters, modifiers
+
+
+def parse_order(order):
+    resultado = []
+    for parte in split_top_level(order):
+        campos = parte.split('.')
+        columna = unquote_value(campos[0])
+        resultado.append((columna, 'desc' in campos[1:]))
+    return resultado
+
+
+# ---------------------------------------------------------------------------
+# Almacenamiento en memoria
+# ---------------------------------------------------------------------------
+
+class Table:
+    """Tabla en memoria particionada por una columna y ordenada por otra
+
+    Las filas de cada partición se mantienen ordenadas por (orden, id) para que
+    los rangos sobre `fecha` se resuelvan con bisect en lugar de escanear.
+    """
+
+    def __init__(self, name, partition=None, sort=None):
+        self.name = name
+        self.partition = partition
+        self.sort = sort
+        self.rows = {}
+        self.partitions = {}
+
+    def _key(self, row):
+        return (row.get(self.sort) or '', row['id'])
+
+    def _bucket(self, row):
+        return self.partitions.setdefault(row.get(self.partition), [])
+
+    def add(self, row):
+        self.rows[row['id']] = row
+        if self.partition is None:
+            return
+        bucket = self._bucket(row)
+        if self.sort:
+            bisect.insort(bucket, row, key=self._key)
+        else:
+            bucket.append(row)
+
+    def remove(self, row):
+        del self.rows[row['id']]
+        if self.partition is None:
+            return
+        bucket = self.partitions.get(row.get(self.partition), [])
+        if self.sort:
+            i = bisect.bisect_left(bucket, self._key(row), key=self._key)
+            if i < len(bucket) and bucket[i]['id'] == row['id']:
+                del bucket[i]
+                return
+        bucket.remove(row)
+
+    def candidates(self, filters):
+        """Filas candidatas usando la partición y el rango de orden si es posible"""
+        conds = [f for f in filters if isinstance(f, Condition) and not f.negated]
+        rows = None
+        if self.partition:
+            for c in conds:
+                if c.column == self.partition and c.op == 'eq':
+                    rows = self.partitions.get(c.raw, [])
+                    break
+        if rows is None:
+            return list(self.rows.values()), False
+        if not self.sort:
+            return rows, False
+        lo, hi = 0, len(rows)
+        key = lambda r: r.get(self.sort) or ''
+        for c in conds:
+            if c.column != self.sort:
+                continue
+            if c.op == 'gte':
+                lo = max(lo, bisect.bisect_left(rows, c.raw, key=key))
+            elif c.op == 'gt':
+                lo = max(lo, bisect.bisect_right(rows, c.raw, key=key))
+            elif c.op == 'lt':
+                hi = min(hi, bisect.bisect_left(rows, c.raw, key=key))
+            elif c.op == 'lte':
+                hi = min(hi, bisect.bisect_right(rows, c.raw, key=key))
+            elif c.op == 'eq':
+                lo = max(lo, bisect.bisect_left(rows, c.raw, key=key))
+                hi = min(hi, bisect.bisect_right(rows, c.raw, key=key))
+        return rows[lo:hi] if lo < hi else [], True
+
+    def select(self, filters, order=None, limit=None, offset=0):
+        rows, ordered = self.candidates(filters)
+        orden = parse_order(order) if order else []
+        matches = lambda r: all(f.matches(r) for f in filters)
+
+        # Si se pide el mismo orden que ya mantiene la partición (p. ej. `fecha desc`)
+        # se recorre directamente y se corta en `limit` sin ordenar millones de filas.
+        natural = ordered and orden and orden[0][0] == self.sort and \
+            all(col in (self.sort, 'id') and desc == orden[0][1] for col, desc in orden)
+        if natural:
+            result = []
+            for r in (reversed(rows) if orden[0][1] else rows):
+                if not matches(r):
+                    continue
+                if offset:
+                    offset -= 1
+                    continue
+                result.append(r)
+                if limit is not None and len(result) >= limit:
+                    break
+            return result
+
+        result = [r for r in rows if matches(r)]
+        for column, desc in reversed(orden):
+            result.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if offset:
+            result = result[offset:]
+        if limit is not None:
+            result = result[:limit]
+        return result
+
+
+class Store:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables = {
+            'Usuarios': Table('Usuarios'),
+            'Transacciones': Table('Transacciones', partition='usuario_id', sort='fecha'),
+            'Gastos fijos': Table('Gastos fijos', partition='teléfono'),
+            'Resumen transacciones': Table('Resumen transacciones', partition='usuario_id', sort='mes'),
+        }
+        self.rpcs = dict(RPCS)
+        # Equivalente en memoria de los triggers definidos en sql/
+        self.triggers = {'Transacciones': trigger_resumen_transacciones}
+
+    def drop_sql_objects(self):
+        """Quitar funciones, triggers y tablas de sql/ (simula una base sin instalarlos)"""
+        self.rpcs.clear()
+        self.triggers.clear()
+        self.tables.pop('Resumen transacciones', None)
+
+    def _fire(self, name, old, new):
+        trigger = self.triggers.get(name)
+        if trigger:
+            trigger(self, old, new)
+
+    def table(self, name):
+        try:
+            return self.tables[name]
+        except KeyError:
+            raise PostgrestError(404, '42P01', f'relation "public.{name}" does not exist')
+
+    def rpc(self, name):
+        try:
+            return self.rpcs[name]
+        except KeyError:
+            raise PostgrestError(404, 'PGRST202',
+                                 f'Could not find the function public.{name} in the schema cache')
+
+    def select(self, name, params):
+        filters, mods = parse_query(params)
+        limit = int(mods['limit']) if 'limit' in mods else None
+        offset = int(mods.get('offset', 0))
+        with self.lock:
+            rows = self.table(name).select(filters, mods.get('order'), limit, offset)
+            return project(rows, mods.get('select', '*'))
+
+    def insert(self, name, payload, params, prefer):
+        filas = payload if isinstance(payload, list) else [payload]
+        _, mods = parse_query(params)
+        conflicto = mods.get('on_conflict', 'id')
+        creadas = []
+        with self.lock:
+            table = self.table(name)
+            for fila in filas:
+                fila = dict(fila)
+                fila.setdefault('id', str(uuid.uuid4()))
+                existente = table.rows.get(fila['id']) if conflicto == 'id' else None
+                if existente is not None:
+                    if 'resolution=ignore-duplicates' in prefer:
+                        continue
+                    if 'resolution=merge-duplicates' in prefer:
+                        table.remove(existente)
+                        nueva = {**existente, **fila}
+                        table.add(nueva)
+                        self._fire(name, existente, nueva)
+                        creadas.append(nueva)
+                        continue
+                    raise PostgrestError(409, '23505', 'duplicate key value violates unique constraint')
+                table.add(fila)
+                self._fire(name, None, fila)
+                creadas.append(fila)
+            return project(creadas, mods.get('select', '*'))
+
+    def update(self, name, payload, params):
+        filters, mods = parse_query(params)
+        with self.lock:
+            table = self.table(name)
+            filas = table.select(filters)
+            actualizadas = []
+            for fila in filas:
+                table.remove(fila)
+                nueva = {**fila, **payload}
+                table.add(nueva)
+                self._fire(name, fila, nueva)
+                actualizadas.append(nueva)
+            return project(actualizadas, mods.get('select', '*'))
+
+    def delete(self, name, params):
+        filters, mods = parse_query(params)
+        with self.lock:
+            table = self.table(name)
+            filas = table.select(filters)
+            for fila in filas:
+                table.remove(fila)
+                self._fire(name, fila, None)
+            return project(filas, mods.get('select', '*'))
+
+
+# ---------------------------------------------------------------------------
+# Funciones RPC (equivalentes a los archivos de sql/)
+# ---------------------------------------------------------------------------
+
+def rpc_resumen_mensual(store, params):
+    filtros = [Condition('usuario_id', f"eq.{params['p_usuario_id']}"),
+               Condition('mes', f"eq.{params['p_mes']}")]
+    return project(store.tables['Resumen transacciones'].select(filtros),
+                   'tipo,categoria,total,total_abs,cantidad')
+
+
+def apply_rollup_delta(store, fila, signo):
+    resumen = store.tables['Resumen transacciones']
+    mes = str(fila['fecha'])[:7]
+    clave = f"{fila['usuario_id']}|{mes}|{fila['tipo']}|{fila['categoria']}"
+    actual = resumen.rows.get(clave)
+    if actual is None:
+        actual = {'id': clave, 'usuario_id': fila['usuario_id'], 'mes': mes, 'tipo': fila['tipo'],
+                  'categoria': fila['categoria'], 'total': 0, 'total_abs': 0, 'cantidad': 0}
+    else:
+        resumen.remove(actual)
+    actual = dict(actual,
+                  total=actual['total'] + signo * fila['monto'],
+                  total_abs=actual['total_abs'] + signo * abs(fila['monto']),
+                  cantidad=actual['cantidad'] + signo)
+    if actual['cantidad'] > 0:
+        resumen.add(actual)
+
+
+def trigger_resumen_transacciones(store, old, new):
+    if old is not None:
+        apply_rollup_delta(store, old, -1)
+    if new is not None:
+        apply_rollup_delta(store, new, 1)
+
+
+def rpc_reconstruir_resumen_transacciones(store, params):
+    usuario_id = params.get('p_usuario_id')
+    resumen = store.tables['Resumen transacciones']
+    trans = store.tables['Transacciones']
+    usuarios = [usuario_id] if usuario_id else list(trans.partitions)
+    for uid in usuarios:
+        for fila in list(resumen.partitions.get(uid, [])):
+            resumen.remove(fila)
+        for fila in trans.partitions.get(uid, []):
+            apply_rollup_delta(store, fila, 1)
+    if not usuario_id:
+        for fila in list(resumen.rows.values()):
+            if fila['usuario_id'] not in trans.partitions:
+                resumen.remove(fila)
+    return [{'filas': sum(len(resumen.partitions.get(uid, [])) for uid in usuarios)}]
+
+
+RPCS = {
+    'resumen_mensual': rpc_resumen_mensual,
+    'reconstruir_resumen_transacciones': rpc_reconstruir_resumen_transacciones,
+}
+
+
+def project(rows, select):
+    if not select or select.strip() == '*':
+        return [dict(r) for r in rows]
+    columnas = [unquote_value(c.strip()) for c in split_top_level(select)]
+    return [{c: r.get(c) for c in columnas} for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# Datos de prueba
+# ---------------------------------------------------------------------------
+
+def seed(store, users=1, transactions=1000, fixed_expenses=12, years=10,
+         bcrypt_rounds=12, rng_seed=42):
+    """Generar usuarios con transacciones y gastos fijos deterministas"""
+    rng = random.Random(rng_seed)
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'),
+                                  bcrypt.gensalt(rounds=bcrypt_rounds)).decode('utf-8')
+    hoy = date.today()
+    dias = max(1, years * 365)
+    usuarios = store.tables['Usuarios']
+    trans = store.tables['Transacciones']
+    fijos = store.tables['Gastos fijos']
+
+    for i in range(users):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        telefono = f'+5255{i:08d}'
+        usuarios.add({
+            'id': user_id,
+            'correo': f'bench{i}@example.com',
+            'full_name': f'Usuario Bench {i}',
+            'telefono': telefono,
+            'password_hash': password_hash,
+            'activo': True,
+            'reporte_diario': True,
+            'reporte_semanal': True,
+            'reporte_mensual': True,
+        })
+
+        # Construir la partición ya ordenada es mucho más rápido que insort
+        filas = []
+        for _ in range(transactions):
+            es_ingreso = rng.random() < 0.2
+            fecha = hoy - timedelta(days=rng.randrange(dias))
+            fila = {
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'usuario_id': user_id,
+                'fecha': fecha.isoformat(),
+                'categoria': rng.choice(CATEGORIAS_INGRESO if es_ingreso else CATEGORIAS_GASTO),
+                'monto': rng.randrange(1000, 30000) if es_ingreso else rng.randrange(20, 3000),
+                'descripcion': f'Movimiento {rng.randrange(100000)}',
+                'tipo': 'ingreso' if es_ingreso else 'gasto',
+                'created_at': datetime.combine(fecha, datetime.min.time()).isoformat(),
+            }
+            filas.append(fila)
+            trans.rows[fila['id']] = fila
+        filas.sort(key=trans._key)
+        trans.partitions[user_id] = filas
+
+        rpc_reconstruir_resumen_transacciones(store, {'p_usuario_id': user_id})
+
+        for _ in range(fixed_expenses):
+            fijos.add({
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'teléfono': telefono,
+                'día pago': rng.randrange(1, 29),
+                'categoría': rng.choice(CATEGORIAS_FIJAS),
+                'monto': rng.randrange(100, 5000),
+                'descripción': f'Pago fijo {rng.randrange(1000)}',
+                'frecuencia': rng.choice(FRECUENCIAS),
+                'tipo': 'gasto_fijo',
+            })
+
+
+# ---------------------------------------------------------------------------
+# Servidor HTTP
+# ---------------------------------------------------------------------------
+
+class LatencyModel:
+    """Latencia inyectada por petición: base + jitter uniforme"""
+
+    def __init__(self, base_ms=0.0, jitter_ms=0.0, seed=None):
+        self.base = base_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.rng = random.Random(seed)
+
+    def sleep(self):
+        retraso = self.base + (self.rng.random() * self.jitter if self.jitter else 0.0)
+        if retraso > 0:
+            time.sleep(retraso)
+
+
+def make_handler(store, latency, verbose=False):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            # Cabeceras y cuerpo salen en escrituras separadas; sin esto Nagle
+            # y el ACK diferido agregan ~40 ms artificiales a cada respuesta.
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+        def _route(self):
+            partes = urlsplit(self.path)
+            ruta = unquote(partes.path)
+            params = parse_qsl(partes.query, keep_blank_values=True)
+            if not ruta.startswith('/rest/v1/'):
+                raise PostgrestError(404, 'PGRST000', f'Ruta no encontrada: {ruta}')
+            return ruta[len('/rest/v1/'):], params
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return None
+            return json.loads(self.rfile.read(length))
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, method):
+            try:
+                recurso, params = self._route()
+                body = self._body()
+                latency.sleep()
+                prefer = self.headers.get('Prefer', '')
+                if recurso.startswith('rpc/'):
+                    funcion = store.rpc(recurso[4:])
+                    with store.lock:
+                        resultado = funcion(store, body or {})
+                    self._send(200, resultado)
+                elif method == 'GET':
+                    self._send(200, store.select(recurso, params))
+                elif method == 'POST':
+                    self._send(201, store.insert(recurso, body or {}, params, prefer))
+                elif method == 'PATCH':
+                    self._send(200, store.update(recurso, body or {}, params))
+                elif method == 'DELETE':
+                    self._send(200, store.delete(recurso, params))
+                else:
+                    raise PostgrestError(405, 'PGRST000', 'Método no soportado')
+            except PostgrestError as e:
+                self._send(e.status, e.body)
+            except Exception as e:
+                self._send(500, {'code': 'XX000', 'message': str(e), 'details': None, 'hint': None})
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_PATCH(self):
+            self._handle('PATCH')
+
+        def do_DELETE(self):
+            self._handle('DELETE')
+
+    return Handler
+
+
+def serve(host, port, store, latency, verbose=False):
+    server = ThreadingHTTPServer((host, port), make_handler(store, latency, verbose))
+    server.daemon_threads = True
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Supabase/PostgREST falso para pruebas de carga')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--users', type=int, default=1, help='usuarios a generar')
+    parser.add_argument('--transactions', type=int, default=1000,
+                        help='transacciones por usuario (1k a 1M)')
+    parser.add_argument('--fixed-expenses', type=int, default=12, help='gastos fijos por usuario')
+    parser.add_argument('--years', type=int, default=10, help='años de historial a repartir')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12,
+                        help='costo bcrypt de las contraseñas generadas')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='latencia base por petición')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='jitter uniforme adicional')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-rpc', action='store_true',
+                        help='no exponer funciones RPC ni el rollup (simula una base sin sql/ instalado)')
+    parser.add_argument('--verbose', action='store_true')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    store = Store()
+    if args.no_rpc:
+        store.drop_sql_objects()
+    inicio = time.perf_counter()
+    seed(store, users=args.users, transactions=args.transactions,
+         fixed_expenses=args.fixed_expenses, years=args.years,
+         bcrypt_rounds=args.bcrypt_rounds, rng_seed=args.seed)
+    print(f"Datos generados: {args.users} usuario(s) x {args.transactions} transacciones "
+          f"en {time.perf_counter() - inicio:.1f}s", flush=True)
+
+    server = serve(args.host, args.port, store,
+                   LatencyModel(args.latency_ms, args.jitter_ms, args.seed), args.verbose)
+    print(f"Supabase falso escuchando en http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
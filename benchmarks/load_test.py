@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de app:app bajo gunicorn contra el Supabase falso local.
+
+Levanta benchmarks/fake_supabase.py con los datos y la latencia pedidos, arranca
+gunicorn apuntando a él y lanza N usuarios virtuales concurrentes. Al terminar
+imprime, por endpoint, peticiones/s, percentiles de latencia e histograma.
+
+Uso:
+    python benchmarks/load_test.py --transactions 100000 --latency-ms 30 --duration 30
+    python benchmarks/load_test.py --json resultados.json
+    python benchmarks/load_test.py --baseline resultados.json --tolerance 20
+"""
+
+import argparse
+import bisect
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from fake_supabase import BENCH_PASSWORD  # noqa: E402
+
+# Clave con forma de JWT: create_client() valida el formato, no la firma
+FAKE_SUPABASE_KEY = 'bench.bench.bench'
+
+# Límites superiores de los buckets del histograma, en milisegundos
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+
+def current_month():
+    return date.today().strftime('%Y-%m')
+
+
+def random_month(rng, years):
+    hoy = date.today()
+    atras = rng.randrange(max(1, years * 12))
+    total = hoy.year * 12 + hoy.month - 1 - atras
+    return f'{total // 12:04d}-{total % 12 + 1:02d}'
+
+
+# Cada endpoint: (método, función que genera la ruta, cuerpo JSON o None)
+ENDPOINTS = {
+    'dashboard_summary': ('GET', lambda rng, a: f'/api/dashboard-summary?month={current_month()}', None),
+    'dashboard_summary_history': ('GET', lambda rng, a: f'/api/dashboard-summary?month={random_month(rng, a.years)}', None),
+    'get_trends': ('GET', lambda rng, a: '/api/trends?months=12', None),
+    'get_transactions': ('GET', lambda rng, a: f'/api/transactions?month={random_month(rng, a.years)}', None),
+    'get_transactions_all': ('GET', lambda rng, a: '/api/transactions', None),
+    'get_fixed_expenses': ('GET', lambda rng, a: '/api/fixed-expenses', None),
+    'get_profile': ('GET', lambda rng, a: '/api/profile', None),
+    'api_login': ('POST', lambda rng, a: '/api/login', 'login'),
+}
+
+DEFAULT_MIX = 'dashboard_summary=4,get_transactions=3,get_fixed_expenses=1,get_profile=1,api_login=1'
+
+
+def parse_mix(text):
+    mix = {}
+    for parte in text.split(','):
+        nombre, _, peso = parte.partition('=')
+        nombre = nombre.strip()
+        if nombre not in ENDPOINTS:
+            raise SystemExit(f'Endpoint desconocido en --mix: {nombre} (disponibles: {", ".join(ENDPOINTS)})')
+        mix[nombre] = float(peso or 1)
+    return mix
+
+
+# ---------------------------------------------------------------------------
+# Procesos auxiliares
+# ---------------------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_line(proc, marker, timeout):
+    """Esperar a que el proceso imprima una línea que contenga `marker`"""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        linea = proc.stdout.readline()
+        if not linea:
+            if proc.poll() is not None:
+                raise RuntimeError(f'El proceso terminó con código {proc.returncode}')
+            continue
+        print(f'  | {linea.rstrip()}')
+        if marker in linea:
+            return
+    raise RuntimeError(f'Tiempo agotado esperando "{marker}"')
+
+
+def wait_for_http(host, port, path, timeout):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', path)
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'La aplicación no respondió en {host}:{port}{path}')
+
+
+def start_fake_supabase(args, port):
+    cmd = [sys.executable, str(BENCH_DIR / 'fake_supabase.py'),
+           '--port', str(port),
+           '--users', str(args.users),
+           '--transactions', str(args.transactions),
+           '--fixed-expenses', str(args.fixed_expenses),
+           '--years', str(args.years),
+           '--bcrypt-rounds', str(args.bcrypt_rounds),
+           '--latency-ms', str(args.latency_ms),
+           '--jitter-ms', str(args.jitter_ms),
+           '--seed', str(args.seed)]
+    if args.no_rpc:
+        cmd.append('--no-rpc')
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    wait_for_line(proc, 'escuchando', timeout=args.startup_timeout)
+    return proc
+
+
+def server_overrides(args):
+    """Variables de gunicorn.conf.py que cambian --workers, --worker-class y --threads"""
+    overrides = {}
+    if args.workers is not None:
+        overrides['WEB_CONCURRENCY'] = str(args.workers)
+    if args.worker_class is not None:
+        overrides['GUNICORN_WORKER_CLASS'] = args.worker_class
+    if args.threads is not None:
+        overrides['GUNICORN_THREADS'] = str(args.threads)
+    return overrides
+
+
+def start_gunicorn(args, port, supabase_url):
+    env = dict(os.environ,
+               SUPABASE_URL=supabase_url,
+               SUPABASE_KEY=FAKE_SUPABASE_KEY,
+               FLASK_SECRET_KEY='bench-secret')
+    # Sin la línea de log por petición, que taparía la salida de la prueba
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    # Misma configuración que en producción (gunicorn.conf.py y sus variables de
+    # entorno); las opciones de línea de comandos solo cambian esas variables
+    env.update(server_overrides(args))
+    cmd = [sys.executable, '-m', 'gunicorn',
+           '--config', str(ROOT_DIR / 'gunicorn.conf.py'),
+           '--bind', f'127.0.0.1:{port}',
+           '--timeout', '120',
+           '--log-level', 'warning',
+           'app:app']
+    proc = subprocess.Popen(cmd, cwd=str(ROOT_DIR), env=env)
+    wait_for_http('127.0.0.1', port, '/login', timeout=args.startup_timeout)
+    return proc
+
+
+def stop(proc):
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ---------------------------------------------------------------------------
+# Usuarios virtuales
+# ---------------------------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            if ok:
+                self.samples.setdefault(endpoint, []).append(seconds)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index, args, host, port, mix, recorder, start_at, stop_at):
+        super().__init__(daemon=True)
+        self.args = args
+        self.host = host
+        self.port = port
+        self.rng = random.Random(args.seed + index)
+        self.email = f'bench{index % args.users}@example.com'
+        self.names = list(mix)
+        self.weights = [mix[n] for n in self.names]
+        self.recorder = recorder
+        self.start_at = start_at
+        self.stop_at = stop_at
+        self.cookie = None
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.args.request_timeout)
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            resp = self.conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+        cookie = resp.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return resp.status
+
+    def login_body(self):
+        return {'email': self.email, 'password': BENCH_PASSWORD}
+
+    def run(self):
+        try:
+            if self.request('POST', '/api/login', self.login_body()) != 200:
+                self.recorder.record('api_login', 0, False)
+                return
+        except Exception:
+            self.recorder.record('api_login', 0, False)
+            return
+
+        while True:
+            ahora = time.monotonic()
+            if ahora >= self.stop_at:
+                break
+            nombre = self.rng.choices(self.names, self.weights)[0]
+            method, path_fn, body = ENDPOINTS[nombre]
+            path = path_fn(self.rng, self.args)
+            inicio = time.perf_counter()
+            try:
+                status = self.request(method, path, self.login_body() if body == 'login' else None)
+                ok = 200 <= status < 300
+            except Exception:
+                ok = False
+            duracion = time.perf_counter() - inicio
+            # Las muestras del calentamiento se descartan
+            if ahora >= self.start_at:
+                self.recorder.record(nombre, duracion, ok)
+        if self.conn:
+            self.conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Reporte
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(recorder, duration):
+    resumen = {}
+    for nombre in sorted(set(recorder.samples) | set(recorder.errors)):
+        valores = sorted(recorder.samples.get(nombre, []))
+        ms = [v * 1000 for v in valores]
+        histograma = [0] * len(BUCKETS_MS)
+        for v in ms:
+            histograma[bisect.bisect_left(BUCKETS_MS, v)] += 1
+        resumen[nombre] = {
+            'requests': len(valores),
+            'errors': recorder.errors.get(nombre, 0),
+            'rps': len(valores) / duration if duration else 0.0,
+            'p50_ms': percentile(ms, 50),
+            'p90_ms': percentile(ms, 90),
+            'p99_ms': percentile(ms, 99),
+            'max_ms': ms[-1] if ms else 0.0,
+            'histogram': {('inf' if b == float('inf') else str(b)): c
+                          for b, c in zip(BUCKETS_MS, histograma)},
+        }
+    return resumen
+
+
+def print_report(resumen, duration):
+    total = sum(r['requests'] for r in resumen.values())
+    print('\n' + '=' * 78)
+    print(f'RESULTADOS ({duration:.1f}s medidos, {total} peticiones, {total / duration:.1f} req/s)')
+    print('=' * 78)
+    print(f"{'endpoint':<28}{'req':>7}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for nombre, r in resumen.items():
+        print(f"{nombre:<28}{r['requests']:>7}{r['errors']:>6}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+    for nombre, r in resumen.items():
+        if not r['requests']:
+            continue
+        print(f'\n{nombre}  (latencia en ms)')
+        mayor = max(r['histogram'].values()) or 1
+        anterior = '0'
+        for limite, cuenta in r['histogram'].items():
+            if cuenta:
+                barra = '#' * max(1, int(40 * cuenta / mayor))
+                print(f'  {anterior:>5} - {limite:<5} {cuenta:>7} {barra}')
+            anterior = limite
+
+
+def compare_with_baseline(resumen, baseline_path, tolerance):
+    """Comparar contra una corrida previa; devuelve la lista de regresiones"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding='utf-8'))['endpoints']
+    regresiones = []
+    for nombre, actual in resumen.items():
+        previo = baseline.get(nombre)
+        if not previo or not previo['requests']:
+            continue
+        limite = 1 + tolerance / 100.0
+        if actual['p99_ms'] > previo['p99_ms'] * limite:
+            regresiones.append(f"{nombre}: p99 {previo['p99_ms']:.1f}ms -> {actual['p99_ms']:.1f}ms")
+        if actual['rps'] * limite < previo['rps']:
+            regresiones.append(f"{nombre}: req/s {previo['rps']:.1f} -> {actual['rps']:.1f}")
+        if actual['errors'] > previo['errors']:
+            regresiones.append(f"{nombre}: errores {previo['errors']} -> {actual['errors']}")
+    return regresiones
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Prueba de carga de la API contra un Supabase falso')
+    datos = parser.add_argument_group('datos y latencia del Supabase falso')
+    datos.add_argument('--users', type=int, default=1)
+    datos.add_argument('--transactions', type=int, default=10000, help='transacciones por usuario (1k a 1M)')
+    datos.add_argument('--fixed-expenses', type=int, default=12)
+    datos.add_argument('--years', type=int, default=10)
+    datos.add_argument('--bcrypt-rounds', type=int, default=12)
+    datos.add_argument('--latency-ms', type=float, default=20.0)
+    datos.add_argument('--jitter-ms', type=float, default=10.0)
+    datos.add_argument('--seed', type=int, default=42)
+    datos.add_argument('--no-rpc', action='store_true', help='simular una base sin las funciones de sql/')
+
+    servidor = parser.add_argument_group('servidor de la aplicación')
+    servidor.add_argument('--app-url', help='usar una instancia ya levantada (host:puerto) en vez de gunicorn')
+    servidor.add_argument('--workers', type=int, help='por defecto WEB_CONCURRENCY de gunicorn.conf.py')
+    servidor.add_argument('--worker-class', help='por defecto gthread, como en producción (gunicorn.conf.py)')
+    servidor.add_argument('--threads', type=int, help='hilos por worker gthread (por defecto GUNICORN_THREADS)')
+    servidor.add_argument('--startup-timeout', type=float, default=600.0)
+
+    carga = parser.add_argument_group('carga')
+    carga.add_argument('--concurrency', type=int, default=16, help='usuarios virtuales')
+    carga.add_argument('--duration', type=float, default=20.0, help='segundos medidos')
+    carga.add_argument('--warmup', type=float, default=3.0, help='segundos de calentamiento descartados')
+    carga.add_argument('--mix', default=DEFAULT_MIX, help='endpoint=peso separados por comas')
+    carga.add_argument('--request-timeout', type=float, default=120.0)
+
+    salida = parser.add_argument_group('salida')
+    salida.add_argument('--json', help='guardar resultados en este archivo JSON')
+    salida.add_argument('--baseline', help='JSON de una corrida previa para detectar regresiones')
+    salida.add_argument('--tolerance', type=float, default=20.0,
+                        help='porcentaje de empeoramiento permitido frente al baseline')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    mix = parse_mix(args.mix)
+    fake = app = None
+    try:
+        if args.app_url:
+            host, _, port = args.app_url.partition(':')
+            port = int(port or 80)
+        else:
+            fake_port, port, host = free_port(), free_port(), '127.0.0.1'
+            print(f'Levantando Supabase falso ({args.transactions} transacciones/usuario)...')
+            fake = start_fake_supabase(args, fake_port)
+            cambios = ', '.join(f'{k}={v}' for k, v in server_overrides(args).items())
+            print(f"Levantando gunicorn con gunicorn.conf.py{f' ({cambios})' if cambios else ''}...")
+            app = start_gunicorn(args, port, f'http://127.0.0.1:{fake_port}')
+
+        recorder = Recorder()
+        inicio = time.monotonic()
+        start_at = inicio + args.warmup
+        stop_at = start_at + args.duration
+        usuarios = [VirtualUser(i, args, host, port, mix, recorder, start_at, stop_at)
+                    for i in range(args.concurrency)]
+        print(f'Ejecutando {args.concurrency} usuarios virtuales durante {args.warmup + args.duration:.0f}s...')
+        for u in usuarios:
+            u.start()
+        for u in usuarios:
+            u.join()
+    finally:
+        stop(app)
+        stop(fake)
+
+    resumen = summarize(recorder, args.duration)
+    print_report(resumen, args.duration)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            'config': {k: v for k, v in vars(args).items() if k not in ('json', 'baseline')},
+            'endpoints': resumen,
+        }, indent=2), encoding='utf-8')
+        print(f'\nResultados guardados en {args.json}')
+
+    if args.baseline:
+        regresiones = compare_with_baseline(resumen, args.baseline, args.tolerance)
+        if regresiones:
+            print(f'\n❌ Regresiones mayores a {args.tolerance:.0f}%:')
+            for r in regresiones:
+                print(f'   - {r}')
+            return 1
+        print(f'\n✅ Sin regresiones frente a {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
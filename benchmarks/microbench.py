@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks de las rutas calientes en Python puro (sin red ni Supabase).
+
+Mide las funciones de app.py que hacen trabajo de CPU en cada petición:
+
+- dashboard_summary: agregación de build_month_summary sobre N transacciones
+- aggregation: motor de aggregation.py agrupando por categoría, día y semana,
+  con el recorrido en Python y con numpy
+- verify_password: bcrypt contra hashes Werkzeug heredados (pasando por el pool)
+- validate_transaction / validate_fixed_expense: validación y normalización
+  del JSON recibido en add_transaction y add_fixed_expense
+- jsonify: serialización de listas grandes de transacciones
+
+Cada caso se repite varias veces y se reporta la mediana. Con --json se guarda
+la corrida y con --baseline se compara contra una anterior: si algún caso es más
+lento que el baseline por encima de --tolerance por ciento, sale con código 1.
+
+Uso:
+    python benchmarks/microbench.py --baseline benchmarks/microbench-baseline.json --tolerance 20
+    python benchmarks/microbench.py --json benchmarks/microbench-baseline.json
+    python benchmarks/microbench.py --only dashboard --rows 10000,100000,1000000
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import timeit
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(ROOT_DIR))
+
+# app.py necesita estas variables al importarse; el cliente de Supabase no se
+# conecta hasta el primer uso, así que no hace falta un servidor
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SUPABASE_KEY', 'bench.bench.bench')
+os.environ.setdefault('FLASK_SECRET_KEY', 'microbench')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import aggregation  # noqa: E402
+import app as app_module  # noqa: E402
+import passwords  # noqa: E402
+from fake_supabase import BENCH_PASSWORD, CATEGORIAS_FIJAS, CATEGORIAS_GASTO, CATEGORIAS_INGRESO, FRECUENCIAS  # noqa: E402
+
+DEFAULT_ROWS = '10000,100000,1000000'
+DEFAULT_JSONIFY_ROWS = '1000,10000,100000'
+DEFAULT_PAYLOADS = 10000
+BENCHMARKS = ('dashboard', 'aggregation', 'verify_password', 'validate', 'jsonify')
+
+
+# ---------------------------------------------------------------------------
+# Datos sintéticos
+# ---------------------------------------------------------------------------
+
+def synthetic_transactions(count, month, rng):
+    """Transacciones de un mes con la misma forma que las filas de Supabase"""
+    inicio = date.fromisoformat(f'{month}-01')
+    filas = []
+    for _ in range(count):
+        es_ingreso = rng.random() < 0.2
+        fecha = inicio + timedelta(days=rng.randrange(28))
+        filas.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'usuario_id': 'bench',
+            'fecha': fecha.isoformat(),
+            'categoria': rng.choice(CATEGORIAS_INGRESO if es_ingreso else CATEGORIAS_GASTO),
+            'monto': rng.randrange(1000, 30000) if es_ingreso else rng.randrange(20, 3000),
+            'descripcion': f'Movimiento {rng.randrange(100000)}',
+            'tipo': 'ingreso' if es_ingreso else 'gasto',
+            'created_at': datetime.combine(fecha, datetime.min.time()).isoformat(),
+        })
+    return filas
+
+
+def synthetic_transaction_payloads(count, rng):
+    """Cuerpos JSON como los que manda el formulario (la mitad con id del cliente)"""
+    return [{
+        'id': str(uuid.UUID(int=rng.getrandbits(128))) if i % 2 else None,
+        'fecha': (date(2024, 1, 1) + timedelta(days=rng.randrange(365))).isoformat(),
+        'categoria': rng.choice(CATEGORIAS_GASTO),
+        'monto': f'{rng.randrange(20, 3000)}.{rng.randrange(100):02d}',
+        'descripcion': f'Movimiento {rng.randrange(100000)}',
+        'tipo': 'gasto',
+    } for i in range(count)]
+
+
+def synthetic_expense_payloads(count, rng):
+    return [{
+        'id': str(uuid.UUID(int=rng.getrandbits(128))) if i % 2 else None,
+        'dia_pago': str(rng.randrange(1, 29)),
+        'categoria': rng.choice(CATEGORIAS_FIJAS),
+        'monto': str(-rng.randrange(100, 5000) if i % 5 == 0 else rng.randrange(100, 5000)),
+        'descripcion': f'Pago fijo {rng.randrange(1000)}',
+        'frecuencia': rng.choice(FRECUENCIAS),
+    } for i in range(count)]
+
+
+# ---------------------------------------------------------------------------
+# Casos
+# ---------------------------------------------------------------------------
+
+def parse_sizes(text):
+    """'10000,100000' -> [10000, 100000]"""
+    return [int(parte) for parte in text.split(',') if parte.strip()]
+
+
+def dashboard_cases(args, rng):
+    month = '2024-03'
+    for n in parse_sizes(args.rows):
+        filas = synthetic_transactions(n, month, rng)
+        yield f'dashboard_summary[{n}]', n, lambda filas=filas: app_module.build_month_summary(filas, month)
+
+
+def aggregation_cases(args, rng):
+    month = '2024-03'
+    group_by = ('categoria', 'dia', 'semana')
+    for n in parse_sizes(args.rows):
+        filas = synthetic_transactions(n, month, rng)
+        for engine in ('python', 'numpy'):
+            yield (f'aggregation[{engine}:{n}]', n,
+                   lambda filas=filas, engine=engine: aggregation.summarize(filas, group_by, engine=engine))
+
+
+def verify_password_cases(args, rng):
+    bcrypt_hash = passwords._hash(BENCH_PASSWORD, args.bcrypt_rounds)
+    werkzeug_hash = generate_password_hash(BENCH_PASSWORD, method=args.werkzeug_method)
+    yield f'verify_password[bcrypt:{args.bcrypt_rounds}]', 1, lambda: passwords.verify_password(BENCH_PASSWORD, bcrypt_hash)
+    yield f'verify_password[{args.werkzeug_method}]', 1, lambda: passwords.verify_password(BENCH_PASSWORD, werkzeug_hash)
+
+
+def validate_cases(args, rng):
+    transacciones = synthetic_transaction_payloads(args.payloads, rng)
+    gastos = synthetic_expense_payloads(args.payloads, rng)
+
+    def validate_transactions():
+        # Lo mismo que hace create_transaction antes de insertar
+        for data in transacciones:
+            if data.get('id') and not app_module.is_uuid(data['id']):
+                raise ValueError('id inválido')
+            app_module.build_transaction_row(data, 'bench')
+
+    def validate_fixed_expenses():
+        for data in gastos:
+            if data.get('id') and not app_module.is_uuid(data['id']):
+                raise ValueError('id inválido')
+            app_module.build_fixed_expense_row(data, '+5255000000')
+
+    yield f'validate_transaction[{args.payloads}]', args.payloads, validate_transactions
+    yield f'validate_fixed_expense[{args.payloads}]', args.payloads, validate_fixed_expenses
+
+
+def jsonify_cases(args, rng):
+    filas = synthetic_transactions(max(parse_sizes(args.jsonify_rows), default=0), '2024-03', rng)
+    for n in parse_sizes(args.jsonify_rows):
+        def serialize(data=filas[:n]):
+            # get_data() incluye la serialización completa del cuerpo
+            with app_module.app.app_context():
+                return app_module.jsonify({'transactions': data, 'next_cursor': None}).get_data()
+        yield f'jsonify[{n}]', n, serialize
+
+
+CASES = {
+    'dashboard': dashboard_cases,
+    'aggregation': aggregation_cases,
+    'verify_password': verify_password_cases,
+    'validate': validate_cases,
+    'jsonify': jsonify_cases,
+}
+
+
+def measure(fn, repeat, min_time):
+    """Mediana y mínimo en ms por llamada; cada repetición dura al menos min_time s"""
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    tiempos = [t / number * 1000 for t in timer.repeat(repeat, number)]
+    return {'median_ms': statistics.median(tiempos), 'min_ms': min(tiempos), 'loops': number}
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    seleccion = [nombre for nombre in BENCHMARKS if not args.only or nombre in args.only]
+    resultados = {}
+    for grupo in seleccion:
+        for nombre, items, fn in CASES[grupo](args, rng):
+            print(f'⏱️  {nombre}...', flush=True)
+            r = measure(fn, args.repeat, args.min_time)
+            r['items'] = items
+            r['items_per_s'] = items / (r['median_ms'] / 1000) if r['median_ms'] else 0.0
+            resultados[nombre] = r
+    return resultados
+
+
+def print_report(resultados):
+    print(f"\n   {'caso':<36}{'mediana ms':>12}{'mín ms':>12}{'elementos/s':>16}")
+    for nombre, r in resultados.items():
+        print(f"   {nombre:<36}{r['median_ms']:>12.3f}{r['min_ms']:>12.3f}{r['items_per_s']:>16,.0f}")
+
+
+def compare_with_baseline(resultados, baseline_path, tolerance):
+    """Comparar medianas contra una corrida previa
+
+    Devuelve (regresiones, casos que no están en el baseline).
+    """
+    baseline = json.loads(Path(baseline_path).read_text(encoding='utf-8'))['benchmarks']
+    limite = 1 + tolerance / 100.0
+    regresiones = []
+    sin_baseline = []
+    for nombre, actual in resultados.items():
+        previo = baseline.get(nombre)
+        if not previo:
+            sin_baseline.append(nombre)
+            continue
+        if actual['median_ms'] > previo['median_ms'] * limite:
+            cambio = actual['median_ms'] / previo['median_ms'] - 1
+            regresiones.append(f"{nombre}: {previo['median_ms']:.3f}ms -> {actual['median_ms']:.3f}ms (+{cambio:.0%})")
+    return regresiones, sin_baseline
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Microbenchmarks de las rutas calientes de app.py')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='correr solo estos grupos')
+    parser.add_argument('--rows', default=DEFAULT_ROWS, help='transacciones del mes para dashboard_summary y aggregation')
+    parser.add_argument('--jsonify-rows', default=DEFAULT_JSONIFY_ROWS, help='tamaños de lista para jsonify')
+    parser.add_argument('--payloads', type=int, default=DEFAULT_PAYLOADS, help='cuerpos JSON por repetición al validar')
+    parser.add_argument('--bcrypt-rounds', type=int, default=passwords.BCRYPT_ROUNDS)
+    parser.add_argument('--werkzeug-method', default='pbkdf2:sha256', help='método de los hashes heredados')
+    parser.add_argument('--repeat', type=int, default=5, help='repeticiones por caso (se reporta la mediana)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='segundos mínimos por repetición')
+    parser.add_argument('--seed', type=int, default=42)
+
+    salida = parser.add_argument_group('salida')
+    salida.add_argument('--json', help='guardar resultados en este archivo JSON')
+    salida.add_argument('--baseline', help='JSON de una corrida previa para detectar regresiones')
+    salida.add_argument('--tolerance', type=float, default=20.0,
+                        help='porcentaje de empeoramiento permitido frente al baseline')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    resultados = run(args)
+    print_report(resultados)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            'config': {k: v for k, v in vars(args).items() if k not in ('json', 'baseline')},
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'benchmarks': resultados,
+        }, indent=2), encoding='utf-8')
+        print(f'\nResultados guardados en {args.json}')
+
+    if args.baseline:
+        regresiones, sin_baseline = compare_with_baseline(resultados, args.baseline, args.tolerance)
+        if sin_baseline:
+            # Otros --rows, --payloads o --bcrypt-rounds cambian el nombre de los casos
+            print(f'\n⚠️  Casos sin equivalente en {args.baseline} (no se compararon):')
+            for nombre in sin_baseline:
+                print(f'   - {nombre}')
+        if len(sin_baseline) == len(resultados):
+            print(f'\n❌ Ningún caso coincide con {args.baseline}; corre con la misma configuración')
+            return 1
+        if regresiones:
+            print(f'\n❌ Regresiones mayores a {args.tolerance:.0f}%:')
+            for r in regresiones:
+                print(f'   - {r}')
+            return 1
+        comparados = len(resultados) - len(sin_baseline)
+        print(f'\n✅ Sin regresiones frente a {args.baseline} ({comparados} de {len(resultados)} casos comparados)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
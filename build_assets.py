@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Build de archivos estáticos para producción
+
+    python build_assets.py
+
+1. Iconos: genera en static/icons/ los tamaños de ICON_SIZES que falten,
+   redimensionando icon-512x512.png (o dibujando uno provisional si no existe).
+   Reemplaza al antiguo create_icons.py.
+2. Minifica CSS y JS, agrega un hash del contenido al nombre
+   (css/style.css -> css/style.3f9a1c2b7d.css) y lo copia a static/dist/.
+3. Precomprime cada archivo de texto en .gz y, si está instalado el paquete
+   brotli, en .br.
+4. Escribe static/dist/manifest.json con la correspondencia nombre original ->
+   nombre con hash. app.py lo usa en asset_url() para las plantillas y para la
+   lista de precache del service worker, y sirve static/dist/ con caché
+   inmutable de un año: un archivo solo cambia de nombre, nunca de contenido.
+
+Dependencias opcionales (requirements-build.txt): Pillow para los iconos PNG,
+brotli para .br y rjsmin/rcssmin para una minificación más agresiva. Sin ellas
+se usan alternativas conservadoras.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+ICON_SIZES = (72, 96, 128, 144, 152, 192, 384, 512)
+ICON_COLOR = (79, 70, 229)
+
+# Archivos que no pasan por el build: sw.js se sirve en /sw.js con su propia versión
+EXCLUDE = {'js/sw.js'}
+EXCLUDE_EXTENSIONS = {'.md', '.gz', '.br'}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ---------------------------------------------------------------------------
+# Iconos
+# ---------------------------------------------------------------------------
+
+def create_svg_icon(size, output_path):
+    """Crear un icono SVG provisional y guardarlo como archivo"""
+    svg_content = f'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="{size}" height="{size}" xmlns="http://www.w3.org/2000/svg">
+    <defs>
+        <linearGradient id="grad1" x1="0%" y1="0%" x2="100%" y2="100%">
+            <stop offset="0%" style="stop-color:#4f46e5;stop-opacity:1" />
+            <stop offset="100%" style="stop-color:#7c3aed;stop-opacity:1" />
+        </linearGradient>
+    </defs>
+    <rect width="{size}" height="{size}" fill="url(#grad1)" rx="{size * 0.1:.0f}"/>
+    <text x="50%" y="50%" font-family="Arial, sans-serif" font-size="{size * 0.6:.0f}"
+          font-weight="bold" fill="white" text-anchor="middle" dominant-baseline="middle">$</text>
+</svg>'''
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(svg_content)
+
+
+def draw_png_icon(Image, ImageDraw, ImageFont, size):
+    """Icono PNG provisional: fondo del color del tema con el símbolo $"""
+    img = Image.new('RGB', (size, size), color=ICON_COLOR)
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.truetype("arial.ttf", int(size * 0.5))
+    except OSError:
+        font = ImageFont.load_default()
+    bbox = draw.textbbox((0, 0), "$", font=font)
+    position = ((size - (bbox[2] - bbox[0])) // 2, (size - (bbox[3] - bbox[1])) // 2 - int(size * 0.05))
+    draw.text(position, "$", fill=(255, 255, 255), font=font)
+    return img
+
+
+def build_icons(force=False):
+    """Generar los tamaños de icono que falten; devuelve las rutas creadas"""
+    icons_dir = os.path.join(STATIC_DIR, 'icons')
+    os.makedirs(icons_dir, exist_ok=True)
+    creados = []
+
+    def png_path(size):
+        return os.path.join(icons_dir, f'icon-{size}x{size}.png')
+
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        # Sin Pillow solo se pueden crear SVG provisionales para los tamaños sin PNG
+        for size in ICON_SIZES:
+            svg = os.path.join(icons_dir, f'icon-{size}x{size}.svg')
+            if not os.path.exists(png_path(size)) and (force or not os.path.exists(svg)):
+                create_svg_icon(size, svg)
+                creados.append(svg)
+        return creados
+
+    # Todos los tamaños salen del icono más grande, que puede ser un diseño propio
+    maestro = png_path(max(ICON_SIZES))
+    if force or not os.path.exists(maestro):
+        draw_png_icon(Image, ImageDraw, ImageFont, max(ICON_SIZES)).save(maestro, 'PNG', optimize=True)
+        creados.append(maestro)
+    with Image.open(maestro) as original:
+        original = original.convert('RGBA')
+        for size in ICON_SIZES:
+            destino = png_path(size)
+            if force or not os.path.exists(destino):
+                original.resize((size, size), Image.LANCZOS).save(destino, 'PNG', optimize=True)
+                creados.append(destino)
+    return creados
+
+
+# ---------------------------------------------------------------------------
+# Minificación
+# ---------------------------------------------------------------------------
+
+def minify_css(text):
+    """Quitar comentarios y espacios sobrantes de una hoja de estilos"""
+    try:
+        import rcssmin
+        return rcssmin.cssmin(text)
+    except ImportError:
+        pass
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """Minificación conservadora de JavaScript
+
+    Con rjsmin instalado se usa ese; si no, solo se quitan la sangría, las
+    líneas vacías y los comentarios de línea completa, sin tocar el interior
+    de los template literals.
+    """
+    try:
+        import rjsmin
+        return rjsmin.jsmin(text)
+    except ImportError:
+        pass
+    lineas = []
+    en_template = False
+    for linea in text.splitlines():
+        if en_template:
+            lineas.append(linea)
+        else:
+            limpia = linea.strip()
+            if limpia and not limpia.startswith('//'):
+                lineas.append(limpia)
+        # Un número impar de backticks abre o cierra un template literal de varias líneas
+        if (linea.count('`') - linea.count('\\`')) % 2:
+            en_template = not en_template
+    return '\n'.join(lineas) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def iter_sources():
+    """Rutas relativas (con /) de los archivos de static/ que entran al build"""
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != DIST_DIR)
+        for name in sorted(files):
+            relativa = os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/')
+            if relativa not in EXCLUDE and os.path.splitext(name)[1] not in EXCLUDE_EXTENSIONS:
+                yield relativa
+
+
+def hashed_name(relativa, contenido):
+    """css/style.css -> css/style.<hash>.css"""
+    base, ext = os.path.splitext(relativa)
+    return f'{base}.{hashlib.sha256(contenido).hexdigest()[:10]}{ext}'
+
+
+def write_file(path, contenido):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(contenido)
+
+
+def compress(path, contenido):
+    """Escribir .gz y .br junto al archivo si resultan más chicos; devuelve sus tamaños"""
+    tamaños = {}
+    # mtime=0: el mismo contenido produce siempre el mismo .gz
+    gz = gzip.compress(contenido, compresslevel=9, mtime=0)
+    if len(gz) < len(contenido):
+        write_file(path + '.gz', gz)
+        tamaños['gzip'] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(contenido, quality=11)
+        if len(br) < len(contenido):
+            write_file(path + '.br', br)
+            tamaños['br'] = len(br)
+    return tamaños
+
+
+def build(dist_dir=DIST_DIR):
+    """Construir static/dist/ y su manifiesto; devuelve (manifiesto, reporte)"""
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    files = {}
+    reporte = []
+    for relativa in iter_sources():
+        with open(os.path.join(STATIC_DIR, relativa), 'rb') as f:
+            original = f.read()
+        ext = os.path.splitext(relativa)[1]
+        contenido = original
+        if ext in MINIFIERS:
+            contenido = MINIFIERS[ext](original.decode('utf-8')).encode('utf-8')
+
+        destino = hashed_name(relativa, contenido)
+        path = os.path.join(dist_dir, destino)
+        write_file(path, contenido)
+        tamaños = compress(path, contenido) if ext in COMPRESSIBLE else {}
+        files[relativa] = destino
+        reporte.append((relativa, len(original), len(contenido), tamaños))
+
+    manifest = {
+        'version': hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()[:12],
+        'files': files,
+    }
+    # El manifiesto va al final: si el build falla a medias, la app sigue usando /static/
+    write_file(os.path.join(dist_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest, reporte
+
+
+def print_report(reporte):
+    print(f"\n   {'archivo':<32}{'original':>10}{'minif.':>10}{'gzip':>10}{'br':>10}")
+    totales = [0, 0, 0, 0]
+    for relativa, original, minificado, tamaños in reporte:
+        gz = tamaños.get('gzip', minificado)
+        br = tamaños.get('br', gz)
+        totales = [totales[0] + original, totales[1] + minificado, totales[2] + gz, totales[3] + br]
+        print(f"   {relativa:<32}{original:>10}{minificado:>10}{gz:>10}{br:>10}")
+    print(f"   {'TOTAL':<32}{totales[0]:>10}{totales[1]:>10}{totales[2]:>10}{totales[3]:>10}")
+    if totales[0]:
+        print(f"\n📉 Bytes transferidos en la primera visita: {totales[3] / totales[0]:.0%} del original")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build de archivos estáticos (iconos, minificación, hash y compresión)')
+    parser.add_argument('--skip-icons', action='store_true', help='no generar iconos')
+    parser.add_argument('--force-icons', action='store_true', help='regenerar todos los iconos, incluido el de 512')
+    args = parser.parse_args(argv)
+
+    if not args.skip_icons:
+        print("🎨 Generando iconos PWA...")
+        creados = build_icons(force=args.force_icons)
+        for path in creados:
+            print(f"  ✅ Creado: {os.path.relpath(path)}")
+        if not creados:
+            print("  ✅ Todos los tamaños ya existen")
+
+    print("📦 Minificando, agregando hash y comprimiendo static/...")
+    if brotli is None:
+        print("⚠️  brotli no está instalado: solo se generan .gz (pip install -r requirements-build.txt)")
+    manifest, reporte = build()
+    print_report(reporte)
+    print(f"\n✅ {len(manifest['files'])} archivos en {os.path.relpath(DIST_DIR)} (versión {manifest['version']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
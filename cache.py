@@ -0,0 +1,113 @@
+"""
+Caché en memoria con expulsión LRU y expiración por tiempo (TTL)
+
+Cada worker de gunicorn tiene su propia instancia. Lo que se cachea de datos
+de un usuario se guarda junto con la versión de esos datos (versions.py) y se
+descarta al leerlo si la versión actual es otra, así que una escritura hecha en
+cualquier worker que comparta DATA_VERSION_DIR (por defecto, los de la misma
+máquina) se nota en la siguiente lectura. El TTL y maxsize solo acotan la
+memoria: sueltan lo que nadie ha vuelto a pedir.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Caché LRU con TTL, segura entre hilos"""
+
+    def __init__(self, maxsize=1024, ttl=60.0, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key, default=None):
+        """Obtener un valor vigente y marcarlo como usado recientemente"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires, value = entry
+                if expires > self.timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Guardar un valor, expulsando el menos usado si se supera maxsize"""
+        with self._lock:
+            self._data[key] = (self.timer() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def update(self, key, func):
+        """Reemplazar un valor vigente por func(valor) sin renovar su TTL
+
+        Si func devuelve None la entrada se elimina. Devuelve True si la entrada
+        existía y se actualizó.
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return False
+            expires, value = entry
+            if expires <= self.timer():
+                del self._data[key]
+                return False
+            value = func(value)
+            if value is None:
+                del self._data[key]
+                return False
+            self._data[key] = (expires, value)
+            return True
+
+    def update_matching(self, predicate, func):
+        """Reemplazar por func(llave, valor) los valores vigentes cuya llave cumpla el predicado
+
+        Como update(), no renueva el TTL y elimina las entradas para las que func
+        devuelve None. Devuelve cuántas entradas se actualizaron.
+        """
+        with self._lock:
+            ahora = self.timer()
+            keys = [k for k, (expires, _) in self._data.items() if expires > ahora and predicate(k)]
+            actualizadas = 0
+            for k in keys:
+                expires, value = self._data[k]
+                value = func(k, value)
+                if value is None:
+                    del self._data[k]
+                else:
+                    self._data[k] = (expires, value)
+                    actualizadas += 1
+            return actualizadas
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def pop_matching(self, predicate):
+        """Eliminar todas las entradas cuya llave cumpla el predicado"""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
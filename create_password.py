@@ -8,17 +8,11 @@ import sys
 import os
 from dotenv import load_dotenv
 from supabase import create_client
-import bcrypt
+from passwords import hash_password
 
 # Cargar variables de entorno
 load_dotenv()
 
-def hash_password(password):
-    """Crear hash seguro de la contraseña"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
-
 def main():
     # Configurar Supabase
     SUPABASE_URL = os.getenv('SUPABASE_URL')
@@ -0,0 +1,124 @@
+"""
+Proyección de flujo de caja a partir de los gastos fijos
+
+Cada gasto fijo se expande en sus fechas de cobro dentro del horizonte con
+aritmética de fechas vectorizada (numpy datetime64): una matriz
+gastos x meses marca en qué meses toca cada cobro según su frecuencia, sin
+recorrer día por día en Python. Luego se agregan por mes o por día y se
+combinan con el ingreso mensual promedio.
+
+Supuestos:
+- Los cobros no mensuales se repiten cada N meses contando desde el mes de
+  `created_at` del gasto; si la fila no lo tiene, desde el mes actual.
+- Un `día pago` mayor que los días del mes cae en el último día del mes.
+- El ingreso promedio llega el día 1 de cada mes; el del mes en curso se
+  prorratea con los días que faltan.
+"""
+
+import numpy as np
+
+# Meses entre un cobro y el siguiente
+FRECUENCIA_MESES = {
+    'mensual': 1,
+    'bimestral': 2,
+    'trimestral': 3,
+    'semestral': 6,
+    'anual': 12,
+}
+
+
+def month_grid(start, months):
+    """Inicio y número de días de cada mes del horizonte (datetime64[D], int)"""
+    meses = np.datetime64(start, 'M') + np.arange(months)
+    inicio = meses.astype('datetime64[D]')
+    dias = ((meses + 1).astype('datetime64[D]') - inicio).astype(np.int64)
+    return inicio, dias
+
+
+def expand_occurrences(expenses, start, months):
+    """Fechas de cobro de todos los gastos fijos desde `start` durante `months` meses
+
+    Devuelve (fechas, montos, indice_gasto, indice_mes) como arreglos paralelos,
+    una posición por cobro.
+    """
+    inicio_mes, dias_mes = month_grid(start, months)
+    if not expenses:
+        vacio = np.array([], dtype=np.int64)
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=float), vacio, vacio
+
+    base = np.datetime64(start, 'M')
+    dia = np.array([int(e.get('día pago') or 1) for e in expenses], dtype=np.int64)
+    paso = np.array([FRECUENCIA_MESES.get((e.get('frecuencia') or '').lower(), 1) for e in expenses], dtype=np.int64)
+    monto = np.array([abs(float(e.get('monto') or 0)) for e in expenses], dtype=float)
+    ancla = np.array([
+        (np.datetime64(str(e['created_at'])[:7], 'M') - base).astype(np.int64) if e.get('created_at') else 0
+        for e in expenses
+    ], dtype=np.int64)
+
+    # gastos x meses: ¿toca cobrar este gasto en este mes?
+    cobra = (np.arange(months)[None, :] - ancla[:, None]) % paso[:, None] == 0
+    fechas = inicio_mes[None, :] + (np.minimum(dia[:, None], dias_mes[None, :]) - 1)
+    cobra &= fechas >= np.datetime64(start, 'D')
+
+    indice_gasto, indice_mes = np.nonzero(cobra)
+    return fechas[cobra], monto[indice_gasto], indice_gasto, indice_mes
+
+
+def monthly_income(start, months, average):
+    """Ingreso promedio por mes, prorrateando el mes en curso"""
+    inicio_mes, dias_mes = month_grid(start, months)
+    ingresos = np.full(months, float(average))
+    if months:
+        transcurridos = (np.datetime64(start, 'D') - inicio_mes[0]).astype(np.int64)
+        ingresos[0] *= (dias_mes[0] - transcurridos) / dias_mes[0]
+    return ingresos
+
+
+def project(expenses, start, months, average_income=0.0, start_balance=0.0, granularity='month'):
+    """Proyección de ingresos, gastos fijos y balance acumulado por mes o por día"""
+    fechas, montos, indice_gasto, indice_mes = expand_occurrences(expenses, start, months)
+    ingresos_mes = monthly_income(start, months, average_income)
+    inicio_mes, _ = month_grid(start, months)
+    inicio = np.datetime64(start, 'D')
+    fin = (np.datetime64(start, 'M') + months).astype('datetime64[D]')
+
+    categorias = sorted({e.get('categoría') or 'Otros' for e in expenses})
+    posicion_categoria = {c: i for i, c in enumerate(categorias)}
+    categoria_de = np.array([posicion_categoria[e.get('categoría') or 'Otros'] for e in expenses], dtype=np.int64)
+
+    if granularity == 'day':
+        periodos = np.arange(inicio, fin)
+        posicion = (fechas - inicio).astype(np.int64)
+        ingresos = np.zeros(len(periodos))
+        # El ingreso de cada mes entra su día 1 (el mes en curso, el primer día proyectado)
+        ingresos[np.maximum((inicio_mes - inicio).astype(np.int64), 0)] += ingresos_mes
+        etiquetas = periodos.astype(str).tolist()
+    else:
+        posicion = indice_mes
+        ingresos = ingresos_mes
+        etiquetas = inicio_mes.astype('datetime64[M]').astype(str).tolist()
+
+    n = len(etiquetas)
+    gastos = np.bincount(posicion, weights=montos, minlength=n).astype(float)
+    por_categoria = np.bincount(
+        categoria_de[indice_gasto] * n + posicion, weights=montos, minlength=len(categorias) * n
+    ).astype(float).reshape(len(categorias), n)
+    neto = ingresos - gastos
+    balance = float(start_balance) + np.cumsum(neto)
+
+    return {
+        'desde': str(inicio),
+        'hasta': str(fin - 1),
+        'granularidad': 'diaria' if granularity == 'day' else 'mensual',
+        'ingreso_promedio_mensual': round(float(average_income), 2),
+        'saldo_inicial': round(float(start_balance), 2),
+        'periodos': etiquetas,
+        'ingresos': np.round(ingresos, 2).tolist(),
+        'gastos_fijos': np.round(gastos, 2).tolist(),
+        'neto': np.round(neto, 2).tolist(),
+        'balance': np.round(balance, 2).tolist(),
+        'gastos_por_categoria': {
+            c: np.round(por_categoria[i], 2).tolist() for i, c in enumerate(categorias)
+        },
+        'cobros': int(len(fechas)),
+    }
@@ -0,0 +1,31 @@
+"""
+Configuración de gunicorn (gunicorn -c gunicorn.conf.py app:app)
+
+La API pasa casi todo el tiempo esperando a Supabase, así que por defecto se
+usan workers gthread: cada worker atiende GUNICORN_THREADS peticiones a la vez
+en lugar de una. Con GUNICORN_WORKER_CLASS=sync se vuelve al modo anterior.
+"""
+
+import os
+
+import metrics
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '32')) if worker_class == 'gthread' else 1
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+
+def on_starting(server):
+    # Los contadores de /metrics empiezan de cero en cada arranque
+    metrics.clear_directory()
+
+
+def post_fork(server, worker):
+    # Un hilo por conexión del pool: sin esto los hilos esperarían turno para hablar con Supabase
+    os.environ.setdefault('SUPABASE_POOL_SIZE', str(server.cfg.threads))
@@ -0,0 +1,105 @@
+"""
+Resultados de las mutaciones de /api/batch por clave de idempotencia
+
+La cola offline del service worker reenvía el mismo lote hasta recibir
+respuesta, y el reintento puede llegar a cualquier worker o después de un
+reinicio. Por eso el resultado de cada mutación aplicada se guarda en un
+archivo por (usuario, clave) dentro de IDEMPOTENCY_DIR, compartido por todos los
+workers, como las versiones de versions.py. Un reintento devuelve el resultado
+guardado sin repetir la escritura (un DELETE o PUT repetido podría pisar un
+cambio posterior).
+
+Mientras se aplica una mutación se toma un candado de archivo por usuario, así
+dos reintentos simultáneos del mismo lote en workers distintos no la aplican
+los dos. Los resultados caducan pasados IDEMPOTENCY_TTL segundos y los archivos
+vencidos se borran de vez en cuando al guardar.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+import versions
+
+PRUNE_INTERVAL = 3600.0
+_SAFE_ID = re.compile(r'^[0-9A-Za-z\-]+$')
+
+
+class IdempotencyStore:
+    """Resultados (status, cuerpo) por usuario y clave, guardados como archivos"""
+
+    def __init__(self, directory, ttl=86400.0, timer=time.time):
+        self.directory = directory
+        self.ttl = ttl
+        self.timer = timer
+        self._pruned = timer()
+        os.makedirs(directory, exist_ok=True)
+
+    def _user_path(self, user_id, suffix):
+        user_id = str(user_id)
+        if not _SAFE_ID.match(user_id):
+            raise ValueError(f'Usuario inválido: {user_id}')
+        return os.path.join(self.directory, f'{user_id}.{suffix}')
+
+    def _path(self, user_id, key):
+        # La clave la genera el cliente: el nombre del archivo es su hash
+        digest = hashlib.sha256(str(key).encode('utf-8')).hexdigest()[:32]
+        return self._user_path(user_id, f'{digest}.json')
+
+    @contextmanager
+    def lock(self, user_id):
+        """Candado por usuario entre hilos y workers mientras se consulta y aplica una mutación"""
+        # flock también excluye a los otros hilos de este worker (cada uno abre el archivo)
+        with versions.file_lock(self._user_path(user_id, 'lock')):
+            yield
+
+    def get(self, user_id, key):
+        """(status, cuerpo) guardado para la clave o None si no hay o ya venció"""
+        path = self._path(user_id, key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry['expires'] <= self.timer():
+            return None
+        return entry['status'], entry['body']
+
+    def set(self, user_id, key, status, body):
+        ahora = self.timer()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.idempotency-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'expires': ahora + self.ttl, 'status': status, 'body': body}, f)
+        os.replace(tmp, self._path(user_id, key))
+        if ahora - self._pruned >= PRUNE_INTERVAL:
+            self._pruned = ahora
+            self.prune()
+
+    def prune(self):
+        """Borrar los resultados vencidos; devuelve cuántos se borraron"""
+        ahora = self.timer()
+        borrados = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path, encoding='utf-8') as f:
+                    vencido = json.load(f)['expires'] <= ahora
+                if vencido:
+                    os.remove(entry.path)
+                    borrados += 1
+            except (OSError, ValueError, KeyError):
+                continue
+        return borrados
+
+
+def from_env():
+    """IdempotencyStore configurada con IDEMPOTENCY_DIR e IDEMPOTENCY_TTL"""
+    return IdempotencyStore(
+        os.getenv('IDEMPOTENCY_DIR', os.path.join(tempfile.gettempdir(), 'dashboard-pwa-idempotency')),
+        ttl=float(os.getenv('IDEMPOTENCY_TTL', '86400'))
+    )
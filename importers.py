@@ -0,0 +1,229 @@
+"""
+Lectura de estados de cuenta bancarios (CSV / OFX) para importar transacciones
+
+Los lectores recorren el archivo fila por fila sin cargarlo completo en memoria
+y devuelven diccionarios crudos; normalize_row() los convierte al formato que
+recibe add_transaction (fecha, categoria, monto, descripcion, tipo).
+"""
+
+import codecs
+import csv
+import hashlib
+import re
+from datetime import datetime
+
+DEFAULT_EXPENSE_CATEGORY = 'Otros Gastos'
+DEFAULT_INCOME_CATEGORY = 'Otros Ingresos'
+
+# Nombres de columna aceptados en el CSV (en minúsculas, sin acentos)
+CSV_COLUMNS = {
+    'fecha': ('fecha', 'date', 'fecha operacion', 'fecha movimiento'),
+    'descripcion': ('descripcion', 'description', 'concepto', 'detalle', 'memo'),
+    'monto': ('monto', 'amount', 'importe', 'cantidad'),
+    'categoria': ('categoria', 'category'),
+    'tipo': ('tipo', 'type'),
+    'cargo': ('cargo', 'retiro', 'debit', 'debito'),
+    'abono': ('abono', 'deposito', 'credit', 'credito'),
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d/%m/%y')
+
+_ACCENTS = str.maketrans('áéíóúÁÉÍÓÚ', 'aeiouAEIOU')
+
+
+def _normalize_header(name):
+    return (name or '').strip().translate(_ACCENTS).lower()
+
+
+def text_stream(binary_stream, encoding='utf-8-sig'):
+    """Envolver un stream binario para leerlo como texto de forma incremental"""
+    return codecs.getreader(encoding)(binary_stream, errors='replace')
+
+
+def detect_format(filename='', content_type=''):
+    """Adivinar el formato por extensión o tipo MIME ('csv' u 'ofx')"""
+    nombre = (filename or '').lower()
+    tipo = (content_type or '').lower()
+    if nombre.endswith(('.ofx', '.qfx')) or 'ofx' in tipo:
+        return 'ofx'
+    return 'csv'
+
+
+def iter_csv_rows(stream):
+    """Recorrer un CSV con encabezados; devuelve (número de línea, fila cruda)"""
+    # Detectar el separador con la primera línea sin consumir el resto
+    primera = stream.readline()
+    if not primera:
+        return
+    separador = ';' if primera.count(';') > primera.count(',') else ','
+
+    def lines():
+        yield primera
+        yield from stream
+
+    reader = csv.reader(lines(), delimiter=separador)
+    encabezados = [_normalize_header(h) for h in next(reader)]
+    columnas = {}
+    for campo, alias in CSV_COLUMNS.items():
+        for i, encabezado in enumerate(encabezados):
+            if encabezado in alias:
+                columnas[campo] = i
+                break
+
+    for numero, valores in enumerate(reader, start=2):
+        if not any(v.strip() for v in valores):
+            continue
+        fila = {campo: valores[i] for campo, i in columnas.items() if i < len(valores)}
+        yield numero, fila
+
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def iter_ofx_rows(stream, chunk_size=64 * 1024):
+    """Recorrer las transacciones <STMTTRN> de un OFX (SGML o XML) por bloques"""
+    pendiente = ''
+    actual = None
+    numero = 0
+    while True:
+        bloque = stream.read(chunk_size)
+        texto = pendiente + (bloque or '')
+        # Procesar hasta el último '<' para no cortar una etiqueta a la mitad
+        corte = len(texto) if not bloque else texto.rfind('<')
+        if corte <= 0 and bloque:
+            pendiente = texto
+            continue
+        procesable, pendiente = texto[:corte], texto[corte:]
+        for cierre, etiqueta, valor in _OFX_TAG.findall(procesable):
+            etiqueta = etiqueta.upper()
+            if etiqueta == 'STMTTRN':
+                if cierre and actual is not None:
+                    numero += 1
+                    yield numero, actual
+                    actual = None
+                elif not cierre:
+                    actual = {}
+            elif actual is not None and not cierre:
+                actual[etiqueta] = valor.strip()
+        if not bloque:
+            break
+
+
+def ofx_to_raw(ofx):
+    """Convertir los campos OFX al formato crudo que entiende normalize_row"""
+    return {
+        'fecha': (ofx.get('DTPOSTED') or '')[:8],
+        'monto': ofx.get('TRNAMT', ''),
+        'descripcion': ofx.get('MEMO') or ofx.get('NAME') or '',
+    }
+
+
+def parse_date(value):
+    """Fecha en formato ISO (YYYY-MM-DD) a partir de los formatos bancarios comunes"""
+    value = (value or '').strip()
+    if re.fullmatch(r'\d{8}', value):
+        return datetime.strptime(value, '%Y%m%d').date().isoformat()
+    for formato in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, formato).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f'Fecha inválida: {value!r}')
+
+
+def _join_thousands(texto, separador, value):
+    """'1.234.567' -> '1234567'; los grupos después del primero deben ser de tres dígitos"""
+    grupos = texto.split(separador)
+    if len(grupos) > 1 and not (1 <= len(grupos[0]) <= 3 and all(len(g) == 3 for g in grupos[1:])):
+        raise ValueError(f'Monto inválido: {value!r}')
+    return ''.join(grupos)
+
+
+def parse_amount(value):
+    """Monto con signo a partir de textos como '$1,234.56', '-1.234,56', '-45,90' o '(12.00)'
+
+    El separador más a la derecha es el decimal y el otro, si aparece, separa
+    miles en grupos de tres dígitos. Si solo hay un separador y se repite
+    ('1,234,567') o le siguen exactamente tres dígitos ('1.234', '12,345'), es
+    de miles.
+    """
+    texto = (value or '').strip().replace('$', '').replace(' ', '')
+    negativo = texto.startswith('(') and texto.endswith(')')
+    texto = texto.strip('()')
+    signo = ''
+    if texto[:1] in ('-', '+'):
+        signo, texto = texto[0], texto[1:]
+    if not texto:
+        raise ValueError('Monto vacío')
+
+    posicion = max(texto.rfind(','), texto.rfind('.'))
+    if posicion >= 0:
+        separador = texto[posicion]
+        otro = '.' if separador == ',' else ','
+        entero, fraccion = texto[:posicion], texto[posicion + 1:]
+        solo_miles = texto.count(separador) > 1 or (
+            otro not in entero and len(fraccion) == 3
+            and entero.isdigit() and len(entero) <= 3 and entero.strip('0')
+        )
+        if solo_miles:
+            texto = _join_thousands(texto, separador, value)
+        else:
+            texto = f'{_join_thousands(entero, otro, value)}.{fraccion}'
+
+    monto = float(signo + texto)
+    return -monto if negativo else monto
+
+
+def normalize_row(raw):
+    """Validar una fila cruda y devolver los campos que espera add_transaction
+
+    Si no hay columna `tipo`, el signo del monto decide: negativo es gasto y
+    positivo es ingreso. Las columnas cargo/abono separadas también se aceptan.
+    """
+    fecha = parse_date(raw.get('fecha'))
+
+    if raw.get('monto', '').strip():
+        monto = parse_amount(raw['monto'])
+    elif raw.get('cargo', '').strip():
+        monto = -abs(parse_amount(raw['cargo']))
+    elif raw.get('abono', '').strip():
+        monto = abs(parse_amount(raw['abono']))
+    else:
+        raise ValueError('Monto vacío')
+
+    tipo = (raw.get('tipo') or '').strip().lower()
+    if tipo not in ('ingreso', 'gasto'):
+        if tipo:
+            raise ValueError(f'Tipo inválido: {tipo!r}')
+        tipo = 'gasto' if monto < 0 else 'ingreso'
+
+    descripcion = (raw.get('descripcion') or '').strip()
+    if not descripcion:
+        raise ValueError('Descripción vacía')
+
+    categoria = (raw.get('categoria') or '').strip()
+    if not categoria:
+        categoria = DEFAULT_EXPENSE_CATEGORY if tipo == 'gasto' else DEFAULT_INCOME_CATEGORY
+
+    return {
+        'fecha': fecha,
+        'categoria': categoria,
+        'monto': abs(monto),
+        'descripcion': descripcion,
+        'tipo': tipo,
+    }
+
+
+def iter_statement(stream, fmt):
+    """Recorrer un estado de cuenta; devuelve (número, fila cruda) en formato común"""
+    if fmt == 'ofx':
+        for numero, ofx in iter_ofx_rows(stream):
+            yield numero, ofx_to_raw(ofx)
+    else:
+        yield from iter_csv_rows(stream)
+
+
+def transaction_fingerprint(fecha, monto, descripcion):
+    """Huella para detectar duplicados por (fecha, monto, descripción)"""
+    clave = f"{str(fecha)[:10]}|{int(float(monto))}|{(descripcion or '').strip().lower()}"
+    return hashlib.sha1(clave.encode('utf-8')).hexdigest()
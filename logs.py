@@ -0,0 +1,204 @@
+"""
+Logging estructurado en JSON sin bloquear las peticiones
+
+Los módulos usan logging.getLogger(__name__) como siempre. configure() instala
+en el logger raíz un QueueHandler: la petición solo deja el registro en una
+cola acotada y un hilo (QueueListener) lo formatea y escribe en stdout. Si la
+cola se llena los registros se descartan y se cuentan en lugar de esperar.
+
+Cada línea es un objeto JSON con la hora, el nivel, el logger, el mensaje, el
+request_id de la petición (encabezado X-Request-ID) y los campos pasados en
+`extra`. El muestreo por nivel (LOG_SAMPLE_RATES, p. ej. "INFO=0.1,DEBUG=0.01")
+se decide por request_id, así que de una petición muestreada llegan todas sus
+líneas de ese nivel. Los volcados de datos de las peticiones (log_payload)
+están apagados salvo con LOG_PAYLOADS=1.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import zlib
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+# Atributos propios de LogRecord: lo demás viene de `extra` y va al JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def set_request_id(value):
+    _request_id.set(value)
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def parse_sample_rates(value):
+    """'INFO=0.1,DEBUG=0.01' -> {logging.INFO: 0.1, logging.DEBUG: 0.01}"""
+    rates = {}
+    for parte in (value or '').split(','):
+        if '=' not in parte:
+            continue
+        nivel, tasa = parte.split('=', 1)
+        nivel = logging.getLevelName(nivel.strip().upper())
+        if isinstance(nivel, int):
+            rates[nivel] = min(max(float(tasa), 0.0), 1.0)
+    return rates
+
+
+class RequestContextFilter(logging.Filter):
+    """Agrega el request_id de la petición en curso a cada registro"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar una fracción de los registros de cada nivel
+
+    Los niveles sin tasa configurada pasan todos. Con request_id la decisión es
+    la misma para toda la petición.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        tasa = self.rates.get(record.levelno, 1.0)
+        if tasa >= 1.0:
+            return True
+        clave = getattr(record, 'request_id', None)
+        muestra = zlib.crc32(clave.encode('utf-8')) / 2 ** 32 if clave else random.random()
+        return muestra < tasa
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (y cuenta) en lugar de bloquear si la cola está llena"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # El mensaje se arma aquí (los argumentos pueden cambiar antes de que el hilo
+        # lo escriba), pero el resto de los campos se conserva para el JSON
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _Pipeline:
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self.payloads = False
+        self._lock = threading.Lock()
+
+
+_pipeline = _Pipeline()
+
+
+def _start_listener():
+    output = logging.StreamHandler(sys.stdout)
+    if os.getenv('LOG_FORMAT', 'json') == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+    _pipeline.listener = logging.handlers.QueueListener(_pipeline.handler.queue, output, respect_handler_level=False)
+    _pipeline.listener.start()
+
+
+def _restart_after_fork():
+    # El hilo del listener no sobrevive al fork: cada worker arranca el suyo con una cola nueva
+    if _pipeline.handler is not None:
+        _pipeline._lock = threading.Lock()
+        _pipeline.handler.queue = queue.Queue(_pipeline.handler.queue.maxsize)
+        _start_listener()
+
+
+def configure():
+    """Instalar el pipeline en el logger raíz (una vez por proceso)"""
+    with _pipeline._lock:
+        if _pipeline.handler is not None:
+            return
+        handler = DroppingQueueHandler(queue.Queue(int(os.getenv('LOG_QUEUE_SIZE', '10000'))))
+        handler.addFilter(RequestContextFilter())
+        handler.addFilter(SamplingFilter(parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', ''))))
+        _pipeline.handler = handler
+        _pipeline.payloads = os.getenv('LOG_PAYLOADS', '0') == '1'
+
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+        # httpx registra cada llamada a Supabase con la URL completa (ids incluidos)
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+        _start_listener()
+        os.register_at_fork(after_in_child=_restart_after_fork)
+        atexit.register(shutdown)
+
+
+def shutdown():
+    """Escribir lo que quede en la cola y detener el hilo"""
+    if _pipeline.listener is not None:
+        _pipeline.listener.stop()
+        _pipeline.listener = None
+
+
+def log_payload(logger, message, **fields):
+    """Volcar datos de una petición a nivel DEBUG, solo si LOG_PAYLOADS=1"""
+    if _pipeline.payloads and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra={'payload': fields})
+
+
+def stats():
+    handler = _pipeline.handler
+    if handler is None:
+        return {'configured': False}
+    return {'configured': True, 'queued': handler.queue.qsize(), 'dropped': handler.dropped}
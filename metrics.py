@@ -0,0 +1,330 @@
+"""
+Métricas por petición en formato Prometheus
+
+Cada petición registra su latencia por ruta y cuántas llamadas a Supabase hizo
+y cuánto tardaron (las cuenta el transporte httpx de supabase_client.py). Con
+eso se arma el encabezado Server-Timing de la respuesta y los histogramas que
+expone /metrics.
+
+Cada worker acumula en memoria y cada METRICS_FLUSH_INTERVAL segundos guarda
+una copia en METRICS_DIR/metrics-<pid>.json. /metrics suma los archivos de
+todos los workers, de modo que no importa qué worker atienda al scraper. Las
+copias de workers que ya terminaron (p. ej. reciclados por
+GUNICORN_MAX_REQUESTS) se suman a metrics-retired.json y se borran, así los
+contadores nunca bajan y el directorio no crece. METRICS_DIR debe ser local a la
+máquina, porque se revisa por pid si el worker sigue vivo. gunicorn vacía el
+directorio al arrancar (gunicorn.conf.py).
+"""
+
+import atexit
+import contextvars
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import versions
+
+# Cargar variables de entorno (supabase_client.py importa este módulo antes que app.py las cargue)
+load_dotenv()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+RETIRED_FILE = 'metrics-retired.json'
+
+logger = logging.getLogger(__name__)
+
+HELP = {
+    'http_requests_total': ('counter', 'Peticiones atendidas por ruta, método y estado'),
+    'http_request_duration_seconds': ('histogram', 'Duración de las peticiones por ruta'),
+    'http_request_supabase_calls': ('histogram', 'Llamadas a Supabase hechas por cada petición'),
+    'http_request_supabase_seconds': ('histogram', 'Tiempo de cada petición esperando a Supabase'),
+}
+
+
+class RequestTimings:
+    """Llamadas a Supabase hechas durante una petición (puede sumarse desde varios hilos)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request():
+    """Empezar a medir la petición del hilo actual"""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current():
+    return _current.get()
+
+
+def record_upstream(seconds):
+    """Sumar una llamada a Supabase a la petición en curso, si la hay"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(seconds)
+
+
+def propagate(fn):
+    """Envolver fn para que lo que llame desde otro hilo (p. ej. un executor) cuente en la petición actual"""
+    timings = _current.get()
+
+    def wrapper(*args, **kwargs):
+        token = _current.set(timings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return wrapper
+
+
+def server_timing(timings, total_seconds):
+    """Valor del encabezado Server-Timing (duraciones en ms)"""
+    return (f'app;dur={total_seconds * 1000:.1f}, '
+            f'supabase;desc="llamadas: {timings.calls}";dur={timings.seconds * 1000:.1f}')
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Contadores e histogramas del worker, con copia en disco para agregarlos entre workers"""
+
+    def __init__(self, directory=None, flush_interval=5.0, timer=time.monotonic):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.timer = timer
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._pid = os.getpid()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _check_fork(self):
+        # Un worker recién creado no hereda lo que contó el proceso maestro
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._counters = {}
+            self._histograms = {}
+            self._last_flush = 0.0
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._check_fork()
+            key = _key(name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            self._check_fork()
+            key = _key(name, labels)
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, limite in enumerate(hist['buckets']):
+                if value <= limite:
+                    hist['counts'][i] += 1
+            hist['sum'] += value
+            hist['count'] += 1
+
+    def snapshot(self):
+        """Copia serializable: {'counters': [...], 'histograms': [...]}"""
+        with self._lock:
+            self._check_fork()
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), dict(hist, counts=list(hist['counts']))]
+                               for (name, labels), hist in self._histograms.items()],
+            }
+
+    def flush(self):
+        """Guardar la copia del worker en METRICS_DIR (escritura atómica)"""
+        if not self.directory:
+            return
+        data = self.snapshot()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.metrics-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, os.path.join(self.directory, f'metrics-{os.getpid()}.json'))
+        self._last_flush = self.timer()
+
+    def maybe_flush(self):
+        if self.directory and self.timer() - self._last_flush >= self.flush_interval:
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("No se pudieron guardar las métricas: %s", e)
+
+    def _retire(self, paths):
+        """Sumar a metrics-retired.json las copias de workers que ya terminaron y borrarlas"""
+        retired = os.path.join(self.directory, RETIRED_FILE)
+        # Dos workers atendiendo /metrics a la vez no deben sumar dos veces la misma copia
+        with versions.file_lock(os.path.join(self.directory, '.retired.lock')):
+            existentes = [path for path in paths if os.path.exists(path)]
+            if not existentes:
+                return
+            snapshots = [_load(retired)] if os.path.exists(retired) else []
+            snapshots.extend(_load(path) for path in existentes)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.metrics-')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(merge(s for s in snapshots if s), f)
+            os.replace(tmp, retired)
+            for path in existentes:
+                os.remove(path)
+
+    def collect(self):
+        """Métricas de todos los workers sumadas; las de este worker, al día"""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        paths = glob.glob(os.path.join(self.directory, 'metrics-*.json'))
+        terminados = [path for path in paths if _worker_exited(path)]
+        if terminados:
+            try:
+                self._retire(terminados)
+            except OSError as e:
+                logger.warning("No se pudieron juntar las métricas de workers terminados: %s", e)
+            paths = glob.glob(os.path.join(self.directory, 'metrics-*.json'))
+        return merge(s for s in map(_load, paths) if s)
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _worker_exited(path):
+    """¿La copia es de un worker (metrics-<pid>.json) que ya no existe?"""
+    pid = os.path.basename(path)[len('metrics-'):-len('.json')]
+    # En Windows os.kill(pid, 0) terminaría el proceso; gunicorn solo corre en POSIX
+    if not pid.isdigit() or int(pid) == os.getpid() or os.name != 'posix':
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def merge(snapshots):
+    """Sumar contadores e histogramas de varias copias"""
+    counters = {}
+    histograms = {}
+    for snap in snapshots:
+        for name, labels, value in snap.get('counters', []):
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, hist in snap.get('histograms', []):
+            key = _key(name, labels)
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = dict(hist, counts=list(hist['counts']))
+            else:
+                total['counts'] = [a + b for a, b in zip(total['counts'], hist['counts'])]
+                total['sum'] += hist['sum']
+                total['count'] += hist['count']
+    return {
+        'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, dict(labels), hist] for (name, labels), hist in histograms.items()],
+    }
+
+
+def _labels(labels, **extra):
+    items = dict(labels, **extra)
+    if not items:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"') for v in items.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(items.keys(), escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    """Formato de texto de Prometheus (exposition format 0.0.4)"""
+    por_nombre = {}
+    for name, labels, value in snapshot['counters']:
+        por_nombre.setdefault(name, []).append((labels, value))
+    for name, labels, hist in snapshot['histograms']:
+        por_nombre.setdefault(name, []).append((labels, hist))
+
+    lineas = []
+    for name in sorted(por_nombre):
+        tipo, ayuda = HELP.get(name, ('untyped', name))
+        lineas.append(f'# HELP {name} {ayuda}')
+        lineas.append(f'# TYPE {name} {tipo}')
+        for labels, value in sorted(por_nombre[name], key=lambda item: sorted(item[0].items())):
+            if tipo != 'histogram':
+                lineas.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            for limite, cuenta in zip(value['buckets'], value['counts']):
+                lineas.append(f'{name}_bucket{_labels(labels, le=_number(limite))} {cuenta}')
+            lineas.append(f'{name}_bucket{_labels(labels, le="+Inf")} {value["count"]}')
+            lineas.append(f'{name}_sum{_labels(labels)} {_number(value["sum"])}')
+            lineas.append(f'{name}_count{_labels(labels)} {value["count"]}')
+    return '\n'.join(lineas) + '\n'
+
+
+def record_request(method, route, status, timings):
+    """Registrar una petición terminada en el registro del worker"""
+    duracion = time.perf_counter() - timings.started
+    labels = {'method': method, 'route': route}
+    registry.inc('http_requests_total', dict(labels, status=str(status)))
+    registry.observe('http_request_duration_seconds', labels, duracion)
+    registry.observe('http_request_supabase_calls', labels, timings.calls, CALL_BUCKETS)
+    registry.observe('http_request_supabase_seconds', labels, timings.seconds)
+    registry.maybe_flush()
+    return duracion
+
+
+def metrics_dir():
+    return os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'dashboard-pwa-metrics'))
+
+
+def clear_directory(directory=None):
+    """Borrar las copias de una ejecución anterior (se llama al arrancar gunicorn)"""
+    for path in glob.glob(os.path.join(directory or metrics_dir(), 'metrics-*.json')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+registry = Registry(metrics_dir(), float(os.getenv('METRICS_FLUSH_INTERVAL', '5')))
+
+
+@atexit.register
+def _flush_at_exit():
+    # Lo contado después de la última copia no se pierde cuando el worker termina normalmente
+    try:
+        if registry.directory and registry.snapshot()['counters']:
+            registry.flush()
+    except OSError:
+        pass
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Hash y verificación de contraseñas (bcrypt + hashes Werkzeug heredados)
+
+bcrypt se ejecuta en un pool acotado de hilos por worker: como máximo
+PASSWORD_HASH_WORKERS hashes a la vez y PASSWORD_QUEUE_LIMIT esperando turno.
+Si el pool está lleno se lanza PasswordPoolBusy en lugar de hacer esperar a la
+petición, así una ráfaga de logins no acapara la CPU del resto de la API.
+
+Calibración del costo (elige BCRYPT_ROUNDS para un tiempo objetivo):
+    python passwords.py calibrate --target-ms 250
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from dotenv import load_dotenv
+from werkzeug.security import check_password_hash
+
+# Cargar variables de entorno (este módulo se importa antes que el resto de app.py)
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_QUEUE_LIMIT = int(os.getenv('PASSWORD_QUEUE_LIMIT', '8'))
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolBusy(Exception):
+    """El pool de hashing está lleno; la petición debe reintentarse más tarde"""
+
+
+class HashingPool:
+    """Pool de hilos acotado que rechaza trabajo en cuanto se llena la cola"""
+
+    def __init__(self, workers, queue_limit):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.completed = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Un executor por proceso: los hilos del proceso padre no sobreviven al fork
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+                    self._pid = pid
+        return self._executor
+
+    def _done(self, future):
+        self._slots.release()
+        with self._lock:
+            self.completed += 1
+
+    def run(self, func, *args):
+        """Ejecutar func(*args) en el pool y esperar el resultado"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy('Demasiadas operaciones de contraseña en curso')
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._done)
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'bcrypt_rounds': BCRYPT_ROUNDS,
+            }
+
+
+pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+
+def is_bcrypt_hash(password_hash):
+    """Detecta si el hash es de tipo bcrypt"""
+    return password_hash.startswith('$2b$') or password_hash.startswith('$2a$') or password_hash.startswith('$2y$')
+
+
+def bcrypt_cost(password_hash):
+    """Costo (log2 de rondas) de un hash bcrypt: '$2b$12$...' -> 12"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(password_hash):
+    """True si el hash es Werkzeug o bcrypt con un costo menor al configurado"""
+    return not is_bcrypt_hash(password_hash) or bcrypt_cost(password_hash) < BCRYPT_ROUNDS
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password, stored_hash):
+    if is_bcrypt_hash(stored_hash):
+        # Es un hash bcrypt - usar bcrypt
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
+        except Exception as e:
+            logger.warning("Error verificando bcrypt: %s", e)
+            return False
+    # Es un hash Werkzeug - usar método Werkzeug
+    try:
+        return check_password_hash(stored_hash, password)
+    except Exception as e:
+        logger.warning("Error verificando Werkzeug: %s", e)
+        return False
+
+
+def hash_password(password):
+    """Crear hash bcrypt de la contraseña con el costo configurado"""
+    return pool.run(_hash, password, BCRYPT_ROUNDS)
+
+
+def verify_password(password, stored_hash):
+    """Verificar contraseña usando el método correcto según el tipo de hash"""
+    if not stored_hash:
+        return False
+    return pool.run(_verify, password, stored_hash)
+
+
+def measure(rounds, samples=3):
+    """Tiempo medio en ms de verificar un hash bcrypt con ese costo"""
+    stored = _hash('calibracion', rounds).encode('utf-8')
+    inicio = time.perf_counter()
+    for _ in range(samples):
+        bcrypt.checkpw(b'calibracion', stored)
+    return (time.perf_counter() - inicio) * 1000 / samples
+
+
+def calibrate(target_ms, min_rounds=10, max_rounds=16, samples=3):
+    """Mayor costo cuya verificación tarda como máximo target_ms; devuelve (costo, mediciones)"""
+    mediciones = {}
+    elegido = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        mediciones[rounds] = measure(rounds, samples)
+        if mediciones[rounds] > target_ms:
+            break
+        elegido = rounds
+    return elegido, mediciones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Utilidades de contraseñas')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cal = sub.add_parser('calibrate', help='elegir BCRYPT_ROUNDS para un tiempo de verificación objetivo')
+    cal.add_argument('--target-ms', type=float, default=250.0)
+    cal.add_argument('--min-rounds', type=int, default=10)
+    cal.add_argument('--max-rounds', type=int, default=16)
+    cal.add_argument('--samples', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"⏱️  Midiendo bcrypt en este equipo (objetivo {args.target_ms:.0f} ms por verificación)...")
+    elegido, mediciones = calibrate(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+    for rounds, ms in mediciones.items():
+        marca = '  <-' if rounds == elegido else ''
+        print(f"   costo {rounds:>2}: {ms:8.1f} ms{marca}")
+    if mediciones[elegido] > args.target_ms:
+        print(f"⚠️  Ni el costo mínimo ({elegido}) cumple el objetivo")
+    print(f"✅ Recomendado: BCRYPT_ROUNDS={elegido} (actual: {BCRYPT_ROUNDS})")
+    print("   Los hashes con costo menor se actualizan solos en el siguiente inicio de sesión.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
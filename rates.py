@@ -0,0 +1,182 @@
+"""
+Cotizaciones de divisas con caché, persistencia en disco y refresco en segundo plano
+
+Todas las cotizaciones se piden al proveedor con base USD y las demás bases se
+calculan a partir de ellas, así que el proveedor recibe una petición por TTL
+sin importar cuántos usuarios o workers haya:
+
+- Vigentes (menos de RATES_TTL segundos): se responden desde memoria.
+- Vencidas pero con menos de RATES_MAX_STALE: se responden igual y un hilo
+  las refresca en segundo plano (stale-while-revalidate).
+- Sin datos o demasiado viejas: se piden al proveedor antes de responder.
+
+Cada refresco se guarda en RATES_CACHE_FILE. Los workers leen ese archivo antes
+de ir al proveedor, así que uno solo hace la petición y los demás (y los
+procesos nuevos tras un reinicio) arrancan con datos.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+import httpx
+
+DEFAULT_UPSTREAM_URL = 'https://api.exchangerate-api.com/v4/latest/USD'
+CURRENCY_RE = re.compile(r'^[A-Z]{3}$')
+
+logger = logging.getLogger(__name__)
+
+
+class RatesUnavailable(Exception):
+    """No hay cotizaciones en caché y el proveedor no respondió"""
+
+
+def http_upstream(url, timeout=5.0):
+    """Proveedor HTTP: devuelve {moneda: cotización} con base USD"""
+    def fetch():
+        response = httpx.get(url, timeout=timeout)
+        response.raise_for_status()
+        rates = response.json()['rates']
+        if not rates or rates.get('USD') != 1:
+            raise ValueError('Respuesta del proveedor sin base USD')
+        return {k: float(v) for k, v in rates.items()}
+    return fetch
+
+
+class RatesCache:
+    """Cotizaciones compartidas por el proceso, respaldadas por un archivo JSON"""
+
+    def __init__(self, fetch, path, ttl=1800.0, max_stale=86400.0, timer=time.time):
+        self.fetch = fetch
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.timer = timer
+        self.upstream_requests = 0
+        self.upstream_errors = 0
+        self._entry = None  # {'rates': {...}, 'fetched_at': epoch}
+        # Solo una petición al proveedor a la vez; las lecturas nunca lo esperan si hay datos
+        self._fetch_lock = threading.Lock()
+        self._refreshing = threading.Event()
+
+    def _age(self, entry):
+        return self.timer() - entry['fetched_at']
+
+    def _load_disk(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entry = json.load(f)
+            if isinstance(entry.get('rates'), dict) and isinstance(entry.get('fetched_at'), (int, float)):
+                return entry
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _save_disk(self, entry):
+        # Escritura atómica: otro worker nunca lee un archivo a medias
+        directorio = os.path.dirname(self.path) or '.'
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directorio, prefix='.rates-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("No se pudieron guardar las cotizaciones en %s: %s", self.path, e)
+
+    def _newest(self):
+        """La entrada más reciente entre memoria y disco"""
+        disco = self._load_disk()
+        if disco and (self._entry is None or disco['fetched_at'] > self._entry['fetched_at']):
+            self._entry = disco
+        return self._entry
+
+    def refresh(self):
+        """Pedir cotizaciones al proveedor y guardarlas en memoria y disco"""
+        self.upstream_requests += 1
+        try:
+            rates = self.fetch()
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        entry = {'rates': rates, 'fetched_at': self.timer()}
+        self._entry = entry
+        self._save_disk(entry)
+        return entry
+
+    def _refresh_if_expired(self):
+        with self._fetch_lock:
+            # Otro hilo u otro worker pudo haberlas refrescado mientras se esperaba
+            entry = self._newest()
+            if entry is not None and self._age(entry) < self.ttl:
+                return entry
+            return self.refresh()
+
+    def _refresh_in_background(self):
+        def run():
+            try:
+                self._refresh_if_expired()
+            except Exception as e:
+                logger.warning("Error refrescando cotizaciones: %s", e)
+            finally:
+                self._refreshing.clear()
+
+        if not self._refreshing.is_set():
+            self._refreshing.set()
+            threading.Thread(target=run, daemon=True, name='rates-refresh').start()
+
+    def get(self):
+        """Devolver (entrada, stale); lanza RatesUnavailable si no hay nada que servir"""
+        entry = self._entry
+        if entry is not None and self._age(entry) < self.ttl:
+            return entry, False
+
+        entry = self._newest()
+        if entry is not None and self._age(entry) < self.ttl:
+            return entry, False
+        if entry is not None and self._age(entry) < self.max_stale:
+            self._refresh_in_background()
+            return entry, True
+        try:
+            return self._refresh_if_expired(), False
+        except Exception as e:
+            logger.warning("Error obteniendo cotizaciones: %s", e)
+            if entry is not None:
+                return entry, True
+            raise RatesUnavailable(str(e))
+
+    def rates_for(self, base='USD'):
+        """Cotizaciones con la base pedida, calculadas desde las de USD"""
+        entry, stale = self.get()
+        usd = entry['rates']
+        if base not in usd:
+            raise KeyError(base)
+        factor = usd[base]
+        return {
+            'base': base,
+            'rates': {moneda: valor / factor for moneda, valor in usd.items()},
+            'fetched_at': entry['fetched_at'],
+            'stale': stale,
+            'max_age': max(int(self.ttl - self._age(entry)), 0),
+        }
+
+    def stats(self):
+        entry = self._entry
+        return {
+            'upstream_requests': self.upstream_requests,
+            'upstream_errors': self.upstream_errors,
+            'age_seconds': round(self._age(entry), 1) if entry else None,
+        }
+
+
+def from_env():
+    """RatesCache configurada con RATES_UPSTREAM_URL, RATES_TTL, RATES_MAX_STALE y RATES_CACHE_FILE"""
+    return RatesCache(
+        http_upstream(os.getenv('RATES_UPSTREAM_URL', DEFAULT_UPSTREAM_URL)),
+        os.getenv('RATES_CACHE_FILE', os.path.join(tempfile.gettempdir(), 'dashboard-pwa-rates.json')),
+        ttl=float(os.getenv('RATES_TTL', '1800')),
+        max_stale=float(os.getenv('RATES_MAX_STALE', '86400'))
+    )
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Mantenimiento del rollup "Resumen transacciones" (ver sql/02_resumen_transacciones.sql)
+
+Uso:
+    python rollups.py backfill                 # reconstruir el rollup de todos los usuarios
+    python rollups.py backfill --user ID       # reconstruir solo un usuario
+    python rollups.py check --sample 20        # comparar rollup vs datos crudos en 20 usuarios
+    python rollups.py check --user ID --repair # verificar y reparar un usuario
+
+La reconstrucción llama a una función que solo puede ejecutar el service_role:
+usa SUPABASE_SERVICE_KEY si está definida y si no SUPABASE_KEY.
+"""
+
+import argparse
+import os
+import random
+import sys
+from dotenv import load_dotenv
+from supabase import create_client
+
+ROLLUP_TABLE = 'Resumen transacciones'
+PAGE_SIZE = 1000
+
+# Cargar variables de entorno
+load_dotenv()
+
+def rebuild(supabase, user_id=None):
+    """Reconstruir el rollup desde Transacciones; devuelve las filas generadas"""
+    response = supabase.rpc('reconstruir_resumen_transacciones', {'p_usuario_id': user_id}).execute()
+    return response.data[0]['filas'] if response.data else 0
+
+def fetch_rollup(supabase, user_id):
+    """Filas del rollup de un usuario indexadas por (mes, tipo, categoria)"""
+    response = supabase.table(ROLLUP_TABLE).select('mes,tipo,categoria,total,total_abs,cantidad').eq('usuario_id', user_id).execute()
+    return {
+        (row['mes'], row['tipo'], row['categoria']): (row['total'], row['total_abs'], row['cantidad'])
+        for row in response.data
+    }
+
+def compute_from_raw(supabase, user_id):
+    """Agregar las transacciones crudas de un usuario recorriéndolas por páginas"""
+    totales = {}
+    ultima = None
+    while True:
+        query = supabase.table('Transacciones').select('id,fecha,tipo,categoria,monto').eq('usuario_id', user_id)
+        if ultima:
+            # Paginación por (fecha, id): cada página arranca donde terminó la anterior
+            fecha, row_id = ultima['fecha'], ultima['id']
+            query = query.gte('fecha', fecha)
+            query.params = query.params.add('or', f'(fecha.gt."{fecha}",and(fecha.eq."{fecha}",id.gt."{row_id}"))')
+        rows = query.order('fecha,id').limit(PAGE_SIZE).execute().data
+        for t in rows:
+            clave = (str(t['fecha'])[:7], t['tipo'], t['categoria'])
+            total, total_abs, cantidad = totales.get(clave, (0, 0, 0))
+            totales[clave] = (total + t['monto'], total_abs + abs(t['monto']), cantidad + 1)
+        if len(rows) < PAGE_SIZE:
+            return totales
+        ultima = rows[-1]
+
+def diff(rollup, raw):
+    """Lista de diferencias (clave, rollup, crudo) entre ambos agregados"""
+    diferencias = []
+    for clave in sorted(set(rollup) | set(raw)):
+        esperado = raw.get(clave, (0, 0, 0))
+        actual = rollup.get(clave, (0, 0, 0))
+        if any(abs(float(a) - float(e)) > 1e-6 for a, e in zip(actual, esperado)):
+            diferencias.append((clave, actual, esperado))
+    return diferencias
+
+def sample_users(supabase, sample, seed=None):
+    response = supabase.table('Usuarios').select('id').execute()
+    ids = [row['id'] for row in response.data]
+    if sample and sample < len(ids):
+        ids = random.Random(seed).sample(ids, sample)
+    return ids
+
+def check(supabase, user_ids, repair=False):
+    """Verificar el rollup de los usuarios dados; devuelve cuántos no coinciden"""
+    inconsistentes = 0
+    for user_id in user_ids:
+        diferencias = diff(fetch_rollup(supabase, user_id), compute_from_raw(supabase, user_id))
+        if not diferencias:
+            print(f"✅ {user_id}")
+            continue
+        inconsistentes += 1
+        print(f"❌ {user_id}: {len(diferencias)} diferencia(s)")
+        for (mes, tipo, categoria), actual, esperado in diferencias[:10]:
+            print(f"   {mes} {tipo}/{categoria}: rollup={actual} crudo={esperado}")
+        if repair:
+            rebuild(supabase, user_id)
+            print(f"   🔧 Rollup reconstruido")
+    return inconsistentes
+
+def main():
+    parser = argparse.ArgumentParser(description='Mantenimiento del rollup mensual de transacciones')
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    backfill_parser = sub.add_parser('backfill', help='reconstruir el rollup desde Transacciones')
+    backfill_parser.add_argument('--user', help='id del usuario (por defecto todos)')
+    
+    check_parser = sub.add_parser('check', help='comparar el rollup contra las transacciones crudas')
+    check_parser.add_argument('--user', action='append', help='id de usuario a revisar (repetible)')
+    check_parser.add_argument('--sample', type=int, default=20, help='usuarios aleatorios a revisar')
+    check_parser.add_argument('--seed', type=int, help='semilla para el muestreo')
+    check_parser.add_argument('--repair', action='store_true', help='reconstruir los usuarios inconsistentes')
+    
+    args = parser.parse_args()
+    
+    # Configurar Supabase
+    SUPABASE_URL = os.getenv('SUPABASE_URL')
+    SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY')
+    
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print("❌ Error: Variables de entorno SUPABASE_URL y SUPABASE_SERVICE_KEY (o SUPABASE_KEY) no están configuradas")
+        return 2
+    
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    
+    if args.command == 'backfill':
+        filas = rebuild(supabase, args.user)
+        print(f"✅ Rollup reconstruido ({filas} filas)")
+        return 0
+    
+    user_ids = args.user or sample_users(supabase, args.sample, args.seed)
+    print(f"🔍 Verificando rollup de {len(user_ids)} usuario(s)...")
+    inconsistentes = check(supabase, user_ids, repair=args.repair)
+    if inconsistentes:
+        print(f"\n⚠️  {inconsistentes} usuario(s) con diferencias")
+        return 0 if args.repair else 1
+    print("\n🎉 Rollup consistente")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Índice de búsqueda de transacciones por descripción y categoría
+
+Un índice invertido en memoria por usuario: cada palabra (en minúsculas y sin
+acentos) apunta a las transacciones que la contienen. El vocabulario se guarda
+ordenado para encontrar por prefijo con bisect ("netf" -> "netflix") y cada
+palabra se indexa además por sus trigramas para la búsqueda aproximada
+("netflx" -> "netflix"), con la misma similitud que pg_trgm: trigramas
+compartidos entre trigramas totales.
+
+Las palabras de la consulta se combinan con AND. Cada transacción suma por
+palabra 3 si coincide exacta, 2 por prefijo y la similitud (< 1) si es
+aproximada; los resultados se ordenan por puntaje y fecha. Los rangos de monto
+(en valor absoluto) y de fecha se aplican sobre los candidatos.
+
+app.py construye el índice la primera vez que el usuario busca, lo guarda en la
+caché del worker junto con la versión de 'transactions' y lo actualiza en las
+escrituras que hace ese worker. Las de otros workers las aplica al buscar,
+releyendo por id las filas que anotaron en el registro de cambios de
+versions.py.
+"""
+
+import bisect
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+FIELDS = ('fecha', 'tipo', 'categoria', 'monto', 'descripcion')
+FUZZY_THRESHOLD = 0.3
+FUZZY_MIN_LENGTH = 3
+SCORE_EXACT = 3.0
+SCORE_PREFIX = 2.0
+# Hasta este número de coincidencias se ordenan directamente
+SMALL_RESULT = 2000
+
+_WORD = re.compile(r'[0-9a-z]+')
+
+
+def normalize(text):
+    """'Suscripción NETFLIX' -> 'suscripcion netflix'"""
+    text = unicodedata.normalize('NFKD', str(text or '').lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return _WORD.findall(normalize(text))
+
+
+def trigrams(token):
+    """Trigramas con el relleno de pg_trgm: 'gas' -> {'  g', ' ga', 'gas', 'as '}"""
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Índice invertido de las transacciones de un usuario, seguro entre hilos"""
+
+    def __init__(self, fuzzy_threshold=FUZZY_THRESHOLD):
+        self.fuzzy_threshold = fuzzy_threshold
+        self._docs = {}        # id -> (fecha, tipo, categoria, monto, descripcion)
+        self._fechas = {}      # id -> fecha
+        self._por_fecha = []   # (fecha, id) ordenados, para recorrer de la más reciente
+        self._doc_tokens = {}  # id -> palabras de la transacción
+        self._postings = {}    # palabra -> ids
+        self._vocab = []       # palabras ordenadas, para buscar por prefijo
+        self._grams = {}       # trigrama -> palabras
+        self._gram_count = {}  # palabra -> cuántos trigramas tiene
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    # -- escritura ----------------------------------------------------------
+
+    def _add_token(self, token):
+        # Los números (montos, folios) solo se buscan por prefijo
+        if not token.isdigit():
+            grams = trigrams(token)
+            self._gram_count[token] = len(grams)
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(token)
+
+    def _drop_token(self, token):
+        del self._postings[token]
+        i = bisect.bisect_left(self._vocab, token)
+        del self._vocab[i]
+        if self._gram_count.pop(token, None) is not None:
+            for gram in trigrams(token):
+                palabras = self._grams[gram]
+                palabras.discard(token)
+                if not palabras:
+                    del self._grams[gram]
+
+    def _remove(self, row_id):
+        for token in self._doc_tokens.pop(row_id, ()):
+            ids = self._postings[token]
+            ids.discard(row_id)
+            if not ids:
+                self._drop_token(token)
+        self._docs.pop(row_id, None)
+        fecha = self._fechas.pop(row_id, None)
+        if fecha is not None:
+            del self._por_fecha[bisect.bisect_left(self._por_fecha, (fecha, row_id))]
+
+    def update(self, rows):
+        """Agregar o reemplazar transacciones (filas con id y los campos de FIELDS)"""
+        with self._lock:
+            nuevas = []
+            fechas_nuevas = []
+            for row in rows:
+                row_id = str(row['id'])
+                if row_id in self._docs:
+                    self._remove(row_id)
+                tokens = set(tokenize(row.get('descripcion'))) | set(tokenize(row.get('categoria')))
+                self._docs[row_id] = tuple(row.get(f) for f in FIELDS)
+                self._fechas[row_id] = str(row.get('fecha') or '')
+                fechas_nuevas.append((self._fechas[row_id], row_id))
+                self._doc_tokens[row_id] = tokens
+                for token in tokens:
+                    ids = self._postings.get(token)
+                    if ids is None:
+                        ids = self._postings[token] = set()
+                        self._add_token(token)
+                        nuevas.append(token)
+                    ids.add(row_id)
+            # Con muchas palabras nuevas (la carga inicial) ordenar una vez sale
+            # mucho más barato que insertar cada una en su lugar
+            for ordenada, agregadas in ((self._vocab, nuevas), (self._por_fecha, fechas_nuevas)):
+                if len(agregadas) > 1:
+                    ordenada.extend(agregadas)
+                    ordenada.sort()
+                elif agregadas:
+                    bisect.insort(ordenada, agregadas[0])
+        return self
+
+    def add(self, row):
+        return self.update((row,))
+
+    def remove(self, row_id):
+        with self._lock:
+            self._remove(str(row_id))
+
+    # -- lectura ------------------------------------------------------------
+
+    def _prefix_tokens(self, term):
+        i = bisect.bisect_left(self._vocab, term)
+        while i < len(self._vocab) and self._vocab[i].startswith(term):
+            yield self._vocab[i]
+            i += 1
+
+    def _fuzzy_tokens(self, term):
+        """(palabra, similitud) del vocabulario parecidas a term"""
+        grams = trigrams(term)
+        compartidos = {}
+        for gram in grams:
+            for token in self._grams.get(gram, ()):
+                compartidos[token] = compartidos.get(token, 0) + 1
+        for token, n in compartidos.items():
+            similitud = n / (len(grams) + self._gram_count[token] - n)
+            if similitud >= self.fuzzy_threshold:
+                yield token, similitud
+
+    def _match(self, term, fuzzy):
+        """Puntaje de cada transacción que contiene term (exacta, prefijo o aproximada)"""
+        # De menor a mayor puntaje: cada update() pisa con el mejor de cada transacción
+        niveles = []
+        if fuzzy and len(term) >= FUZZY_MIN_LENGTH:
+            # Las que empiezan con term ya cuentan por prefijo
+            aproximadas = [(t, sim) for t, sim in self._fuzzy_tokens(term) if not t.startswith(term)]
+            niveles.extend(sorted(aproximadas, key=lambda item: item[1]))
+        niveles.extend((token, SCORE_PREFIX) for token in self._prefix_tokens(term) if token != term)
+        if term in self._postings:
+            niveles.append((term, SCORE_EXACT))
+
+        puntajes = {}
+        for token, puntaje in niveles:
+            puntajes.update(dict.fromkeys(self._postings[token], puntaje))
+        return puntajes
+
+    def _best(self, candidatos, limit):
+        """Ids de las `limit` mejores: mayor puntaje y, dentro del mismo puntaje, más recientes
+
+        Con la misma fecha desempata el id (descendente), igual que el orden de _por_fecha.
+        """
+        fechas = self._fechas
+        if len(candidatos) <= SMALL_RESULT:
+            return sorted(candidatos, key=lambda i: (candidatos[i], fechas[i], i), reverse=True)[:limit]
+
+        # Muchos candidatos y pocos puntajes distintos: de cada puntaje, de mayor a
+        # menor, hacen falta todos hasta juntar `limit`. Se recorren las
+        # transacciones de la más reciente a la más antigua y se llenan esos
+        # grupos; con una consulta amplia se termina después de pocas filas.
+        cupo = {}
+        pendientes = limit
+        for puntaje, n in sorted(Counter(candidatos.values()).items(), reverse=True):
+            cupo[puntaje] = min(n, pendientes)
+            pendientes -= cupo[puntaje]
+            if not pendientes:
+                break
+        grupos = {puntaje: [] for puntaje in cupo}
+        faltan = sum(cupo.values())
+        for _, row_id in reversed(self._por_fecha):
+            puntaje = candidatos.get(row_id)
+            grupo = grupos.get(puntaje)
+            if grupo is not None and len(grupo) < cupo[puntaje]:
+                grupo.append(row_id)
+                faltan -= 1
+                if not faltan:
+                    break
+        return [row_id for puntaje in cupo for row_id in grupos[puntaje]]
+
+    def search(self, query='', tipo=None, monto_min=None, monto_max=None, desde=None, hasta=None,
+               limit=50, fuzzy=True):
+        """Buscar; devuelve (total de coincidencias, las `limit` mejores como dicts)
+
+        desde y hasta son fechas ISO (YYYY-MM-DD) inclusivas.
+        """
+        terms = tokenize(query)
+        with self._lock:
+            if terms:
+                candidatos = None
+                for term in terms:
+                    puntajes = self._match(term, fuzzy)
+                    if candidatos is None:
+                        candidatos = puntajes
+                    else:
+                        pequeño, grande = sorted((candidatos, puntajes), key=len)
+                        candidatos = {i: s + grande[i] for i, s in pequeño.items() if i in grande}
+                    if not candidatos:
+                        break
+            else:
+                candidatos = dict.fromkeys(self._docs, 0)
+
+            docs = self._docs
+            filtrar = tipo or monto_min is not None or monto_max is not None or desde or hasta
+            if filtrar:
+                seleccion = {}
+                for row_id, puntaje in candidatos.items():
+                    fecha, tipo_row, _, monto, _ = docs[row_id]
+                    if tipo and tipo_row != tipo:
+                        continue
+                    if monto_min is not None or monto_max is not None:
+                        monto = abs(monto or 0)
+                        if (monto_min is not None and monto < monto_min) or (monto_max is not None and monto > monto_max):
+                            continue
+                    fecha = str(fecha)[:10]
+                    if (desde and fecha < desde) or (hasta and fecha > hasta):
+                        continue
+                    seleccion[row_id] = puntaje
+                candidatos = seleccion
+
+            resultados = [dict(zip(FIELDS, docs[row_id]), id=row_id, puntaje=round(candidatos[row_id], 3))
+                          for row_id in self._best(candidatos, limit)]
+        return len(candidatos), resultados
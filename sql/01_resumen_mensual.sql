@@ -0,0 +1,29 @@
+-- Agregación del resumen mensual del dashboard en la base de datos
+--
+-- Devuelve una fila por (tipo, categoria) con la suma de montos del mes, de modo
+-- que /api/dashboard-summary recibe unas pocas filas sin importar cuántas
+-- transacciones tenga el usuario. Si la función no existe la aplicación vuelve
+-- a agregar en Python.
+--
+-- Ejecutar en el editor SQL de Supabase.
+
+CREATE OR REPLACE FUNCTION resumen_mensual(p_usuario_id uuid, p_mes text)
+RETURNS TABLE (tipo text, categoria text, total numeric, total_abs numeric, cantidad bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT t.tipo,
+           t.categoria,
+           sum(t.monto)::numeric      AS total,
+           sum(abs(t.monto))::numeric AS total_abs,
+           count(*)                   AS cantidad
+    FROM "Transacciones" t
+    WHERE t.usuario_id = p_usuario_id
+      AND t.fecha::date >= (p_mes || '-01')::date
+      AND t.fecha::date < (p_mes || '-01')::date + interval '1 month'
+    GROUP BY t.tipo, t.categoria;
+$$;
+
+-- Índice para las consultas por usuario y rango de fechas (resumen y últimas 10)
+CREATE INDEX IF NOT EXISTS transacciones_usuario_fecha_idx
+    ON "Transacciones" (usuario_id, fecha DESC);
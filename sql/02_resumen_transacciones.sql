@@ -0,0 +1,136 @@
+-- Resumen mensual incremental de transacciones (rollup)
+--
+-- Una fila por (usuario_id, mes, tipo, categoria) con la suma de montos y el
+-- número de transacciones. Un trigger la mantiene en cada INSERT, UPDATE y
+-- DELETE sobre "Transacciones", dentro de la misma transacción que la
+-- escritura, así que ningún handler necesita un viaje extra a la base de datos.
+--
+-- Reconstrucción/reparación: python rollups.py backfill [--user ID]
+-- Verificación contra los datos crudos: python rollups.py check --sample 20
+--
+-- Ejecutar en el editor SQL de Supabase después de 01_resumen_mensual.sql.
+--
+-- aplicar_delta_resumen y reconstruir_resumen_transacciones escriben el rollup
+-- de cualquier usuario, así que PostgREST no debe exponerlas a anon ni a
+-- authenticated: solo service_role puede llamarlas por /rpc. El trigger corre
+-- como SECURITY DEFINER para seguir aplicando los deltas sin ese permiso.
+
+CREATE TABLE IF NOT EXISTS "Resumen transacciones" (
+    usuario_id UUID NOT NULL,
+    mes TEXT NOT NULL,               -- 'YYYY-MM'
+    tipo TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    total NUMERIC NOT NULL DEFAULT 0,      -- sum(monto)
+    total_abs NUMERIC NOT NULL DEFAULT 0,  -- sum(abs(monto))
+    cantidad BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (usuario_id, mes, tipo, categoria)
+);
+
+CREATE OR REPLACE FUNCTION aplicar_delta_resumen(
+    p_usuario_id uuid, p_mes text, p_tipo text, p_categoria text,
+    p_total numeric, p_total_abs numeric, p_cantidad bigint)
+RETURNS void
+LANGUAGE sql
+AS $$
+    INSERT INTO "Resumen transacciones" AS r
+        (usuario_id, mes, tipo, categoria, total, total_abs, cantidad)
+    VALUES (p_usuario_id, p_mes, p_tipo, p_categoria, p_total, p_total_abs, p_cantidad)
+    ON CONFLICT (usuario_id, mes, tipo, categoria) DO UPDATE
+        SET total = r.total + EXCLUDED.total,
+            total_abs = r.total_abs + EXCLUDED.total_abs,
+            cantidad = r.cantidad + EXCLUDED.cantidad;
+
+    DELETE FROM "Resumen transacciones"
+    WHERE usuario_id = p_usuario_id AND mes = p_mes
+      AND tipo = p_tipo AND categoria = p_categoria AND cantidad <= 0;
+$$;
+
+CREATE OR REPLACE FUNCTION ajustar_resumen_transacciones()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM aplicar_delta_resumen(OLD.usuario_id, to_char(OLD.fecha::date, 'YYYY-MM'),
+                                      OLD.tipo, OLD.categoria,
+                                      -OLD.monto, -abs(OLD.monto), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM aplicar_delta_resumen(NEW.usuario_id, to_char(NEW.fecha::date, 'YYYY-MM'),
+                                      NEW.tipo, NEW.categoria,
+                                      NEW.monto, abs(NEW.monto), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS transacciones_resumen_trg ON "Transacciones";
+CREATE TRIGGER transacciones_resumen_trg
+    AFTER INSERT OR UPDATE OR DELETE ON "Transacciones"
+    FOR EACH ROW EXECUTE FUNCTION ajustar_resumen_transacciones();
+
+-- Reconstruir el rollup desde "Transacciones" (un usuario o todos si es NULL).
+-- La reconstrucción completa bloquea escrituras sobre "Transacciones" mientras
+-- corre para no mezclar deltas del trigger con ella. La de un usuario solo
+-- toma un candado advisory por usuario (dos reconstrucciones del mismo usuario
+-- no se cruzan) y bloquea las filas de ese usuario con FOR UPDATE; un INSERT
+-- concurrente suma su delta antes del DELETE (que lo espera) o después del
+-- INSERT, y el ON CONFLICT lo acumula. Devuelve una fila (no un escalar)
+-- porque el cliente de PostgREST siempre espera una lista.
+CREATE OR REPLACE FUNCTION reconstruir_resumen_transacciones(p_usuario_id uuid DEFAULT NULL)
+RETURNS TABLE (filas bigint)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_filas bigint;
+BEGIN
+    IF p_usuario_id IS NULL THEN
+        LOCK TABLE "Transacciones" IN SHARE MODE;
+    ELSE
+        PERFORM pg_advisory_xact_lock(hashtext(p_usuario_id::text));
+        PERFORM 1 FROM "Transacciones" WHERE usuario_id = p_usuario_id FOR UPDATE;
+    END IF;
+
+    DELETE FROM "Resumen transacciones"
+    WHERE p_usuario_id IS NULL OR usuario_id = p_usuario_id;
+
+    INSERT INTO "Resumen transacciones" AS r (usuario_id, mes, tipo, categoria, total, total_abs, cantidad)
+    SELECT usuario_id, to_char(fecha::date, 'YYYY-MM'), tipo, categoria,
+           sum(monto), sum(abs(monto)), count(*)
+    FROM "Transacciones"
+    WHERE p_usuario_id IS NULL OR usuario_id = p_usuario_id
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (usuario_id, mes, tipo, categoria) DO UPDATE
+        SET total = r.total + EXCLUDED.total,
+            total_abs = r.total_abs + EXCLUDED.total_abs,
+            cantidad = r.cantidad + EXCLUDED.cantidad;
+
+    GET DIAGNOSTICS v_filas = ROW_COUNT;
+    RETURN QUERY SELECT v_filas;
+END;
+$$;
+
+-- Solo el service_role (rollups.py) puede llamar por /rpc a las funciones que
+-- escriben el rollup
+REVOKE ALL ON FUNCTION aplicar_delta_resumen(uuid, text, text, text, numeric, numeric, bigint)
+    FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION reconstruir_resumen_transacciones(uuid) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION aplicar_delta_resumen(uuid, text, text, text, numeric, numeric, bigint) TO service_role;
+GRANT EXECUTE ON FUNCTION reconstruir_resumen_transacciones(uuid) TO service_role;
+
+-- Con el rollup disponible el resumen del dashboard se responde desde él:
+-- unas decenas de filas sin importar cuántas transacciones tenga el mes.
+CREATE OR REPLACE FUNCTION resumen_mensual(p_usuario_id uuid, p_mes text)
+RETURNS TABLE (tipo text, categoria text, total numeric, total_abs numeric, cantidad bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT r.tipo, r.categoria, r.total, r.total_abs, r.cantidad
+    FROM "Resumen transacciones" r
+    WHERE r.usuario_id = p_usuario_id AND r.mes = p_mes;
+$$;
+
+-- Poblar el rollup con el historial existente
+SELECT reconstruir_resumen_transacciones();
@@ -1,90 +1,375 @@
-const CACHE_NAME = 'finanzas-pwa-v1';
-const urlsToCache = [
-    '/',
-    '/static/css/style.css',
-    '/static/js/app.js',
-    '/static/icons/icon-192x192.png',
-    '/static/icons/icon-512x512.png',
-    '/dashboard',
-    '/transactions',
-    '/fixed-expenses',
-    '/profile',
-    '/manifest.json'
+// Service Worker de Finanzas PWA
+//
+// Se sirve desde /sw.js (ver app.py), que reemplaza __CACHE_VERSION__ por un
+// hash de los archivos del despliegue (cada deploy usa cachés nuevas y al
+// activarse borra las anteriores) y __PRECACHE_URLS__ por las URLs con hash
+// del manifiesto de build_assets.py.
+//
+// Estrategias por tipo de petición:
+// - /static/*          cache-first (los de /static/dist/ llevan hash y nunca cambian)
+// - páginas HTML       network-first, con la copia guardada si no hay red
+// - GET /api/*         stale-while-revalidate, con antigüedad máxima
+// Cualquier escritura a /api/* (POST, PUT, DELETE) vacía la caché de la API
+// para no mostrar totales viejos; el login y el logout vacían también las páginas.
+//
+// Sin conexión, las escrituras de transacciones y gastos fijos se guardan en una
+// cola en IndexedDB y se responden con 202. Al volver la conexión (Background
+// Sync, o un aviso de la página donde no existe) la cola se envía entera a
+// POST /api/batch en una sola petición; cada mutación lleva una clave de
+// idempotencia y las altas el id de la fila, así que reenviarla no duplica nada.
+
+const CACHE_VERSION = '__CACHE_VERSION__';
+
+const CACHES = {
+    static: { name: `finanzas-static-${CACHE_VERSION}`, maxEntries: 60, maxAgeSeconds: 30 * 24 * 3600 },
+    pages: { name: `finanzas-pages-${CACHE_VERSION}`, maxEntries: 20, maxAgeSeconds: 7 * 24 * 3600 },
+    api: { name: `finanzas-api-${CACHE_VERSION}`, maxEntries: 50, maxAgeSeconds: 10 * 60 }
+};
+
+const PRECACHE_URLS = '__PRECACHE_URLS__';
+
+// Respuestas que nunca se guardan (descargas e importaciones en streaming, y
+// búsquedas: una por tecla desplazaría del límite de entradas al resto de la API)
+const API_NO_CACHE = [
+    '/api/transactions/export',
+    '/api/transactions/import',
+    '/api/transactions/search'
 ];
 
+const CACHED_AT_HEADER = 'sw-cached-at';
+
+// Escrituras que se encolan cuando no hay red
+const QUEUEABLE = /^\/api\/(transactions|fixed-expenses)(\/[^/]+)?$/;
+const QUEUE_DB = 'finanzas-offline';
+const QUEUE_STORE = 'mutations';
+const SYNC_TAG = 'sync-mutations';
+const BATCH_SIZE = 100;
+
+// ---------------------------------------------------------------------------
+// Cachés acotadas con expulsión LRU
+// ---------------------------------------------------------------------------
+
+// Guardar una copia con la hora de guardado; delete + put la deja al final del orden de keys()
+async function putInCache(config, request, response) {
+    const headers = new Headers(response.headers);
+    headers.set(CACHED_AT_HEADER, Date.now().toString());
+    const body = await response.blob();
+    const cache = await caches.open(config.name);
+    await cache.delete(request);
+    await cache.put(request, new Response(body, {
+        status: response.status,
+        statusText: response.statusText,
+        headers: headers
+    }));
+    await trimCache(config);
+}
+
+// cache.keys() devuelve las entradas en orden de inserción: las primeras son las menos usadas
+async function trimCache(config) {
+    const cache = await caches.open(config.name);
+    const keys = await cache.keys();
+    for (let i = 0; i < keys.length - config.maxEntries; i++) {
+        await cache.delete(keys[i]);
+    }
+}
+
+function isExpired(config, response) {
+    const cachedAt = parseInt(response.headers.get(CACHED_AT_HEADER) || '0', 10);
+    return Date.now() - cachedAt > config.maxAgeSeconds * 1000;
+}
+
+// Buscar una entrada vigente; un acierto la mueve al final (usada recientemente)
+async function matchFresh(config, request, touch = true) {
+    const cache = await caches.open(config.name);
+    const response = await cache.match(request);
+    if (!response) {
+        return null;
+    }
+    if (isExpired(config, response)) {
+        await cache.delete(request);
+        return null;
+    }
+    if (touch) {
+        const copy = response.clone();
+        await cache.delete(request);
+        await cache.put(request, copy);
+    }
+    return response;
+}
+
+function isCacheable(response) {
+    return response && response.status === 200 && response.type === 'basic' && !response.redirected &&
+        !(response.headers.get('Cache-Control') || '').includes('no-store');
+}
+
+// ---------------------------------------------------------------------------
+// Estrategias
+// ---------------------------------------------------------------------------
+
+async function cacheFirst(event, config) {
+    const cached = await matchFresh(config, event.request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(event.request);
+    if (isCacheable(response)) {
+        event.waitUntil(putInCache(config, event.request, response.clone()));
+    }
+    return response;
+}
+
+async function networkFirst(event, config) {
+    try {
+        const response = await fetch(event.request);
+        if (isCacheable(response)) {
+            event.waitUntil(putInCache(config, event.request, response.clone()));
+        }
+        return response;
+    } catch (error) {
+        const cached = await matchFresh(config, event.request, false);
+        if (cached) {
+            return cached;
+        }
+        const fallback = await caches.match('/dashboard', { cacheName: config.name });
+        return fallback || new Response('<h1>Sin conexión</h1>', {
+            status: 503,
+            headers: { 'Content-Type': 'text/html; charset=utf-8' }
+        });
+    }
+}
+
+async function staleWhileRevalidate(event, config) {
+    const cached = await matchFresh(config, event.request, false);
+
+    const network = fetch(event.request).then(async response => {
+        if (isCacheable(response)) {
+            await putInCache(config, event.request, response.clone());
+            if (cached) {
+                notifyIfChanged(event.request.url, cached, response.clone());
+            }
+        }
+        return response;
+    });
+
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+
+    try {
+        return await network;
+    } catch (error) {
+        return offlineApiResponse();
+    }
+}
+
+// Avisar a las páginas cuando la respuesta nueva difiere de la que se mostró
+async function notifyIfChanged(url, cached, fresh) {
+    const [before, after] = await Promise.all([cached.clone().text(), fresh.text()]);
+    if (before === after) {
+        return;
+    }
+    const windows = await self.clients.matchAll({ type: 'window' });
+    windows.forEach(client => client.postMessage({ type: 'api-updated', url: url }));
+}
+
+function offlineApiResponse() {
+    return new Response(JSON.stringify({
+        error: 'Sin conexión',
+        offline: true
+    }), {
+        status: 503,
+        headers: {
+            'Content-Type': 'application/json'
+        }
+    });
+}
+
+async function invalidateAfterWrite(event) {
+    const path = new URL(event.request.url).pathname;
+    // Copia del cuerpo antes de enviarlo, por si hay que encolarlo
+    const pending = QUEUEABLE.test(path) && !path.endsWith('/import') ? event.request.clone() : null;
+    let response;
+    try {
+        response = await fetch(event.request);
+    } catch (error) {
+        if (!pending) {
+            throw error;
+        }
+        return enqueueMutation(pending, path);
+    }
+    if (response.ok) {
+        await caches.delete(CACHES.api.name);
+        // Otra sesión no debe ver páginas ni datos de la anterior
+        if (path === '/api/login' || path === '/api/logout') {
+            await caches.delete(CACHES.pages.name);
+        }
+    }
+    return response;
+}
+
+// ---------------------------------------------------------------------------
+// Cola de escrituras sin conexión (IndexedDB)
+// ---------------------------------------------------------------------------
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(QUEUE_DB, 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore(QUEUE_STORE, { keyPath: 'seq', autoIncrement: true });
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Ejecutar fn(store) en una transacción y esperar a que termine
+async function withQueue(mode, fn) {
+    const db = await openQueue();
+    try {
+        return await new Promise((resolve, reject) => {
+            const tx = db.transaction(QUEUE_STORE, mode);
+            const result = fn(tx.objectStore(QUEUE_STORE));
+            tx.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    } finally {
+        db.close();
+    }
+}
+
+async function enqueueMutation(request, path) {
+    const text = await request.text();
+    let body = text ? JSON.parse(text) : null;
+    // Las altas llevan el id de la fila: si el lote se reenvía, el servidor no la duplica
+    if (request.method === 'POST' && body && !body.id) {
+        body = { ...body, id: self.crypto.randomUUID() };
+    }
+    await withQueue('readwrite', store => store.add({
+        id: self.crypto.randomUUID(),
+        method: request.method,
+        path: path,
+        body: body,
+        queuedAt: Date.now()
+    }));
+    if (self.registration.sync) {
+        await self.registration.sync.register(SYNC_TAG).catch(() => {});
+    }
+    return new Response(JSON.stringify({
+        success: true,
+        queued: true,
+        message: 'Sin conexión: el cambio se enviará al recuperar la conexión',
+        data: body
+    }), {
+        status: 202,
+        headers: { 'Content-Type': 'application/json' }
+    });
+}
+
+// Enviar la cola en lotes a /api/batch; lo que el servidor contestó (bien o con
+// error de validación) sale de la cola, lo que falló por red o 5xx se reintenta
+let flushing = null;
+
+function flushQueue() {
+    if (!flushing) {
+        flushing = doFlushQueue().finally(() => { flushing = null; });
+    }
+    return flushing;
+}
+
+async function doFlushQueue() {
+    const pending = await withQueue('readonly', store => store.getAll());
+    let sent = 0;
+    for (let i = 0; i < pending.length; i += BATCH_SIZE) {
+        const chunk = pending.slice(i, i + BATCH_SIZE);
+        const response = await fetch('/api/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            credentials: 'same-origin',
+            body: JSON.stringify({
+                mutations: chunk.map(({ id, method, path, body }) => ({ id, method, path, body }))
+            })
+        });
+        if (!response.ok) {
+            // Sesión vencida o servidor caído: se conserva la cola para el próximo intento
+            throw new Error(`Lote rechazado: ${response.status}`);
+        }
+        const { results } = await response.json();
+        const done = new Set(results.filter(r => r.status < 500).map(r => r.id));
+        await withQueue('readwrite', store => {
+            chunk.filter(m => done.has(m.id)).forEach(m => store.delete(m.seq));
+        });
+        sent += done.size;
+        if (done.size < chunk.length) {
+            throw new Error('Algunas mutaciones fallaron; se reintentarán');
+        }
+    }
+    if (sent) {
+        await caches.delete(CACHES.api.name);
+        const windows = await self.clients.matchAll({ type: 'window' });
+        windows.forEach(client => client.postMessage({ type: 'queue-flushed', count: sent }));
+    }
+    return sent;
+}
+
+// ---------------------------------------------------------------------------
+// Ciclo de vida
+// ---------------------------------------------------------------------------
+
 // Instalar Service Worker
 self.addEventListener('install', function(event) {
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then(function(cache) {
-                console.log('Cache abierto');
-                return cache.addAll(urlsToCache);
-            })
+        Promise.all(PRECACHE_URLS.map(url =>
+            fetch(url).then(response => isCacheable(response) && putInCache(CACHES.static, url, response))
+        )).then(() => self.skipWaiting())
     );
 });
 
-// Activar Service Worker
+// Activar Service Worker: borrar las cachés de versiones anteriores
 self.addEventListener('activate', function(event) {
+    const current = Object.values(CACHES).map(config => config.name);
     event.waitUntil(
         caches.keys().then(function(cacheNames) {
             return Promise.all(
                 cacheNames.map(function(cacheName) {
-                    if (cacheName !== CACHE_NAME) {
+                    if (!current.includes(cacheName)) {
                         console.log('Eliminando cache antiguo:', cacheName);
                         return caches.delete(cacheName);
                     }
                 })
             );
-        })
+        }).then(() => self.clients.claim())
     );
 });
 
 // Interceptar requests
 self.addEventListener('fetch', function(event) {
-    event.respondWith(
-        caches.match(event.request)
-            .then(function(response) {
-                // Devolver desde cache si existe
-                if (response) {
-                    return response;
-                }
-
-                // Si es una API request y estamos offline, devolver datos por defecto
-                if (event.request.url.includes('/api/') && !navigator.onLine) {
-                    return new Response(JSON.stringify({
-                        error: 'Sin conexión',
-                        offline: true
-                    }), {
-                        headers: {
-                            'Content-Type': 'application/json'
-                        }
-                    });
-                }
-
-                // Intentar hacer fetch normal
-                return fetch(event.request).then(function(response) {
-                    // Si es una respuesta válida, guardar en cache
-                    if (!response || response.status !== 200 || response.type !== 'basic') {
-                        return response;
-                    }
+    const request = event.request;
+    const url = new URL(request.url);
 
-                    const responseToCache = response.clone();
+    if (url.origin !== self.location.origin) {
+        return;
+    }
 
-                    caches.open(CACHE_NAME)
-                        .then(function(cache) {
-                            cache.put(event.request, responseToCache);
-                        });
+    if (url.pathname.startsWith('/api/')) {
+        if (request.method !== 'GET') {
+            event.respondWith(invalidateAfterWrite(event));
+        } else if (!API_NO_CACHE.some(path => url.pathname.startsWith(path))) {
+            event.respondWith(staleWhileRevalidate(event, CACHES.api));
+        }
+        return;
+    }
 
-                    return response;
-                });
-            })
-            .catch(function() {
-                // Si falla todo, devolver página offline para navegación
-                if (event.request.destination === 'document') {
-                    return caches.match('/');
-                }
-            })
-    );
+    if (request.method !== 'GET' || url.pathname === '/sw.js' || url.pathname === '/health') {
+        return;
+    }
+
+    if (url.pathname.startsWith('/static/') || url.pathname === '/manifest.json') {
+        event.respondWith(cacheFirst(event, CACHES.static));
+    } else if (request.mode === 'navigate' || (request.headers.get('Accept') || '').includes('text/html')) {
+        event.respondWith(networkFirst(event, CACHES.pages));
+    }
 });
 
 // Manejar mensajes del cliente
@@ -92,6 +377,10 @@ self.addEventListener('message', function(event) {
     if (event.data && event.data.type === 'SKIP_WAITING') {
         self.skipWaiting();
     }
+    // La página avisa al volver la conexión (navegadores sin Background Sync)
+    if (event.data && event.data.type === 'FLUSH_QUEUE') {
+        event.waitUntil(flushQueue().catch(error => console.log('Cola pendiente:', error.message)));
+    }
 });
 
 // Notificaciones push (opcional para futuras funcionalidades)
@@ -135,12 +424,10 @@ self.addEventListener('notificationclick', function(event) {
     }
 });
 
-// Sincronización en segundo plano
+// Sincronización en segundo plano: reenviar la cola de escrituras sin conexión.
+// Si falla, el navegador vuelve a intentar más tarde.
 self.addEventListener('sync', function(event) {
-    if (event.tag === 'background-sync') {
-        event.waitUntil(
-            // Aquí se pueden sincronizar datos pendientes cuando se recupere la conexión
-            console.log('Sincronización en segundo plano')
-        );
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(flushQueue());
     }
-});
\ No newline at end of file
+});
@@ -0,0 +1,144 @@
+"""
+Cliente de Supabase por worker con conexiones persistentes
+
+El cliente se crea la primera vez que se usa dentro de cada proceso (después
+del fork de gunicorn) y se vuelve a crear si el proceso cambia, así ningún
+worker comparte sockets con el proceso maestro. Las peticiones a PostgREST
+pasan por un pool httpx con keep-alive, tiempos de espera explícitos y
+contadores de reutilización de conexiones.
+"""
+
+import os
+import threading
+import time
+
+import httpx
+from postgrest.utils import SyncClient
+from supabase import create_client
+
+import metrics
+
+
+def pool_settings():
+    """Tamaño del pool y tiempos de espera (se leen al crear el cliente, después de load_dotenv)"""
+    return {
+        'pool_size': int(os.getenv('SUPABASE_POOL_SIZE', '10')),
+        'keepalive_expiry': float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY', '60')),
+        'connect_timeout': float(os.getenv('SUPABASE_CONNECT_TIMEOUT', '5')),
+        'read_timeout': float(os.getenv('SUPABASE_READ_TIMEOUT', '30')),
+    }
+
+
+class PoolStats:
+    """Contadores de peticiones y conexiones del proceso actual"""
+
+    FIELDS = ('requests', 'connections_opened', 'tls_handshakes', 'timeouts', 'errors')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, field):
+        with self._lock:
+            self._counts[field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        # Cada petición que no abrió conexión nueva usó una del pool
+        counts['connections_reused'] = max(counts['requests'] - counts['connections_opened'], 0)
+        return counts
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """Transporte httpx que registra conexiones nuevas, timeouts, errores y el tiempo de cada llamada"""
+
+    def __init__(self, stats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def _trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            self.stats.incr('connections_opened')
+        elif event_name == 'connection.start_tls.complete':
+            self.stats.incr('tls_handshakes')
+
+    def handle_request(self, request):
+        self.stats.incr('requests')
+        request.extensions['trace'] = self._trace
+        inicio = time.perf_counter()
+        try:
+            return super().handle_request(request)
+        except httpx.TimeoutException:
+            self.stats.incr('timeouts')
+            raise
+        except httpx.TransportError:
+            self.stats.incr('errors')
+            raise
+        finally:
+            # Hasta recibir los encabezados: PostgREST responde cuerpos chicos
+            metrics.record_upstream(time.perf_counter() - inicio)
+
+
+def build_client(url, key, stats, settings):
+    """Crear el cliente de Supabase con un pool httpx propio para PostgREST"""
+    client = create_client(url, key)
+    base = client.postgrest.session
+    client.postgrest.session = SyncClient(
+        base_url=base.base_url,
+        headers=base.headers,
+        timeout=httpx.Timeout(settings['read_timeout'], connect=settings['connect_timeout']),
+        transport=CountingTransport(
+            stats,
+            limits=httpx.Limits(
+                max_connections=settings['pool_size'],
+                max_keepalive_connections=settings['pool_size'],
+                keepalive_expiry=settings['keepalive_expiry']
+            )
+        )
+    )
+    base.close()
+    return client
+
+
+class LazySupabase:
+    """Se comporta como el cliente de Supabase pero lo crea por proceso al primer uso"""
+
+    def __init__(self, url, key):
+        self._url = url
+        self._key = key
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.settings = None
+        self.stats = PoolStats()
+        # Un fork podría copiar el lock tomado por otro hilo; el hijo empieza con uno nuevo
+        os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def get_client(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    # Tras un fork no se cierra el cliente heredado: sus sockets son del padre
+                    self.stats.reset()
+                    self.settings = pool_settings()
+                    self._client = build_client(self._url, self._key, self.stats, self.settings)
+                    self._pid = pid
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get_client(), name)
+
+    def pool_stats(self):
+        stats = self.stats.snapshot()
+        stats['pid'] = os.getpid()
+        stats.update(self.settings or pool_settings())
+        return stats
@@ -0,0 +1,77 @@
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Los módulos de la app están en la raíz del repositorio, sin paquete
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+# El Supabase falso de las pruebas de carga sirve también para probar las rutas
+sys.path.insert(0, str(ROOT_DIR / 'benchmarks'))
+
+USER_ID = '3f2b8c1e-0000-4000-8000-000000000001'
+USER_PHONE = '+525500000001'
+
+
+class FakeClock:
+    """Reloj para los `timer=` de cachés y stores; se avanza asignando `now`"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def reloj():
+    return FakeClock()
+
+
+@pytest.fixture
+def fake_supabase():
+    """Store de benchmarks/fake_supabase.py con un usuario, servido en un puerto libre"""
+    import fake_supabase
+
+    store = fake_supabase.Store()
+    store.tables['Usuarios'].add({'id': USER_ID, 'correo': 'prueba@example.com', 'full_name': 'Prueba',
+                                  'telefono': USER_PHONE, 'activo': True})
+    server = fake_supabase.serve('127.0.0.1', 0, store, fake_supabase.LatencyModel())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    store.url = f'http://127.0.0.1:{server.server_address[1]}'
+    yield store
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def app_module(fake_supabase, tmp_path, monkeypatch):
+    """app.py apuntando al Supabase falso, con versiones e idempotencia en tmp_path"""
+    # app.py las necesita al importarse; el cliente no se conecta hasta el primer uso
+    os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+    os.environ.setdefault('SUPABASE_KEY', 'test.test.test')
+    os.environ.setdefault('FLASK_SECRET_KEY', 'pruebas')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import app
+    import idempotency
+    import versions
+    from supabase_client import LazySupabase
+
+    monkeypatch.setattr(app, 'supabase', LazySupabase(fake_supabase.url, 'test.test.test'))
+    monkeypatch.setattr(app, 'data_versions', versions.DataVersions(str(tmp_path / 'versions')))
+    monkeypatch.setattr(app, 'idempotency_store', idempotency.IdempotencyStore(str(tmp_path / 'idempotency')))
+    for cache in (app.summary_cache, app.profile_cache, app.search_indexes):
+        cache.clear()
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    """Cliente de Flask con la sesión del usuario de prueba iniciada"""
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = USER_ID
+    return client
@@ -0,0 +1,144 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import aggregation
+from aggregation import Aggregator, iso_week, summarize, top_by_date
+
+TODAS = ('categoria', 'tipo', 'dia', 'semana', 'mes')
+
+
+def transacciones(n, seed=7, inicio=date(2024, 12, 20), dias=30):
+    rng = random.Random(seed)
+    filas = []
+    for i in range(n):
+        tipo = 'ingreso' if rng.random() < 0.3 else 'gasto'
+        filas.append({
+            'id': str(i),
+            'fecha': (inicio + timedelta(days=rng.randrange(dias))).isoformat(),
+            'tipo': tipo,
+            'categoria': rng.choice(['Comida', 'Renta', 'Salario', 'Otros']),
+            # Algunos gastos llegan con signo negativo
+            'monto': rng.randrange(1, 5000) * (-1 if tipo == 'gasto' and rng.random() < 0.5 else 1),
+        })
+    return filas
+
+
+def referencia(filas, k):
+    """Lo mismo calculado de la forma más directa"""
+    ingresos = sum(t['monto'] for t in filas if t['tipo'] == 'ingreso')
+    gastos = sum(abs(t['monto']) for t in filas if t['tipo'] == 'gasto')
+    por_categoria = {}
+    for t in filas:
+        grupo = por_categoria.setdefault(t['categoria'], {'ingresos': 0, 'gastos': 0, 'cantidad': 0})
+        grupo['ingresos' if t['tipo'] == 'ingreso' else 'gastos'] += abs(t['monto']) if t['tipo'] == 'gasto' else t['monto']
+        grupo['cantidad'] += 1
+    # sorted es estable: con la misma fecha queda primero la que llegó antes
+    ultimas = sorted(filas, key=lambda t: t['fecha'], reverse=True)[:k]
+    return ingresos, gastos, por_categoria, ultimas
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_totales_grupos_y_ultimas_contra_referencia(engine):
+    filas = transacciones(2000)
+    r = summarize(filas, ('categoria',), top_k=15, engine=engine)
+    ingresos, gastos, por_categoria, ultimas = referencia(filas, 15)
+    assert (r['total_ingresos'], r['total_gastos'], r['balance']) == (ingresos, gastos, ingresos - gastos)
+    assert r['cantidad'] == 2000
+    assert r['grupos']['categoria'] == por_categoria
+    assert r['ultimas'] == ultimas
+
+
+@pytest.mark.parametrize('n', [1, 10, 3000])
+def test_numpy_da_lo_mismo_que_python(n):
+    filas = transacciones(n, seed=n)
+    assert summarize(filas, TODAS, engine='numpy') == summarize(filas, TODAS, engine='python')
+
+
+def test_numpy_con_montos_decimales():
+    filas = [dict(t, monto=t['monto'] / 100) for t in transacciones(500)]
+    python = summarize(filas, ('categoria',), engine='python')
+    numpy = summarize(filas, ('categoria',), engine='numpy')
+    assert numpy['total_gastos'] == pytest.approx(python['total_gastos'])
+    for categoria, grupo in python['grupos']['categoria'].items():
+        assert numpy['grupos']['categoria'][categoria] == pytest.approx(grupo)
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_sin_filas(engine):
+    r = summarize([], TODAS, engine=engine)
+    assert r == {
+        'total_ingresos': 0, 'total_gastos': 0, 'balance': 0, 'cantidad': 0,
+        'grupos': {d: {} for d in TODAS}, 'ultimas': [],
+    }
+
+
+def test_por_bloques_igual_que_de_una_vez():
+    filas = transacciones(1000)
+    agg = Aggregator(TODAS, top_k=10)
+    for i in range(0, len(filas), 137):
+        agg.update(filas[i:i + 137])
+    assert agg.result() == summarize(filas, TODAS)
+    agg = Aggregator(TODAS, top_k=10)
+    for i in range(0, len(filas), 137):
+        agg.update_arrays(filas[i:i + 137])
+    assert agg.result() == summarize(filas, TODAS)
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_empates_de_fecha_conservan_el_orden_de_llegada(engine):
+    filas = [{'id': str(i), 'fecha': '2024-03-05', 'tipo': 'gasto', 'categoria': 'X', 'monto': 1} for i in range(6)]
+    filas.insert(3, {'id': 'nueva', 'fecha': '2024-03-06', 'tipo': 'gasto', 'categoria': 'X', 'monto': 1})
+    ultimas = summarize(filas, top_k=3, engine=engine)['ultimas']
+    assert [t['id'] for t in ultimas] == ['nueva', '0', '1']
+
+
+def test_top_k_cero_y_mayor_que_las_filas():
+    filas = transacciones(5)
+    assert summarize(filas, top_k=0)['ultimas'] == []
+    assert summarize(filas, top_k=50)['ultimas'] == referencia(filas, 50)[3]
+    assert top_by_date(filas, 2) == referencia(filas, 2)[3]
+
+
+def test_semanas_iso_en_el_cambio_de_año():
+    assert iso_week('2024-12-29') == '2024-W52'
+    assert iso_week('2024-12-30') == '2025-W01'
+    assert iso_week('2021-01-03') == '2020-W53'
+    filas = [
+        {'fecha': '2024-12-29', 'tipo': 'gasto', 'categoria': 'X', 'monto': 10},
+        {'fecha': '2024-12-30T23:59:59', 'tipo': 'gasto', 'categoria': 'X', 'monto': 20},
+        {'fecha': '2025-01-01', 'tipo': 'ingreso', 'categoria': 'Y', 'monto': 5},
+    ]
+    grupos = summarize(filas, ('dia', 'semana', 'mes'))['grupos']
+    assert grupos['dia'] == {
+        '2024-12-29': {'ingresos': 0, 'gastos': 10, 'cantidad': 1},
+        '2024-12-30': {'ingresos': 0, 'gastos': 20, 'cantidad': 1},
+        '2025-01-01': {'ingresos': 5, 'gastos': 0, 'cantidad': 1},
+    }
+    assert grupos['semana'] == {
+        '2024-W52': {'ingresos': 0, 'gastos': 10, 'cantidad': 1},
+        '2025-W01': {'ingresos': 5, 'gastos': 20, 'cantidad': 2},
+    }
+    assert grupos['mes'] == {
+        '2024-12': {'ingresos': 0, 'gastos': 30, 'cantidad': 2},
+        '2025-01': {'ingresos': 5, 'gastos': 0, 'cantidad': 1},
+    }
+
+
+def test_agrupacion_invalida():
+    with pytest.raises(ValueError):
+        Aggregator(('categoria', 'hora'))
+
+
+def test_auto_usa_numpy_desde_el_umbral(monkeypatch):
+    llamadas = []
+    original = Aggregator.update_arrays
+    monkeypatch.setattr(Aggregator, 'update_arrays', lambda self, rows: llamadas.append(len(rows)) or original(self, rows))
+    filas = transacciones(100)
+    monkeypatch.setattr(aggregation, 'ARRAY_MIN_ROWS', 0)
+    summarize(filas)
+    monkeypatch.setattr(aggregation, 'ARRAY_MIN_ROWS', 100)
+    summarize(filas[:99])
+    summarize(filas)
+    assert llamadas == [100]
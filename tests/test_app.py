@@ -0,0 +1,103 @@
+import uuid
+
+import pytest
+
+from conftest import USER_ID
+
+
+def add_transactions(store, fechas, user_id=USER_ID):
+    filas = []
+    for i, fecha in enumerate(fechas):
+        fila = {'id': str(uuid.uuid4()), 'usuario_id': user_id, 'fecha': fecha, 'categoria': 'Otros Gastos',
+                'monto': 100 + i, 'descripcion': f'Movimiento {i}', 'tipo': 'gasto'}
+        store.tables['Transacciones'].add(fila)
+        filas.append(fila)
+    return filas
+
+
+def test_paginacion_por_cursor_sin_duplicados_ni_huecos(client, fake_supabase):
+    # Muchas filas con la misma fecha: el id desempata dentro de cada página y entre páginas
+    filas = add_transactions(fake_supabase, ['2024-03-05'] * 9 + ['2024-03-04'] * 7 + ['2024-03-01'] * 5)
+    add_transactions(fake_supabase, ['2024-03-05'] * 3, user_id=str(uuid.uuid4()))
+
+    vistas = []
+    cursor = None
+    # Un cursor que no avanza repetiría páginas para siempre
+    for _ in range(len(filas)):
+        params = {'limit': 4, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/transactions', query_string=params)
+        assert response.status_code == 200
+        pagina = response.get_json()
+        assert len(pagina['data']) <= 4
+        vistas.extend(row['id'] for row in pagina['data'])
+        cursor = pagina['next_cursor']
+        if cursor is None:
+            break
+    else:
+        pytest.fail('la paginación no terminó')
+
+    esperado = [f['id'] for f in sorted(filas, key=lambda f: (f['fecha'], f['id']), reverse=True)]
+    assert vistas == esperado
+
+
+def test_ultima_pagina_exacta_no_tiene_cursor(client, fake_supabase):
+    add_transactions(fake_supabase, ['2024-03-05'] * 4)
+    pagina = client.get('/api/transactions', query_string={'limit': 4}).get_json()
+    assert len(pagina['data']) == 4
+    assert pagina['next_cursor'] is None
+
+
+@pytest.mark.parametrize('params', [
+    {'cursor': 'no-es-un-cursor'},
+    {'cursor': 'WyIyMDI0LTAzLTA1IiwgIngpIl0'},  # ["2024-03-05", "x)"]: rompería el filtro or=
+    {'limit': 'diez'},
+])
+def test_parametros_de_paginacion_invalidos(client, params):
+    response = client.get('/api/transactions', query_string=params)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Parámetros de paginación inválidos'}
+
+
+def transaction_body(row_id, monto):
+    return {'id': row_id, 'fecha': '2024-03-05', 'categoria': 'Otros Gastos', 'monto': monto,
+            'descripcion': 'Café', 'tipo': 'gasto'}
+
+
+def test_batch_repetido_devuelve_lo_guardado_sin_escribir(client, app_module, fake_supabase, tmp_path, monkeypatch):
+    import idempotency
+
+    row_id = str(uuid.uuid4())
+    lote = {'mutations': [
+        {'id': 'm1', 'method': 'POST', 'path': '/api/transactions', 'body': transaction_body(row_id, 100)},
+        {'id': 'm2', 'method': 'PUT', 'path': f'/api/transactions/{row_id}', 'body': transaction_body(row_id, 250)},
+    ]}
+    primera = client.post('/api/batch', json=lote).get_json()['results']
+    assert [(r['id'], r['status'], 'replayed' in r) for r in primera] == [('m1', 200, False), ('m2', 200, False)]
+
+    # Una escritura posterior que el reintento no debe pisar, y el reintento llega a otro worker
+    fake_supabase.tables['Transacciones'].rows[row_id]['monto'] = 999
+    monkeypatch.setattr(app_module, 'idempotency_store', idempotency.IdempotencyStore(str(tmp_path / 'idempotency')))
+
+    segunda = client.post('/api/batch', json=lote).get_json()['results']
+    assert all(r['replayed'] for r in segunda)
+    assert [(r['status'], r['body']) for r in segunda] == [(r['status'], r['body']) for r in primera]
+    assert fake_supabase.tables['Transacciones'].rows[row_id]['monto'] == 999
+    assert len(fake_supabase.tables['Transacciones'].rows) == 1
+
+
+@pytest.mark.parametrize('mutation', [
+    {'id': 'm1', 'method': 'GET', 'path': '/api/transactions'},
+    {'id': 'm1', 'method': 'PUT', 'path': '/api/profile', 'body': {'full_name': 'x'}},
+    {'id': 'm1', 'method': 'POST', 'path': '/api/transactions/import'},
+    {'id': 'm1', 'method': 'DELETE', 'path': '/api/transactions'},
+])
+def test_batch_rechaza_lo_que_no_es_una_mutacion(client, fake_supabase, mutation):
+    resultado, = client.post('/api/batch', json={'mutations': [mutation]}).get_json()['results']
+    assert resultado['status'] == 400
+    assert resultado['body'] == {'success': False, 'error': 'Mutación no permitida en un lote'}
+    assert fake_supabase.tables['Usuarios'].rows[USER_ID]['full_name'] == 'Prueba'
+
+
+def test_batch_sin_lista_de_mutaciones(client):
+    response = client.post('/api/batch', json={'mutations': {'id': 'm1'}})
+    assert response.status_code == 400
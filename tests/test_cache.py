@@ -0,0 +1,63 @@
+from cache import TTLCache
+
+
+def test_expira_pasado_el_ttl(reloj):
+    cache = TTLCache(ttl=10, timer=reloj)
+    cache.set('a', 1)
+    reloj.now = 9.9
+    assert cache.get('a') == 1
+    reloj.now = 10
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expulsa_el_menos_usado():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_update_no_renueva_el_ttl(reloj):
+    cache = TTLCache(ttl=10, timer=reloj)
+    cache.set('a', 1)
+    reloj.now = 5
+    assert cache.update('a', lambda v: v + 1)
+    reloj.now = 10
+    assert cache.get('a') is None
+    assert not cache.update('falta', lambda v: v)
+
+
+def test_update_elimina_si_func_devuelve_none():
+    cache = TTLCache()
+    cache.set('a', 1)
+    assert not cache.update('a', lambda v: None)
+    assert len(cache) == 0
+
+
+def test_update_matching_actualiza_y_descarta():
+    cache = TTLCache()
+    for mes in ('01', '02', '03'):
+        cache.set(('u1', mes), ('v1', mes))
+    cache.set(('u1', '04'), ('v0', '04'))
+    cache.set(('u2', '01'), ('v1', '01'))
+
+    def restamp(key, entry):
+        return ('v2', entry[1]) if entry[0] == 'v1' else None
+
+    assert cache.update_matching(lambda key: key[0] == 'u1', restamp) == 3
+    assert cache.get(('u1', '02')) == ('v2', '02')
+    assert cache.get(('u1', '04')) is None
+    assert cache.get(('u2', '01')) == ('v1', '01')
+
+
+def test_pop_matching():
+    cache = TTLCache()
+    cache.set(('u1', 1), 1)
+    cache.set(('u1', 2), 2)
+    cache.set(('u2', 1), 3)
+    assert cache.pop_matching(lambda key: key[0] == 'u1') == 2
+    assert len(cache) == 1
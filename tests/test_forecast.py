@@ -0,0 +1,108 @@
+import calendar
+from datetime import date
+
+import numpy as np
+import pytest
+
+from forecast import FRECUENCIA_MESES, expand_occurrences, month_grid, monthly_income, project
+
+
+def gasto(dia, monto, frecuencia='mensual', categoria='Servicios', created_at=None):
+    e = {'día pago': dia, 'monto': monto, 'frecuencia': frecuencia, 'categoría': categoria}
+    if created_at:
+        e['created_at'] = created_at
+    return e
+
+
+def cobros_directos(expenses, start, months):
+    """Las mismas fechas de cobro calculadas mes por mes"""
+    inicio = date.fromisoformat(start)
+    cobros = []
+    for i, e in enumerate(expenses):
+        paso = FRECUENCIA_MESES.get((e.get('frecuencia') or '').lower(), 1)
+        if e.get('created_at'):
+            creado = date.fromisoformat(e['created_at'][:10])
+            ancla = (creado.year - inicio.year) * 12 + creado.month - inicio.month
+        else:
+            ancla = 0
+        for m in range(months):
+            if (m - ancla) % paso:
+                continue
+            año, mes = divmod(inicio.month - 1 + m, 12)
+            año, mes = inicio.year + año, mes + 1
+            dia = min(int(e['día pago']), calendar.monthrange(año, mes)[1])
+            fecha = date(año, mes, dia)
+            if fecha >= inicio:
+                cobros.append((fecha.isoformat(), i))
+    return sorted(cobros)
+
+
+def test_month_grid_con_año_bisiesto():
+    inicio, dias = month_grid('2024-01-15', 3)
+    assert inicio.astype(str).tolist() == ['2024-01-01', '2024-02-01', '2024-03-01']
+    assert dias.tolist() == [31, 29, 31]
+
+
+def test_dia_de_pago_mayor_que_el_mes_cae_en_el_ultimo_dia():
+    fechas, _, _, _ = expand_occurrences([gasto(31, 100)], '2023-01-01', 4)
+    assert fechas.astype(str).tolist() == ['2023-01-31', '2023-02-28', '2023-03-31', '2023-04-30']
+
+
+def test_no_cobra_antes_del_inicio():
+    fechas, _, _, indice_mes = expand_occurrences([gasto(5, 100), gasto(20, 50)], '2024-03-10', 2)
+    assert sorted(fechas.astype(str).tolist()) == ['2024-03-20', '2024-04-05', '2024-04-20']
+    assert sorted(indice_mes.tolist()) == [0, 1, 1]
+
+
+def test_frecuencias_desde_el_mes_de_alta():
+    trimestral = gasto(1, 300, 'Trimestral', created_at='2023-11-15T10:00:00')
+    fechas, montos, _, _ = expand_occurrences([trimestral], '2024-01-01', 12)
+    assert fechas.astype(str).tolist() == ['2024-02-01', '2024-05-01', '2024-08-01', '2024-11-01']
+    assert montos.tolist() == [300.0] * 4
+
+
+@pytest.mark.parametrize('start', ['2024-01-01', '2024-02-29', '2023-12-31'])
+def test_igual_que_calcularlo_mes_por_mes(start):
+    expenses = [
+        gasto(d, 10 * d, frecuencia, created_at=creado)
+        for d, frecuencia, creado in [
+            (1, 'mensual', None), (15, 'bimestral', '2023-06-01'), (30, 'semestral', '2024-03-01'),
+            (31, 'anual', '2022-02-10'), (29, 'desconocida', None), (10, 'trimestral', '2025-01-01'),
+        ]
+    ]
+    fechas, _, indice_gasto, _ = expand_occurrences(expenses, start, 24)
+    assert sorted(zip(fechas.astype(str).tolist(), indice_gasto.tolist())) == cobros_directos(expenses, start, 24)
+
+
+def test_sin_gastos():
+    fechas, montos, indice_gasto, indice_mes = expand_occurrences([], '2024-01-01', 6)
+    assert len(fechas) == len(montos) == len(indice_gasto) == len(indice_mes) == 0
+    r = project([], '2024-01-01', 3, average_income=1000)
+    assert r['gastos_fijos'] == [0.0, 0.0, 0.0]
+    assert r['balance'] == [1000.0, 2000.0, 3000.0]
+    assert r['gastos_por_categoria'] == {} and r['cobros'] == 0
+
+
+def test_ingreso_del_mes_en_curso_se_prorratea():
+    ingresos = monthly_income('2024-04-16', 3, 3000)
+    assert ingresos.tolist() == pytest.approx([1500.0, 3000.0, 3000.0])
+    assert monthly_income('2024-04-01', 1, 3000).tolist() == [3000.0]
+
+
+def test_proyeccion_mensual_y_diaria_coinciden():
+    expenses = [gasto(5, 100, categoria='Renta'), gasto(20, -40, categoria='Luz'), gasto(31, 10, 'bimestral')]
+    mensual = project(expenses, '2024-01-10', 3, average_income=1000, start_balance=50)
+    diaria = project(expenses, '2024-01-10', 3, average_income=1000, start_balance=50, granularity='day')
+
+    assert mensual['periodos'] == ['2024-01', '2024-02', '2024-03']
+    assert mensual['gastos_fijos'] == [50.0, 140.0, 150.0]
+    assert mensual['gastos_por_categoria']['Luz'] == [40.0, 40.0, 40.0]
+    assert mensual['neto'] == pytest.approx(np.subtract(mensual['ingresos'], mensual['gastos_fijos']).tolist())
+    assert mensual['balance'][-1] == pytest.approx(50 + sum(mensual['neto']))
+
+    assert diaria['periodos'][0] == '2024-01-10' and diaria['periodos'][-1] == '2024-03-31'
+    assert (diaria['desde'], diaria['hasta']) == (mensual['desde'], mensual['hasta']) == ('2024-01-10', '2024-03-31')
+    assert sum(diaria['gastos_fijos']) == pytest.approx(sum(mensual['gastos_fijos']))
+    assert sum(diaria['ingresos']) == pytest.approx(sum(mensual['ingresos']))
+    assert diaria['balance'][-1] == pytest.approx(mensual['balance'][-1])
+    assert diaria['cobros'] == mensual['cobros'] == 7
@@ -0,0 +1,42 @@
+import pytest
+
+from idempotency import IdempotencyStore
+
+USER = '3f2b8c1e-0000-4000-8000-000000000001'
+
+
+def test_resultado_compartido_entre_instancias(tmp_path, reloj):
+    a = IdempotencyStore(str(tmp_path), ttl=60, timer=reloj)
+    b = IdempotencyStore(str(tmp_path), ttl=60, timer=reloj)
+    assert a.get(USER, 'k1') is None
+    a.set(USER, 'k1', 200, {'success': True, 'data': {'id': 'x'}})
+    assert b.get(USER, 'k1') == (200, {'success': True, 'data': {'id': 'x'}})
+    assert b.get('otro-usuario', 'k1') is None
+
+
+def test_vence_con_el_ttl_y_prune_borra(tmp_path, reloj):
+    store = IdempotencyStore(str(tmp_path), ttl=60, timer=reloj)
+    store.set(USER, 'viejo', 404, {'error': 'x'})
+    reloj.now += 30
+    store.set(USER, 'nuevo', 200, {})
+    reloj.now += 31
+    assert store.get(USER, 'viejo') is None
+    assert store.get(USER, 'nuevo') == (200, {})
+    assert store.prune() == 1
+    assert len(list(tmp_path.glob('*.json'))) == 1
+
+
+def test_claves_del_cliente_no_escapan_del_directorio(tmp_path, reloj):
+    store = IdempotencyStore(str(tmp_path), timer=reloj)
+    store.set(USER, '../../etc/passwd', 200, {})
+    assert store.get(USER, '../../etc/passwd') == (200, {})
+    assert all(p.parent == tmp_path for p in tmp_path.iterdir())
+    with pytest.raises(ValueError):
+        store.get('../x', 'k')
+
+
+def test_lock(tmp_path):
+    store = IdempotencyStore(str(tmp_path))
+    with store.lock(USER):
+        store.set(USER, 'k', 200, {})
+    assert store.get(USER, 'k') == (200, {})
@@ -0,0 +1,52 @@
+import pytest
+
+from importers import normalize_row, parse_amount
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('1234.56', 1234.56),
+    ('$1,234.56', 1234.56),
+    ('-1,234.56', -1234.56),
+    ('1.234,56', 1234.56),
+    ('-1.234,56', -1234.56),
+    ('1.234.567,89', 1234567.89),
+    ('1,234,567.89', 1234567.89),
+    ('1,234,567', 1234567),
+    ('1.234.567', 1234567),
+    ('1.234', 1234),
+    ('12,345', 12345),
+    ('-45,90', -45.90),
+    ('45.9', 45.9),
+    ('0.125', 0.125),
+    ('0,125', 0.125),
+    ('1234,567', 1234.567),
+    ('(12.00)', -12.0),
+    ('(1.234,56)', -1234.56),
+    ('+ 300', 300),
+    ('$ 1 500', 1500),
+])
+def test_parse_amount_formatos(texto, esperado):
+    assert parse_amount(texto) == pytest.approx(esperado)
+
+
+@pytest.mark.parametrize('texto', ['', '  ', '$', '()', '1,23.45', '1.2345,00', '12,34,567', 'abc'])
+def test_parse_amount_invalido(texto):
+    with pytest.raises(ValueError):
+        parse_amount(texto)
+
+
+def test_normalize_row_signo_decide_el_tipo():
+    fila = normalize_row({'fecha': '05/03/2024', 'monto': '-1.234,56', 'descripcion': ' Renta '})
+    assert fila == {
+        'fecha': '2024-03-05',
+        'categoria': 'Otros Gastos',
+        'monto': 1234.56,
+        'descripcion': 'Renta',
+        'tipo': 'gasto',
+    }
+
+
+def test_normalize_row_cargo_y_abono():
+    assert normalize_row({'fecha': '2024-03-05', 'cargo': '12,345', 'descripcion': 'x'})['tipo'] == 'gasto'
+    abono = normalize_row({'fecha': '2024-03-05', 'abono': '1.234', 'descripcion': 'x'})
+    assert (abono['tipo'], abono['monto']) == ('ingreso', 1234)
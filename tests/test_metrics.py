@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+import metrics
+
+
+def dead_pid():
+    proceso = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proceso.wait()
+    return proceso.pid
+
+
+def counter(snapshot, name):
+    return sum(value for n, _, value in snapshot['counters'] if n == name)
+
+
+def write_snapshot(directory, pid, requests):
+    registry = metrics.Registry()
+    registry.inc('requests', {'route': '/'}, requests)
+    with open(os.path.join(directory, f'metrics-{pid}.json'), 'w') as f:
+        json.dump(registry.snapshot(), f)
+
+
+def test_suma_y_retira_copias_de_workers_terminados(tmp_path):
+    registry = metrics.Registry(str(tmp_path))
+    registry.inc('requests', {'route': '/'})
+    muerto = dead_pid()
+    write_snapshot(tmp_path, muerto, 5)
+
+    assert counter(registry.collect(), 'requests') == 6
+    assert not (tmp_path / f'metrics-{muerto}.json').exists()
+    assert (tmp_path / metrics.RETIRED_FILE).exists()
+
+    # Lo retirado se sigue sumando y se acumula con el siguiente worker que termina
+    write_snapshot(tmp_path, dead_pid(), 4)
+    assert counter(registry.collect(), 'requests') == 10
+    assert counter(registry.collect(), 'requests') == 10
+
+
+def test_no_retira_workers_vivos(tmp_path):
+    registry = metrics.Registry(str(tmp_path))
+    write_snapshot(tmp_path, os.getppid(), 3)
+
+    assert counter(registry.collect(), 'requests') == 3
+    assert (tmp_path / f'metrics-{os.getppid()}.json').exists()
+    assert not (tmp_path / metrics.RETIRED_FILE).exists()
@@ -0,0 +1,122 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import search
+from search import SearchIndex, normalize, tokenize, trigrams
+
+PALABRAS = ['netflix', 'spotify', 'renta', 'super', 'supermercado', 'gasolina', 'farmacia', 'nomina', 'cafe', 'uber']
+
+
+def fila(row_id, descripcion, fecha='2024-03-01', categoria='Otros', tipo='gasto', monto=100):
+    return {'id': row_id, 'fecha': fecha, 'tipo': tipo, 'categoria': categoria, 'monto': monto, 'descripcion': descripcion}
+
+
+def filas_aleatorias(n, seed=3):
+    rng = random.Random(seed)
+    return [
+        fila(f'{i:05d}', ' '.join(rng.sample(PALABRAS, 2)) + f' {rng.randrange(50)}',
+             fecha=(date(2024, 1, 1) + timedelta(days=rng.randrange(60))).isoformat(),
+             categoria=rng.choice(['Comida', 'Servicios', 'Transporte']),
+             tipo=rng.choice(['gasto', 'ingreso']), monto=rng.randrange(-500, 500))
+        for i in range(n)
+    ]
+
+
+def ids(resultado):
+    return [r['id'] for r in resultado[1]]
+
+
+def estado(index):
+    return (index._docs, index._fechas, index._por_fecha, index._postings, index._vocab, index._grams, index._gram_count)
+
+
+def test_normalizacion_y_trigramas():
+    assert normalize('Suscripción NETFLIX') == 'suscripcion netflix'
+    assert tokenize('Café-Ñandú, 2x1!') == ['cafe', 'nandu', '2x1']
+    assert trigrams('gas') == {'  g', ' ga', 'gas', 'as '}
+
+
+def test_indice_vacio():
+    index = SearchIndex()
+    assert len(index) == 0
+    assert index.search('netflix') == (0, [])
+    assert index.search('') == (0, [])
+
+
+def test_exacta_antes_que_prefijo_y_prefijo_antes_que_aproximada():
+    index = SearchIndex().update([
+        fila('a', 'supermercado', fecha='2024-03-03'),
+        fila('b', 'super', fecha='2024-03-01'),
+        fila('c', 'supr', fecha='2024-03-04'),
+    ])
+    total, resultados = index.search('super')
+    assert total == 3
+    assert [(r['id'], r['puntaje']) for r in resultados][:2] == [('b', 3.0), ('a', 2.0)]
+    assert resultados[2]['id'] == 'c' and 0 < resultados[2]['puntaje'] < 1
+    assert index.search('super', fuzzy=False)[0] == 2
+
+
+def test_palabras_se_combinan_con_and_y_suman_puntaje():
+    index = SearchIndex().update([
+        fila('a', 'Cargo NETFLIX', categoria='Suscripciones'),
+        fila('b', 'Cargo spotify', categoria='Suscripciones'),
+        fila('c', 'netflix regalo', categoria='Otros'),
+    ])
+    assert ids(index.search('netflix suscripciones')) == ['a']
+    assert index.search('netflix suscrip')[1][0]['puntaje'] == 5.0
+    assert index.search('netflix xyz', fuzzy=False) == (0, [])
+
+
+def test_mismo_puntaje_ordena_por_fecha_y_luego_id():
+    index = SearchIndex().update([
+        fila('a', 'renta', fecha='2024-03-01'),
+        fila('c', 'renta', fecha='2024-03-05'),
+        fila('b', 'renta', fecha='2024-03-05'),
+        fila('d', 'renta', fecha='2024-02-28'),
+    ])
+    assert ids(index.search('renta')) == ['c', 'b', 'a', 'd']
+    assert ids(index.search('renta', limit=2)) == ['c', 'b']
+
+
+@pytest.mark.parametrize('query', ['', 'super', 'sup', 'netflx', 'cafe 1', 'comida', 'nomina uber'])
+def test_muchos_candidatos_igual_que_ordenar_todo(monkeypatch, query):
+    """El recorrido por fecha de _best da lo mismo que ordenar todas las coincidencias"""
+    index = SearchIndex().update(filas_aleatorias(3000))
+    esperado = index.search(query, limit=40)
+    monkeypatch.setattr(search, 'SMALL_RESULT', 0)
+    assert index.search(query, limit=40) == esperado
+    total, resultados = esperado
+    claves = [(r['puntaje'], r['fecha'], r['id']) for r in resultados]
+    assert claves == sorted(claves, reverse=True)
+    assert len(resultados) == min(40, total)
+
+
+def test_filtros_de_tipo_monto_y_fechas_inclusivas():
+    index = SearchIndex().update([
+        fila('a', 'pago', fecha='2024-03-01', monto=-150),
+        fila('b', 'pago', fecha='2024-03-31T23:59:59', monto=200, tipo='ingreso'),
+        fila('c', 'pago', fecha='2024-04-01', monto=50),
+        fila('d', 'pago', fecha='2024-02-29', monto=150),
+    ])
+    assert sorted(ids(index.search('pago', desde='2024-03-01', hasta='2024-03-31'))) == ['a', 'b']
+    assert ids(index.search('pago', tipo='ingreso')) == ['b']
+    # Los montos se comparan en valor absoluto y los límites son inclusivos
+    assert sorted(ids(index.search('', monto_min=150, monto_max=150))) == ['a', 'd']
+    assert ids(index.search('', monto_min=151)) == ['b']
+
+
+def test_actualizar_y_borrar_deja_el_mismo_estado_que_construir_de_nuevo():
+    filas = filas_aleatorias(500)
+    index = SearchIndex().update(filas)
+    cambiadas = [dict(f, descripcion='tintoreria express', fecha='2024-05-01') for f in filas[:50]]
+    index.update(cambiadas)
+    for f in filas[50:120]:
+        index.remove(f['id'])
+    index.add(fila('nueva', 'uber eats'))
+    index.remove('no-existe')
+
+    esperado = SearchIndex().update(cambiadas + filas[120:] + [fila('nueva', 'uber eats')])
+    assert estado(index) == estado(esperado)
+    assert index.search('tintoreria')[0] == 50
@@ -0,0 +1,106 @@
+import multiprocessing
+
+import pytest
+
+from versions import DataVersions
+
+USER = '3f2b8c1e-0000-4000-8000-000000000001'
+
+
+@pytest.fixture
+def versions(tmp_path):
+    return DataVersions(str(tmp_path), max_age=60, timer=lambda: 125.0)
+
+
+def test_get_es_estable_hasta_el_bump(versions):
+    primera = versions.get(USER, 'transactions')
+    assert versions.get(USER, 'transactions') == primera
+    nueva = versions.bump(USER, 'transactions')['transactions']
+    assert nueva != primera
+    assert versions.get(USER, 'transactions') == nueva
+
+
+def test_swap_devuelve_anterior_y_nueva(versions):
+    assert versions.swap(USER, 'fixed')[0] is None
+    actual = versions.get(USER, 'fixed')
+    anterior, nueva = versions.swap(USER, 'fixed')
+    assert anterior == actual
+    assert versions.get(USER, 'fixed') == nueva != anterior
+
+
+def test_la_version_se_comparte_entre_instancias(tmp_path):
+    a = DataVersions(str(tmp_path))
+    b = DataVersions(str(tmp_path))
+    assert a.get(USER, 'profile') == b.get(USER, 'profile')
+    nueva = a.bump(USER, 'profile')['profile']
+    assert b.get(USER, 'profile') == nueva
+
+
+def test_token_y_bucket(versions):
+    token = versions.token(USER, 'transactions', 'fixed')
+    assert token == f"{versions.get(USER, 'transactions')}.{versions.get(USER, 'fixed')}"
+    assert versions.bucket() == 2
+    assert DataVersions(versions.directory, max_age=0).bucket() == 0
+
+
+@pytest.mark.parametrize('user_id, scope', [('../etc', 'profile'), (USER, 'otro')])
+def test_rechaza_llaves_invalidas(versions, user_id, scope):
+    with pytest.raises(ValueError):
+        versions.get(user_id, scope)
+
+
+def _swaps(directory, n, queue):
+    versions = DataVersions(directory)
+    queue.put([versions.swap(USER, 'transactions') for _ in range(n)])
+
+
+def test_swap_es_atomico_entre_procesos(tmp_path):
+    """Cada versión nueva sigue a exactamente una anterior, sin saltos ni repetidos"""
+    DataVersions(str(tmp_path)).get(USER, 'transactions')
+    queue = multiprocessing.Queue()
+    procesos = [multiprocessing.Process(target=_swaps, args=(str(tmp_path), 50, queue)) for _ in range(4)]
+    for p in procesos:
+        p.start()
+    cambios = [par for _ in procesos for par in queue.get(timeout=30)]
+    for p in procesos:
+        p.join()
+
+    anteriores = [anterior for anterior, _ in cambios]
+    nuevas = [nueva for _, nueva in cambios]
+    assert len(set(anteriores)) == len(set(nuevas)) == 200
+    # Las versiones forman una sola cadena: cada anterior es la nueva de otro swap,
+    # salvo la primera, y la última nueva es la versión actual
+    assert len(set(anteriores) - set(nuevas)) == 1
+    assert set(nuevas) - set(anteriores) == {DataVersions(str(tmp_path)).get(USER, 'transactions')}
+
+
+def test_changes_since_sigue_la_cadena_del_registro(versions):
+    inicial = versions.get(USER, 'transactions')
+    versions.swap(USER, 'transactions', ids=['a'])
+    _, intermedia = versions.swap(USER, 'transactions', ids=['b', 'a'])
+    _, actual = versions.swap(USER, 'transactions', ids=[])
+    assert versions.changes_since(USER, 'transactions', inicial) == (actual, {'a', 'b'})
+    assert versions.changes_since(USER, 'transactions', intermedia) == (actual, set())
+    assert versions.changes_since(USER, 'transactions', actual) is None
+
+
+def test_un_cambio_sin_ids_corta_la_cadena(versions):
+    inicial = versions.get(USER, 'transactions')
+    _, registrada = versions.swap(USER, 'transactions', ids=['a'])
+    _, actual = versions.swap(USER, 'transactions')
+    versions.swap(USER, 'transactions', ids=['b'])
+    # Llega solo hasta antes del cambio sin registrar; desde ahí no hay cadena
+    assert versions.changes_since(USER, 'transactions', inicial) == (registrada, {'a'})
+    assert versions.changes_since(USER, 'transactions', registrada) is None
+    assert versions.changes_since(USER, 'transactions', actual)[1] == {'b'}
+
+
+def test_el_registro_se_recorta(versions, monkeypatch):
+    monkeypatch.setattr('versions.JOURNAL_MAX_BYTES', 2000)
+    inicial = versions.get(USER, 'transactions')
+    vistas = [versions.swap(USER, 'transactions', ids=[f'fila-{i}'])[1] for i in range(100)]
+    with open(versions._path(USER, 'transactions') + '.log') as f:
+        assert len(f.read()) <= 2000
+    # Los cambios más viejos ya no están; los recientes sí
+    assert versions.changes_since(USER, 'transactions', inicial) is None
+    assert versions.changes_since(USER, 'transactions', vistas[-3]) == (vistas[-1], {'fila-98', 'fila-99'})
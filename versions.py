@@ -0,0 +1,190 @@
+"""
+Versión de los datos de cada usuario, compartida por los workers de una máquina
+
+Cada escritura que hace la aplicación cambia la versión del ámbito afectado
+(transacciones, gastos fijos o perfil) y las lecturas la usan para armar ETags
+y llaves de caché sin consultar Supabase. La versión vive en un archivo por
+usuario y ámbito dentro de DATA_VERSION_DIR, así un cambio hecho en un worker
+lo ven en la siguiente petición los demás que usan el mismo directorio. El valor
+por defecto está en el directorio temporal, que solo comparten los workers de
+una máquina o contenedor: con varias instancias DATA_VERSION_DIR debe apuntar a
+un volumen común; si no, cada una nota los cambios de las otras solo cuando
+vencen sus cachés (su TTL) y sus ETags (ver abajo).
+
+Cambiar una versión es leer la actual y escribir la nueva bajo un candado
+(flock sobre un archivo .lock junto al de la versión), así quien la cambia sabe
+de qué versión venía: las cachés de cada worker solo se actualizan en el lugar
+si estaban en esa versión.
+
+Un cambio puede llevar además la lista de ids de las filas que tocó: se anota
+en un registro por usuario y ámbito ({usuario}.{ámbito}.log, una línea JSON por
+cambio con la versión anterior y la nueva). Con changes_since() un worker cuyo
+índice en memoria quedó en una versión vieja sabe qué filas volver a leer en
+lugar de reconstruirlo completo. Un cambio sin ids corta la cadena del registro
+y obliga a reconstruir.
+
+Las escrituras hechas fuera de la aplicación (editor de Supabase, scripts) no
+cambian la versión; por eso los ETags incluyen además un intervalo de tiempo
+(DATA_VERSION_MAX_AGE) que acota cuánto tarda en notarse un cambio así, igual
+que los de otra instancia que no comparte DATA_VERSION_DIR.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: file_lock no bloquea y DataVersions solo serializa sus hilos
+    fcntl = None
+
+SCOPES = ('transactions', 'fixed', 'profile')
+# Al pasar de este tamaño el registro de cambios se recorta a su mitad más reciente
+JOURNAL_MAX_BYTES = 64 * 1024
+_SAFE_ID = re.compile(r'^[0-9A-Za-z\-]+$')
+
+
+@contextmanager
+def file_lock(path):
+    """Candado exclusivo entre procesos sobre el archivo path (se crea si no existe)
+
+    Sin fcntl (Windows) no bloquea nada.
+    """
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        # Cerrar el archivo libera el flock
+        yield
+
+
+class DataVersions:
+    """Versiones por (usuario, ámbito) guardadas como archivos pequeños"""
+
+    def __init__(self, directory, max_age=300.0, timer=time.time):
+        self.directory = directory
+        self.max_age = max_age
+        self.timer = timer
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, user_id, scope):
+        user_id = str(user_id)
+        if scope not in SCOPES or not _SAFE_ID.match(user_id):
+            raise ValueError(f'Versión inválida: {user_id}/{scope}')
+        return os.path.join(self.directory, f'{user_id}.{scope}')
+
+    def _write(self, path, token=None):
+        token = token or uuid.uuid4().hex[:16]
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.version-')
+        with os.fdopen(fd, 'w') as f:
+            f.write(token)
+        # os.replace es atómico: nadie lee un archivo a medias
+        os.replace(tmp, path)
+        return token
+
+    @contextmanager
+    def _locked(self, path):
+        with self._lock, file_lock(f'{path}.lock'):
+            yield
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return f.read() or None
+        except FileNotFoundError:
+            return None
+
+    def get(self, user_id, scope):
+        """Versión actual del ámbito; se crea la primera vez que se pide"""
+        path = self._path(user_id, scope)
+        token = self._read(path)
+        if token:
+            return token
+        with self._locked(path):
+            # Otro worker pudo haberla creado mientras se esperaba el candado
+            return self._read(path) or self._write(path)
+
+    def _append_journal(self, path, entry):
+        journal = f'{path}.log'
+        with open(journal, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            tamaño = f.tell()
+        if tamaño > JOURNAL_MAX_BYTES:
+            with open(journal) as f:
+                lineas = f.readlines()
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.version-')
+            with os.fdopen(fd, 'w') as f:
+                f.writelines(lineas[len(lineas) // 2:])
+            os.replace(tmp, journal)
+
+    def swap(self, user_id, scope, ids=None):
+        """Cambiar la versión del ámbito; devuelve (anterior, nueva)
+
+        anterior es None si el ámbito no tenía versión. Con `ids` (las filas que
+        tocó la escritura) el cambio queda en el registro para changes_since().
+        """
+        path = self._path(user_id, scope)
+        with self._locked(path):
+            anterior = self._read(path)
+            nueva = uuid.uuid4().hex[:16]
+            # El registro se escribe antes que la versión: quien ve la versión nueva
+            # ya puede encontrar el cambio
+            if ids is not None and anterior:
+                self._append_journal(path, {'anterior': anterior, 'nueva': nueva, 'ids': [str(i) for i in ids]})
+            return anterior, self._write(path, nueva)
+
+    def changes_since(self, user_id, scope, version):
+        """(versión alcanzada, ids tocados) por los cambios registrados desde `version`
+
+        Sigue la cadena del registro desde `version` hasta donde llegue; la
+        versión alcanzada puede ser anterior a la actual si algún cambio no se
+        registró (entonces la siguiente llamada devuelve None). None si el
+        registro no tiene cambios desde `version`.
+        """
+        try:
+            with open(f'{self._path(user_id, scope)}.log') as f:
+                lineas = f.readlines()
+        except FileNotFoundError:
+            return None
+        siguiente = {}
+        for linea in lineas:
+            try:
+                entry = json.loads(linea)
+            except ValueError:
+                # Una línea a medias de una escritura interrumpida
+                continue
+            siguiente[entry['anterior']] = entry
+        if version not in siguiente:
+            return None
+        ids = set()
+        while version in siguiente:
+            entry = siguiente.pop(version)
+            ids.update(entry['ids'])
+            version = entry['nueva']
+        return version, ids
+
+    def bump(self, user_id, *scopes):
+        """Marcar que los datos de esos ámbitos cambiaron; devuelve las versiones nuevas"""
+        return {scope: self.swap(user_id, scope)[1] for scope in scopes}
+
+    def bucket(self):
+        """Intervalo de tiempo actual; cambia cada max_age segundos"""
+        return int(self.timer() // self.max_age) if self.max_age > 0 else 0
+
+    def token(self, user_id, *scopes):
+        """Llave combinada de varios ámbitos, para ETags y cachés"""
+        return '.'.join(self.get(user_id, scope) for scope in scopes)
+
+
+def from_env():
+    """DataVersions configurada con DATA_VERSION_DIR y DATA_VERSION_MAX_AGE"""
+    return DataVersions(
+        os.getenv('DATA_VERSION_DIR', os.path.join(tempfile.gettempdir(), 'dashboard-pwa-versions')),
+        max_age=float(os.getenv('DATA_VERSION_MAX_AGE', '300'))
+    )